@@ -28,9 +28,14 @@ class Config:
     GEMINI_MAX_RETRIES = int(os.getenv("GEMINI_MAX_RETRIES", "3"))
     GEMINI_TEMPERATURE = float(os.getenv("GEMINI_TEMPERATURE", "0.7"))
     GEMINI_MAX_OUTPUT_TOKENS = int(os.getenv("GEMINI_MAX_OUTPUT_TOKENS", "2048"))
+    NARRATIVE_CACHE_SIZE = int(os.getenv("NARRATIVE_CACHE_SIZE", "256"))
+    NARRATIVE_CACHE_DIR = os.getenv("NARRATIVE_CACHE_DIR")
+    NARRATIVE_EMPTY_FALLBACK = os.getenv("NARRATIVE_EMPTY_FALLBACK", "true").lower() == "true"
     
     # MongoDB
     MONGODB_URI = os.getenv("MONGODB_URI")
+    MONGODB_MAX_POOL_SIZE = int(os.getenv("MONGODB_MAX_POOL_SIZE", "50"))
+    MONGODB_MIN_POOL_SIZE = int(os.getenv("MONGODB_MIN_POOL_SIZE", "5"))
     
     # Cloudinary
     CLOUDINARY_CLOUD_NAME = os.getenv("CLOUDINARY_CLOUD_NAME")
@@ -42,6 +47,7 @@ class Config:
     MIN_COLUMNS = int(os.getenv("MIN_COLUMNS", "2"))
     MIN_ROWS = int(os.getenv("MIN_ROWS", "10"))
     CORRELATION_THRESHOLD = float(os.getenv("CORRELATION_THRESHOLD", "0.5"))
+    SCHEMA_CACHE_SIZE = int(os.getenv("SCHEMA_CACHE_SIZE", "256"))
     
     @classmethod
     def validate(cls):
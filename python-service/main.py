@@ -3,21 +3,30 @@ DataStory AI - Python Analysis Service
 FastAPI application for statistical analysis and narrative generation
 """
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Response
+from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from typing import Optional, Dict, Any
+from contextlib import asynccontextmanager
+from collections import OrderedDict
+from urllib.parse import parse_qsl, urlencode, urlsplit
+import asyncio
+import hashlib
 import os
 import logging
 import traceback
-from pymongo import MongoClient
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
 import numpy as np
+import orjson
 
 from config import config
 from services.preprocessor import DataPreprocessor
 from services.analyzer import StatisticalAnalyzer
 from services.visualizer import VisualizationSelector
-from services.narrative_generator import NarrativeGenerator
+from services.narrative_generator import get_narrative_generator
 
 # Configure logging
 logging.basicConfig(
@@ -27,38 +36,47 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-def convert_numpy_types(obj: Any) -> Any:
+def _json_default(obj: Any) -> Any:
+    """Fallback for values orjson cannot serialize natively"""
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, np.ndarray):
+        # Non-contiguous or object arrays are not handled by OPT_SERIALIZE_NUMPY
+        return obj.tolist()
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def dumps_json(obj: Any) -> bytes:
     """
-    Recursively convert numpy types to native Python types for JSON serialization
+    Serialize a payload containing numpy types to JSON bytes
     
     Args:
-        obj: Object that may contain numpy types
+        obj: Object that may contain numpy scalars and arrays
         
     Returns:
-        Object with all numpy types converted to Python types
+        UTF-8 encoded JSON (NaN and Infinity become null)
     """
-    if isinstance(obj, np.integer):
-        return int(obj)
-    elif isinstance(obj, np.floating):
-        return float(obj)
-    elif isinstance(obj, np.bool_):
-        return bool(obj)
-    elif isinstance(obj, np.ndarray):
-        return obj.tolist()
-    elif isinstance(obj, dict):
-        return {key: convert_numpy_types(value) for key, value in obj.items()}
-    elif isinstance(obj, list):
-        return [convert_numpy_types(item) for item in obj]
-    elif isinstance(obj, tuple):
-        return tuple(convert_numpy_types(item) for item in obj)
-    else:
-        return obj
+    return orjson.dumps(
+        obj,
+        default=_json_default,
+        option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+    )
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start background workers on startup and flush them on shutdown"""
+    status_batcher.start()
+    yield
+    await status_batcher.stop()
+
 
 # Initialize FastAPI app
 app = FastAPI(
     title="DataStory AI Analysis Service",
     description="Statistical analysis and AI narrative generation service",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Configure CORS
@@ -70,18 +88,22 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize MongoDB client
+# Initialize MongoDB client (async driver with a shared connection pool)
 mongo_client = None
 jobs_collection = None
 
 try:
     if config.MONGODB_URI:
-        mongo_client = MongoClient(config.MONGODB_URI)
+        mongo_client = AsyncIOMotorClient(
+            config.MONGODB_URI,
+            maxPoolSize=config.MONGODB_MAX_POOL_SIZE,
+            minPoolSize=config.MONGODB_MIN_POOL_SIZE
+        )
         db = mongo_client.get_database()
         jobs_collection = db['jobs']
         logger.info("MongoDB connection established")
 except Exception as e:
-    logger.warning(f"MongoDB connection failed: {e}. Job status updates will be skipped.")
+    logger.warning("MongoDB connection failed: %s. Job status updates will be skipped.", e)
 
 
 # Request/Response models
@@ -98,7 +120,33 @@ class AnalyzeResponse(BaseModel):
     statistics: Dict[str, Any]
 
 
-def update_job_status(job_id: str, status: str, stage: str = None, 
+class NarrativeStreamRequest(BaseModel):
+    statistics: Dict[str, Any]
+    metadata: Dict[str, Any] = {}
+    audienceLevel: str = 'general'
+
+
+def _build_status_update(status: str, stage: str = None, progress: int = None,
+                         error: Dict[str, Any] = None) -> Dict[str, Any]:
+    """Build the $set document for a job status update"""
+    update_data = {
+        'status': status,
+        'updatedAt': None  # MongoDB will use server time
+    }
+    
+    if stage:
+        update_data['currentStage'] = stage
+    
+    if progress is not None:
+        update_data['progress'] = progress
+    
+    if error:
+        update_data['error'] = error
+    
+    return update_data
+
+
+async def update_job_status(job_id: str, status: str, stage: str = None, 
                      progress: int = None, error: Dict[str, Any] = None) -> None:
     """
     Update job status in MongoDB
@@ -115,29 +163,153 @@ def update_job_status(job_id: str, status: str, stage: str = None,
         return
     
     try:
-        update_data = {
-            'status': status,
-            'updatedAt': None  # MongoDB will use server time
-        }
-        
-        if stage:
-            update_data['currentStage'] = stage
-        
-        if progress is not None:
-            update_data['progress'] = progress
-        
-        if error:
-            update_data['error'] = error
+        update_data = _build_status_update(status, stage, progress, error)
         
-        jobs_collection.update_one(
+        await jobs_collection.update_one(
             {'jobId': job_id},
             {'$set': update_data}
         )
         
-        logger.info(f"Updated job {job_id}: status={status}, stage={stage}, progress={progress}")
+        logger.info("Updated job %s: status=%s, stage=%s, progress=%s", job_id, status, stage, progress)
         
     except Exception as e:
-        logger.error(f"Failed to update job status: {e}")
+        logger.error("Failed to update job status: %s", e)
+
+
+class JobStatusBatcher:
+    """
+    Buffers intermediate job progress updates and writes them to MongoDB in bulk
+    
+    Updates for the same job are coalesced, so a job that moves through several
+    stages between flushes costs a single write. Terminal states ('completed',
+    'failed') bypass the buffer and are written immediately.
+    """
+    
+    def __init__(self, flush_interval: float = 0.25):
+        self.flush_interval = flush_interval
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+    
+    def start(self) -> None:
+        """Start the background flush task if it is not already running"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+    
+    async def stop(self) -> None:
+        """Cancel the background task and flush anything still buffered"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+    
+    def enqueue(self, job_id: str, status: str, stage: str = None, progress: int = None) -> None:
+        """
+        Buffer a progress update for the next flush
+        
+        Args:
+            job_id: Job identifier
+            status: Job status
+            stage: Current processing stage
+            progress: Progress percentage (0-100)
+        """
+        self._pending.setdefault(job_id, {}).update(_build_status_update(status, stage, progress))
+        # Also started lazily for deployments that do not run lifespan events
+        self.start()
+    
+    async def write_now(self, job_id: str, status: str, stage: str = None,
+                        progress: int = None, error: Dict[str, Any] = None) -> None:
+        """
+        Write a terminal status immediately, dropping any buffered update for the job
+        
+        Args:
+            job_id: Job identifier
+            status: Job status ('completed', 'failed')
+            stage: Current processing stage
+            progress: Progress percentage (0-100)
+            error: Error details if failed
+        """
+        # Holding the lock keeps an in-flight flush from landing after this write
+        async with self._lock:
+            self._pending.pop(job_id, None)
+            await update_job_status(job_id, status, stage, progress, error)
+    
+    async def flush(self) -> None:
+        """Write all buffered updates in one unordered bulk operation"""
+        async with self._lock:
+            if not self._pending:
+                return
+            
+            pending, self._pending = self._pending, {}
+            if jobs_collection is None:
+                return
+            
+            try:
+                await jobs_collection.bulk_write(
+                    [UpdateOne({'jobId': job_id}, {'$set': update}) for job_id, update in pending.items()],
+                    ordered=False
+                )
+                logger.info("Flushed status updates for %d job(s)", len(pending))
+            except Exception as e:
+                logger.error("Failed to flush job status updates: %s", e)
+    
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+
+status_batcher = JobStatusBatcher()
+
+
+class SchemaCache:
+    """
+    In-process LRU of detected column types, keyed by file location
+    
+    The key hashes the URL without its presigning parameters, so re-signed
+    URLs for the same object share an entry, while other query parameters
+    (e.g. ?id=... or an S3 versionId) still tell files apart. A cached schema
+    is only a hint: DataPreprocessor re-checks it against the loaded file.
+    """
+    
+    # Query parameters added by S3 (SigV2/SigV4) and GCS URL signing
+    SIGNING_PARAMS = frozenset({'awsaccesskeyid', 'signature', 'expires'})
+    SIGNING_PREFIXES = ('x-amz-', 'x-goog-')
+    
+    def __init__(self, max_size: int = 256):
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, Dict[str, str]]" = OrderedDict()
+    
+    @staticmethod
+    def key_for(file_url: str) -> str:
+        """Hash a file URL without its fragment and URL-signing query parameters"""
+        parts = urlsplit(file_url)
+        query = sorted(
+            (name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True)
+            if name.lower() not in SchemaCache.SIGNING_PARAMS
+            and not name.lower().startswith(SchemaCache.SIGNING_PREFIXES)
+        )
+        location = parts._replace(query=urlencode(query), fragment='').geturl()
+        return hashlib.sha256(location.encode()).hexdigest()
+    
+    def get(self, key: str) -> Optional[Dict[str, str]]:
+        schema = self._entries.get(key)
+        if schema is not None:
+            self._entries.move_to_end(key)
+        return schema
+    
+    def set(self, key: str, schema: Dict[str, str]) -> None:
+        self._entries[key] = dict(schema)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+
+schema_cache = SchemaCache(max_size=config.SCHEMA_CACHE_SIZE)
 
 
 # Health check endpoint
@@ -168,15 +340,15 @@ async def analyze_data(request: AnalyzeRequest):
     job_id = request.jobId
     
     try:
-        logger.info(f"Starting analysis for job {job_id}")
+        logger.info("Starting analysis for job %s", job_id)
         
         # Extract options
         options = request.options or {}
         audience_level = options.get('audienceLevel', 'general')
         
         # Stage 1: Preprocessing
-        update_job_status(job_id, 'processing', 'analyzing', 10)
-        logger.info(f"Stage 1: Preprocessing data from {request.fileUrl}")
+        status_batcher.enqueue(job_id, 'processing', 'analyzing', 10)
+        logger.info("Stage 1: Preprocessing data from %s", request.fileUrl)
         
         preprocessor = DataPreprocessor(
             min_columns=config.MIN_COLUMNS,
@@ -184,59 +356,62 @@ async def analyze_data(request: AnalyzeRequest):
         )
         
         try:
-            df, metadata = preprocessor.preprocess(request.fileUrl)
-            logger.info(f"Preprocessing complete: {metadata['row_count']} rows, {metadata['column_count']} columns")
+            schema_key = SchemaCache.key_for(request.fileUrl)
+            df, metadata = preprocessor.preprocess(request.fileUrl, schema_override=schema_cache.get(schema_key))
+            schema_cache.set(schema_key, metadata['column_types'])
+            logger.info("Preprocessing complete: %d rows, %d columns", metadata['row_count'], metadata['column_count'])
         except Exception as e:
             error_detail = {
                 'code': 'PREPROCESSING_ERROR',
                 'message': f"Failed to preprocess data: {str(e)}",
                 'timestamp': None
             }
-            update_job_status(job_id, 'failed', error=error_detail)
+            await status_batcher.write_now(job_id, 'failed', error=error_detail)
             raise HTTPException(status_code=400, detail=error_detail['message'])
         
         # Stage 2: Statistical Analysis
-        update_job_status(job_id, 'processing', 'analyzing', 30)
+        status_batcher.enqueue(job_id, 'processing', 'analyzing', 30)
         logger.info("Stage 2: Performing statistical analysis")
         
         try:
             analyzer = StatisticalAnalyzer(correlation_threshold=config.CORRELATION_THRESHOLD)
-            analysis = analyzer.analyze(df, metadata)
-            logger.info(f"Analysis complete: {len(analysis['trends'])} trends, "
-                       f"{len(analysis['correlations'])} correlations found")
+            # CPU-bound; run off the event loop so other requests keep being served
+            analysis = await run_in_threadpool(analyzer.analyze, df, metadata)
+            logger.info("Analysis complete: %d trends, %d correlations found",
+                        len(analysis['trends']), len(analysis['correlations']))
         except Exception as e:
             error_detail = {
                 'code': 'ANALYSIS_ERROR',
                 'message': f"Statistical analysis failed: {str(e)}",
                 'timestamp': None
             }
-            update_job_status(job_id, 'failed', error=error_detail)
+            await status_batcher.write_now(job_id, 'failed', error=error_detail)
             raise HTTPException(status_code=500, detail=error_detail['message'])
         
         # Stage 3: Narrative Generation
-        update_job_status(job_id, 'processing', 'generating_narrative', 50)
+        status_batcher.enqueue(job_id, 'processing', 'generating_narrative', 50)
         logger.info("Stage 3: Generating AI narrative")
         
         try:
-            narrative_gen = NarrativeGenerator()
-            narratives = narrative_gen.generate_narrative(analysis, metadata, audience_level)
+            narrative_gen = get_narrative_generator()
+            narratives = await narrative_gen.generate_narrative_async(analysis, metadata, audience_level)
             logger.info("Narrative generation complete")
         except Exception as e:
             # Log detailed error information for debugging
-            logger.error(f"Narrative generation failed: {str(e)}", exc_info=True)
-            logger.error(f"Analysis keys: {list(analysis.keys())}")
-            logger.error(f"Metadata keys: {list(metadata.keys())}")
+            logger.error("Narrative generation failed: %s", e, exc_info=True)
+            logger.error("Analysis keys: %s", list(analysis.keys()))
+            logger.error("Metadata keys: %s", list(metadata.keys()))
             
             error_detail = {
                 'code': 'NARRATIVE_GENERATION_ERROR',
                 'message': f"Failed to generate narrative: {str(e)}",
                 'timestamp': None
             }
-            update_job_status(job_id, 'failed', error=error_detail)
+            await status_batcher.write_now(job_id, 'failed', error=error_detail)
             raise HTTPException(status_code=500, detail=error_detail['message'])
         
         # Stage 4: Visualization Selection
-        update_job_status(job_id, 'processing', 'creating_visualizations', 80)
+        status_batcher.enqueue(job_id, 'processing', 'creating_visualizations', 80)
         logger.info("Stage 4: Selecting visualizations with advanced chart types")
         
         try:
@@ -245,29 +420,30 @@ async def analyze_data(request: AnalyzeRequest):
             
             # Generate final chart configurations
             charts = [visualizer.generate_chart_config(chart) for chart in chart_specs]
-            logger.info(f"Visualization selection complete: {len(charts)} charts created with types: {[c['type'] for c in charts]}")
+            if logger.isEnabledFor(logging.INFO):
+                logger.info("Visualization selection complete: %d charts created with types: %s",
+                            len(charts), [c['type'] for c in charts])
         except Exception as e:
             error_detail = {
                 'code': 'VISUALIZATION_ERROR',
                 'message': f"Failed to create visualizations: {str(e)}",
                 'timestamp': None
             }
-            update_job_status(job_id, 'failed', error=error_detail)
+            await status_batcher.write_now(job_id, 'failed', error=error_detail)
             raise HTTPException(status_code=500, detail=error_detail['message'])
         
         # Stage 5: Complete
-        update_job_status(job_id, 'completed', progress=100)
-        logger.info(f"Analysis complete for job {job_id}")
-        
-        # Convert numpy types to native Python types for JSON serialization
-        analysis_serializable = convert_numpy_types(analysis)
-        charts_serializable = convert_numpy_types(charts)
+        await status_batcher.write_now(job_id, 'completed', progress=100)
+        logger.info("Analysis complete for job %s", job_id)
         
-        # Return complete story payload
-        return AnalyzeResponse(
-            narratives=narratives,
-            charts=charts_serializable,
-            statistics=analysis_serializable
+        # Return complete story payload, serialized in one pass (numpy types handled by orjson)
+        return Response(
+            content=dumps_json({
+                'narratives': narratives,
+                'charts': charts,
+                'statistics': analysis
+            }),
+            media_type='application/json'
         )
         
     except HTTPException:
@@ -275,7 +451,7 @@ async def analyze_data(request: AnalyzeRequest):
         raise
     except Exception as e:
         # Catch any unexpected errors
-        logger.error(f"Unexpected error in analysis: {str(e)}")
+        logger.error("Unexpected error in analysis: %s", e)
         logger.error(traceback.format_exc())
         
         error_detail = {
@@ -283,11 +459,53 @@ async def analyze_data(request: AnalyzeRequest):
             'message': f"An unexpected error occurred: {str(e)}",
             'timestamp': None
         }
-        update_job_status(job_id, 'failed', error=error_detail)
+        await status_batcher.write_now(job_id, 'failed', error=error_detail)
         
         raise HTTPException(status_code=500, detail=error_detail['message'])
 
 
+def _sse_event(event: str, data: Dict[str, Any]) -> bytes:
+    """Encode one server-sent event"""
+    return b"event: " + event.encode() + b"\ndata: " + dumps_json(data) + b"\n\n"
+
+
+@app.post("/narrative/stream")
+async def stream_narrative(request: NarrativeStreamRequest):
+    """
+    Stream narrative sections as server-sent events
+    
+    Takes the statistics returned by /analyze and emits a 'section' event
+    ({section, text}) as soon as each of summary, keyFindings and
+    recommendations is complete, then 'done'. A narrative /analyze already
+    generated for the same audience is replayed from the narrative cache.
+    A failure after the stream has started is reported as an 'error' event,
+    since the status code is already sent.
+    """
+    try:
+        narrative_gen = get_narrative_generator()
+    except Exception as e:
+        logger.error("Narrative generator unavailable: %s", e)
+        raise HTTPException(status_code=500, detail=f"Failed to generate narrative: {str(e)}")
+    
+    sections = narrative_gen.generate_sections_stream(
+        request.statistics, request.metadata, request.audienceLevel
+    )
+    
+    # A plain generator: Starlette iterates it in the threadpool, so the
+    # blocking Gemini stream never stalls the event loop
+    def events():
+        try:
+            for name, text in sections:
+                yield _sse_event('section', {'section': name, 'text': text})
+        except Exception as e:
+            logger.error("Narrative streaming failed: %s", e, exc_info=True)
+            yield _sse_event('error', {'message': f"Failed to generate narrative: {str(e)}"})
+            return
+        yield _sse_event('done', {})
+    
+    return StreamingResponse(events(), media_type='text/event-stream')
+
+
 if __name__ == "__main__":
     import uvicorn
     port = int(os.getenv("PORT", "8000"))
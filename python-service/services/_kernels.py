@@ -0,0 +1,473 @@
+"""
+Numeric kernels for the statistical analysis engine
+JIT-compiled with Numba when available, with NumPy fallbacks otherwise
+Blocks may be float32 or float64; accumulation is always float64
+"""
+
+import os
+import threading
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+from typing import Optional, Tuple
+from scipy import stats
+try:
+    import numba
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+
+# Size dispatch, in cells (rows x columns). The kernels are compiled at import,
+# so small blocks pay no JIT cost and always take the Numba path. On large
+# blocks the IQR kernel's per-column sort loses to NumPy's selection-based
+# quantiles, and the pairwise Pearson loop to pandas' corr.
+_IQR_JIT_MAX_CELLS = 10_000
+_PEARSON_JIT_MAX_CELLS = 200_000
+
+# Parallel kernels are launched one at a time: the workqueue threading layer
+# (used when neither TBB nor OpenMP is installed) aborts on concurrent launches
+_LAUNCH_LOCK = threading.Lock()
+
+# Fast-math without 'nnan'/'ninf' (keeps NaN checks) or 'arcp' (keeps exact means)
+_FASTMATH = {'contract', 'reassoc'}
+
+
+@lru_cache(maxsize=32)
+def triu_pairs(n_cols: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Cached (read-only) row/column indices of the strict upper triangle for n_cols columns"""
+    rows, cols = np.triu_indices(n_cols, k=1)
+    rows.flags.writeable = False
+    cols.flags.writeable = False
+    return rows, cols
+
+
+def _iqr_outliers_numpy(arr: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Per-column Q1/Q3 and IQR outlier mask, ignoring NaN"""
+    q1, q3 = np.nanquantile(arr, [0.25, 0.75], axis=0)
+    iqr = q3 - q1
+    mask = (arr < q1 - 1.5 * iqr) | (arr > q3 + 1.5 * iqr)  # NaN compares False
+    return q1, q3, mask
+
+
+def _zscore_mask_numpy(arr: np.ndarray, means: np.ndarray, stds: np.ndarray,
+                      threshold: float) -> np.ndarray:
+    """|z| > threshold mask from per-column mean and std; NaN and zero-std columns never flag"""
+    with np.errstate(invalid='ignore'):
+        # |x - mean| > threshold * std avoids a division per cell (same test as |z| > threshold)
+        return (np.abs(arr - means) > threshold * stds) & (stds > 0)
+
+
+def _pearson_upper_numpy(arr: np.ndarray) -> np.ndarray:
+    """Pairwise-complete Pearson coefficients for the upper triangle (i < j)"""
+    matrix = pd.DataFrame(arr).corr(method='pearson').to_numpy()
+    rows, cols = triu_pairs(arr.shape[1])
+    return matrix[rows, cols]
+
+
+def _column_moments_numpy(arr: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Per-column mean, sample std, biased skewness and excess kurtosis, ignoring NaN"""
+    counts = (~np.isnan(arr)).sum(axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        means = np.nansum(arr, axis=0) / counts
+        stds = np.sqrt(np.nansum((arr - means) ** 2, axis=0) / (counts - 1))
+    stds[counts < 2] = np.nan
+    skews = np.asarray(stats.skew(arr, axis=0, nan_policy='omit'), dtype=np.float64)
+    kurts = np.asarray(stats.kurtosis(arr, axis=0, nan_policy='omit'), dtype=np.float64)
+    return means, stds, skews, kurts
+
+
+def _linreg_batched_numpy(t: np.ndarray, Y: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Closed-form simple linear regression of every column of Y against t"""
+    mask = ~np.isnan(Y) & ~np.isnan(t)[:, None]
+    counts = np.maximum(mask.sum(axis=0), 1)
+    
+    t_mean = np.where(mask, t[:, None], 0.0).sum(axis=0) / counts
+    y_mean = np.where(mask, Y, 0.0).sum(axis=0) / counts
+    
+    dt = np.where(mask, t[:, None] - t_mean, 0.0)
+    dy = np.where(mask, Y - y_mean, 0.0)
+    sxx = (dt * dt).sum(axis=0)
+    sxy = (dt * dy).sum(axis=0)
+    syy = (dy * dy).sum(axis=0)
+    
+    with np.errstate(divide='ignore', invalid='ignore'):
+        slopes = np.where(sxx > 0, sxy / sxx, 0.0)
+        # A constant series is perfectly explained by a flat line
+        r_squared = np.where(syy > 0, np.where(sxx > 0, sxy * sxy / (sxx * syy), 0.0), 1.0)
+    intercepts = y_mean - slopes * t_mean
+    
+    return slopes, intercepts, r_squared
+
+
+def _window_slopes_numpy(x: np.ndarray, y: np.ndarray, starts: np.ndarray, window_size: int) -> np.ndarray:
+    """Least-squares slope of y on x over each window [start, start + window_size)"""
+    idx = starts[:, None] + np.arange(window_size)
+    xw = x[idx]
+    yw = y[idx]
+    dx = xw - xw.mean(axis=1, keepdims=True)
+    dy = yw - yw.mean(axis=1, keepdims=True)
+    sxx = (dx * dx).sum(axis=1)
+    sxy = (dx * dy).sum(axis=1)
+    
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(sxx > 0, sxy / sxx, 0.0)
+
+
+def _change_point_slopes_numpy(x: np.ndarray, y: np.ndarray, window_size: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Slopes of the windows either side of every candidate change point"""
+    indices = np.arange(window_size, len(x) - window_size, window_size, dtype=np.int64)
+    slopes_before = _window_slopes_numpy(x, y, indices - window_size, window_size)
+    slopes_after = _window_slopes_numpy(x, y, indices, window_size)
+    return indices, slopes_before, slopes_after
+
+
+if NUMBA_AVAILABLE:
+    @njit(cache=True, fastmath=_FASTMATH)
+    def _sorted_quantile(sorted_values, n, q):
+        """Linear-interpolated quantile of the first n entries of a sorted buffer"""
+        h = (n - 1) * q
+        lo = int(np.floor(h))
+        hi = min(lo + 1, n - 1)
+        return sorted_values[lo] + (h - lo) * (sorted_values[hi] - sorted_values[lo])
+    
+    @njit(['Tuple((f8[:], f8[:], b1[:, :]))(f8[:, :])', 'Tuple((f8[:], f8[:], b1[:, :]))(f4[:, :])'], cache=True, fastmath=_FASTMATH, parallel=True)
+    def _iqr_outliers_jit(arr):
+        n_rows, n_cols = arr.shape
+        q1 = np.full(n_cols, np.nan)
+        q3 = np.full(n_cols, np.nan)
+        mask = np.zeros((n_rows, n_cols), dtype=np.bool_)
+        
+        for j in prange(n_cols):
+            buffer = np.empty(n_rows)
+            n = 0
+            for i in range(n_rows):
+                value = arr[i, j]
+                if not np.isnan(value):
+                    buffer[n] = value
+                    n += 1
+            if n == 0:
+                continue
+            
+            sorted_values = np.sort(buffer[:n])
+            q1[j] = _sorted_quantile(sorted_values, n, 0.25)
+            q3[j] = _sorted_quantile(sorted_values, n, 0.75)
+            iqr = q3[j] - q1[j]
+            lower = q1[j] - 1.5 * iqr
+            upper = q3[j] + 1.5 * iqr
+            
+            for i in range(n_rows):
+                value = arr[i, j]
+                mask[i, j] = value < lower or value > upper
+        
+        return q1, q3, mask
+    
+    @njit(['b1[:, :](f8[:, :], f8[:], f8[:], f8)', 'b1[:, :](f4[:, :], f8[:], f8[:], f8)'], cache=True, fastmath=_FASTMATH, parallel=True)
+    def _zscore_mask_jit(arr, means, stds, threshold):
+        n_rows, n_cols = arr.shape
+        mask = np.zeros((n_rows, n_cols), dtype=np.bool_)
+        
+        for j in prange(n_cols):
+            std = stds[j]
+            if std > 0:
+                # Compare deviations against threshold * std: one multiply per
+                # column instead of a division per row
+                mean = means[j]
+                limit = threshold * std
+                for i in range(n_rows):
+                    # NaN compares False
+                    mask[i, j] = abs(arr[i, j] - mean) > limit
+        
+        return mask
+    
+    @njit(['f8[:](f8[:, :])', 'f8[:](f4[:, :])'], cache=True, fastmath=_FASTMATH, parallel=True)
+    def _pearson_upper_jit(arr):
+        n_rows, n_cols = arr.shape
+        coefs = np.full(n_cols * (n_cols - 1) // 2, np.nan)
+        
+        for a in prange(n_cols):
+            # Offset of pair (a, a + 1) in np.triu_indices(n_cols, k=1) order
+            k = a * n_cols - a * (a + 1) // 2
+            for b in range(a + 1, n_cols):
+                # Pairwise-complete observations, two passes for numerical stability
+                n = 0
+                sum_a = 0.0
+                sum_b = 0.0
+                for i in range(n_rows):
+                    x = arr[i, a]
+                    y = arr[i, b]
+                    if not (np.isnan(x) or np.isnan(y)):
+                        n += 1
+                        sum_a += x
+                        sum_b += y
+                
+                if n >= 2:
+                    mean_a = sum_a / n
+                    mean_b = sum_b / n
+                    saa = 0.0
+                    sbb = 0.0
+                    sab = 0.0
+                    for i in range(n_rows):
+                        x = arr[i, a]
+                        y = arr[i, b]
+                        if not (np.isnan(x) or np.isnan(y)):
+                            dx = x - mean_a
+                            dy = y - mean_b
+                            saa += dx * dx
+                            sbb += dy * dy
+                            sab += dx * dy
+                    if saa > 0 and sbb > 0:
+                        coefs[k] = max(-1.0, min(1.0, sab / np.sqrt(saa * sbb)))
+                k += 1
+        
+        return coefs
+    
+    @njit(['Tuple((f8[:], f8[:], f8[:], f8[:]))(f8[:, :])', 'Tuple((f8[:], f8[:], f8[:], f8[:]))(f4[:, :])'], cache=True, fastmath=_FASTMATH, parallel=True)
+    def _column_moments_jit(arr):
+        n_rows, n_cols = arr.shape
+        means = np.full(n_cols, np.nan)
+        stds = np.full(n_cols, np.nan)
+        skews = np.full(n_cols, np.nan)
+        kurts = np.full(n_cols, np.nan)
+        
+        for j in prange(n_cols):
+            n = 0
+            total = 0.0
+            for i in range(n_rows):
+                if not np.isnan(arr[i, j]):
+                    n += 1
+                    total += arr[i, j]
+            if n == 0:
+                continue
+            
+            mean = total / n
+            means[j] = mean
+            m2 = 0.0
+            m3 = 0.0
+            m4 = 0.0
+            for i in range(n_rows):
+                if not np.isnan(arr[i, j]):
+                    d = arr[i, j] - mean
+                    d2 = d * d
+                    m2 += d2
+                    m3 += d2 * d
+                    m4 += d2 * d2
+            if n > 1:
+                stds[j] = np.sqrt(m2 / (n - 1))
+            m2 /= n
+            m3 /= n
+            m4 /= n
+            
+            # Same near-constant guard as scipy.stats.skew/kurtosis
+            if m2 > (1e-15 * mean) ** 2:
+                skews[j] = m3 / m2 ** 1.5
+                kurts[j] = m4 / (m2 * m2) - 3.0
+        
+        return means, stds, skews, kurts
+    
+    @njit(['Tuple((f8[:], f8[:], f8[:]))(f8[:], f8[:, :])', 'Tuple((f8[:], f8[:], f8[:]))(f8[:], f4[:, :])'], cache=True, fastmath=_FASTMATH, parallel=True)
+    def _linreg_batched_jit(t, Y):
+        n_rows, n_cols = Y.shape
+        slopes = np.zeros(n_cols)
+        intercepts = np.zeros(n_cols)
+        r_squared = np.ones(n_cols)
+        
+        for j in prange(n_cols):
+            n = 0
+            sum_t = 0.0
+            sum_y = 0.0
+            for i in range(n_rows):
+                if not (np.isnan(t[i]) or np.isnan(Y[i, j])):
+                    n += 1
+                    sum_t += t[i]
+                    sum_y += Y[i, j]
+            if n == 0:
+                continue
+            
+            t_mean = sum_t / n
+            y_mean = sum_y / n
+            sxx = 0.0
+            sxy = 0.0
+            syy = 0.0
+            for i in range(n_rows):
+                if not (np.isnan(t[i]) or np.isnan(Y[i, j])):
+                    dt = t[i] - t_mean
+                    dy = Y[i, j] - y_mean
+                    sxx += dt * dt
+                    sxy += dt * dy
+                    syy += dy * dy
+            
+            if sxx > 0:
+                slopes[j] = sxy / sxx
+            if syy > 0:
+                # A constant series is perfectly explained by a flat line
+                r_squared[j] = sxy * sxy / (sxx * syy) if sxx > 0 else 0.0
+            intercepts[j] = y_mean - slopes[j] * t_mean
+        
+        return slopes, intercepts, r_squared
+    
+    @njit(cache=True, fastmath=_FASTMATH, nogil=True)
+    def _window_slope(x, y, start, stop):
+        """Least-squares slope of y on x over x[start:stop], two passes for numerical stability"""
+        n = stop - start
+        sum_x = 0.0
+        sum_y = 0.0
+        for i in range(start, stop):
+            sum_x += x[i]
+            sum_y += y[i]
+        x_mean = sum_x / n
+        y_mean = sum_y / n
+        
+        sxx = 0.0
+        sxy = 0.0
+        for i in range(start, stop):
+            dx = x[i] - x_mean
+            sxx += dx * dx
+            sxy += dx * (y[i] - y_mean)
+        return sxy / sxx if sxx > 0 else 0.0
+    
+    @njit('Tuple((i8[:], f8[:], f8[:]))(f8[:], f8[:], i8)', cache=True, fastmath=_FASTMATH, nogil=True)
+    def _change_point_slopes_jit(x, y, window_size):
+        indices = np.arange(window_size, len(x) - window_size, window_size)
+        slopes_before = np.empty(len(indices))
+        slopes_after = np.empty(len(indices))
+        
+        for k in range(len(indices)):
+            i = indices[k]
+            slopes_before[k] = _window_slope(x, y, i - window_size, i)
+            slopes_after[k] = _window_slope(x, y, i, i + window_size)
+        
+        return indices, slopes_before, slopes_after
+
+
+def _as_float(arr: np.ndarray) -> np.ndarray:
+    """Pass float32/float64 blocks through unchanged, upcast anything else to float64"""
+    if arr.dtype in (np.float32, np.float64):
+        return arr
+    return arr.astype(np.float64)
+
+
+def _use_jit(arr: np.ndarray, max_cells: Optional[int] = None) -> bool:
+    """Pick the Numba kernel or the NumPy path for a block of this size (rows x columns)"""
+    return NUMBA_AVAILABLE and (max_cells is None or arr.size <= max_cells)
+
+
+def _set_threads(n_cols: int):
+    """Use at most one Numba thread per column"""
+    numba.set_num_threads(max(1, min(os.cpu_count() or 1, numba.config.NUMBA_NUM_THREADS, n_cols)))
+
+
+def iqr_outliers(arr: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Compute per-column quartiles and the 1.5 * IQR outlier mask
+    
+    Args:
+        arr: 2-D float32/float64 array (rows x columns), may contain NaN
+        
+    Returns:
+        Tuple of (q1, q3, outlier_mask)
+    """
+    if _use_jit(arr, _IQR_JIT_MAX_CELLS):
+        with _LAUNCH_LOCK:
+            _set_threads(arr.shape[1])
+            return _iqr_outliers_jit(_as_float(arr))
+    return _iqr_outliers_numpy(np.asarray(arr, dtype=np.float64))
+
+
+def zscore_outliers(arr: np.ndarray, threshold: float = 3.0,
+                    moments: Optional[Tuple[np.ndarray, np.ndarray]] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Compute per-column mean, sample standard deviation and the |z| > threshold mask
+    
+    Args:
+        arr: 2-D float32/float64 array (rows x columns), may contain NaN
+        threshold: Absolute z-score above which a value is an outlier
+        moments: Optional (means, stds) of arr from column_moments, so only
+            the mask pass runs
+        
+    Returns:
+        Tuple of (means, stds, outlier_mask); no outliers where std is 0 or NaN
+    """
+    means, stds = moments if moments is not None else column_moments(arr)[:2]
+    if _use_jit(arr):
+        with _LAUNCH_LOCK:
+            _set_threads(arr.shape[1])
+            return means, stds, _zscore_mask_jit(_as_float(arr), means, stds, float(threshold))
+    return means, stds, _zscore_mask_numpy(np.asarray(arr, dtype=np.float64), means, stds, threshold)
+
+
+def pearson_upper(arr: np.ndarray) -> np.ndarray:
+    """
+    Compute pairwise-complete Pearson coefficients for all column pairs i < j
+    
+    Args:
+        arr: 2-D float32/float64 array (rows x columns), may contain NaN
+        
+    Returns:
+        1-D array ordered like np.triu_indices(n_columns, k=1)
+    """
+    if _use_jit(arr, _PEARSON_JIT_MAX_CELLS):
+        with _LAUNCH_LOCK:
+            _set_threads(arr.shape[1])
+            return _pearson_upper_jit(_as_float(arr))
+    return _pearson_upper_numpy(np.asarray(arr, dtype=np.float64))
+
+
+def column_moments(arr: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Compute per-column mean, sample standard deviation (ddof=1), biased skewness
+    and excess (Fisher) kurtosis together
+    
+    Args:
+        arr: 2-D float32/float64 array (rows x columns), may contain NaN
+        
+    Returns:
+        Tuple of (means, stds, skewness, kurtosis); NaN for empty columns, std NaN
+        below 2 values, skewness and kurtosis NaN for constant columns
+    """
+    if _use_jit(arr):
+        with _LAUNCH_LOCK:
+            _set_threads(arr.shape[1])
+            return _column_moments_jit(_as_float(arr))
+    return _column_moments_numpy(np.asarray(arr, dtype=np.float64))
+
+
+def linreg_batched(t: np.ndarray, Y: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Fit a simple linear regression of every column of Y against t
+    
+    Args:
+        t: 1-D float64 time values, may contain NaN
+        Y: 2-D float32/float64 array (rows x columns), may contain NaN
+        
+    Returns:
+        Tuple of (slopes, intercepts, r_squared)
+    """
+    if _use_jit(Y):
+        with _LAUNCH_LOCK:
+            _set_threads(Y.shape[1])
+            return _linreg_batched_jit(np.asarray(t, dtype=np.float64), _as_float(Y))
+    return _linreg_batched_numpy(np.asarray(t, dtype=np.float64), np.asarray(Y, dtype=np.float64))
+
+
+def change_point_slopes(x: np.ndarray, y: np.ndarray, window_size: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Fit the windows before and after every candidate change point of a series
+    
+    Candidates are every window_size-th index in [window_size, len - window_size);
+    each is compared on the window_size points before it and the window_size points from it.
+    
+    Args:
+        x: 1-D float64 positions without NaN
+        y: 1-D float64 values without NaN, same length as x
+        window_size: Points per window, at least 2
+        
+    Returns:
+        Tuple of (candidate_indices, slopes_before, slopes_after)
+    """
+    x = np.ascontiguousarray(x, dtype=np.float64)
+    y = np.ascontiguousarray(y, dtype=np.float64)
+    if NUMBA_AVAILABLE:
+        return _change_point_slopes_jit(x, y, int(window_size))
+    return _change_point_slopes_numpy(x, y, int(window_size))
@@ -5,10 +5,9 @@ Performs trend detection, correlation analysis, distribution analysis, etc.
 
 import pandas as pd
 import numpy as np
-from typing import Dict, List, Any, Optional, Tuple
+from typing import Dict, List, Any, Optional, Tuple, Callable
 from scipy import stats
 from sklearn.linear_model import LinearRegression
-from sklearn.preprocessing import PolynomialFeatures
 from sklearn.ensemble import IsolationForest
 try:
     from statsmodels.tsa.seasonal import seasonal_decompose
@@ -17,14 +16,162 @@ try:
 except ImportError:
     STATSMODELS_AVAILABLE = False
 import warnings
+import heapq
+from operator import itemgetter
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from services._kernels import iqr_outliers, zscore_outliers, pearson_upper, column_moments, linreg_batched, change_point_slopes, triu_pairs
 warnings.filterwarnings('ignore')
 
 
+def _numeric_block(df: pd.DataFrame, numeric_cols: List[str],
+                   numeric_arr: Optional[np.ndarray] = None,
+                   downcast: bool = False) -> np.ndarray:
+    """
+    Return df[numeric_cols] as a float ndarray (NaN for missing), reusing numeric_arr if given
+    
+    With downcast=True the block is stored as float32 when that is lossless
+    (e.g. integer-valued columns below 2**24), halving the memory traffic of
+    every kernel that reads it while leaving all reported values unchanged.
+    """
+    if numeric_arr is not None:
+        return numeric_arr
+    arr = df[numeric_cols].to_numpy(dtype=np.float64, na_value=np.nan)
+    if downcast:
+        arr32 = arr.astype(np.float32)
+        if np.array_equal(arr32, arr, equal_nan=True):
+            return arr32
+    return arr
+
+
+def _valid_counts(arr: np.ndarray, valid_counts: Optional[np.ndarray] = None) -> np.ndarray:
+    """Per-column count of non-NaN values, reusing valid_counts if given"""
+    if valid_counts is not None:
+        return valid_counts
+    return arr.shape[0] - np.isnan(arr).sum(axis=0)
+
+
+def _sorted_quantiles(sorted_block: np.ndarray, counts: np.ndarray, qs: List[float]) -> np.ndarray:
+    """
+    Per-column quantiles of a block already sorted along axis 0 with NaN last
+    
+    Uses numpy's default linear interpolation (same lerp as np.quantile), so
+    the results match np.nanquantile; NaN for columns without values.
+    
+    Returns:
+        Array of shape (len(qs), n_columns)
+    """
+    counts = np.asarray(counts, dtype=np.int64)
+    columns = np.arange(sorted_block.shape[1])
+    last = np.maximum(counts - 1, 0)
+    
+    quantiles = np.empty((len(qs), sorted_block.shape[1]))
+    for k, q in enumerate(qs):
+        virtual_index = last * q
+        lower = np.floor(virtual_index).astype(np.int64)
+        upper = np.minimum(lower + 1, last)
+        gamma = virtual_index - lower
+        a = sorted_block[lower, columns]
+        b = sorted_block[upper, columns]
+        diff = b - a
+        quantiles[k] = np.where(gamma >= 0.5, b - diff * (1 - gamma), a + diff * gamma)
+    quantiles[:, counts == 0] = np.nan
+    
+    return quantiles
+
+
+def _index_labels(index: pd.Index, positions: np.ndarray) -> List[Any]:
+    """
+    Index labels at integer positions as Python objects
+    
+    Numeric and object labels are read straight from the backing array instead
+    of building an intermediate Index; other dtypes (e.g. datetimes) keep
+    pandas' own boxing so the reported labels are unchanged.
+    """
+    if isinstance(index.dtype, np.dtype) and index.dtype.kind in 'iufbO':
+        return index.to_numpy()[positions].tolist()
+    return index[positions].tolist()
+
+
+def _histogram_bin_count(n: int, iqr: float, data_range: float, max_bins: int = 30) -> int:
+    """Freedman-Diaconis bin count, clamped to [5, max_bins] (10 when the IQR is zero)"""
+    if iqr > 0:
+        bin_width = 2 * iqr / (n ** (1/3))
+        n_bins = int(np.ceil(data_range / bin_width))
+        return min(max(n_bins, 5), max_bins)  # Between 5 and max_bins
+    return 10
+
+
+def _pair_counts(mask: np.ndarray) -> np.ndarray:
+    """
+    Pairwise co-observation counts (mask.T @ mask) as float64
+    
+    float32 represents every count below 2**24 exactly, so the product runs in
+    single precision (half the memory traffic) whenever the row count allows.
+    """
+    dtype = np.float32 if len(mask) < 2 ** 24 else np.float64
+    valid = mask.astype(dtype)
+    return (valid.T @ valid).astype(np.float64)
+
+
+def _pairwise_pearson(arr: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Pairwise-complete Pearson matrix from NaN-mask matrix products
+    
+    Columns are centered on their own means first so the raw-moment
+    formulas below do not cancel catastrophically.
+    
+    Returns:
+        Tuple of (pearson_matrix, pair_counts); NaN where a column is constant
+    """
+    arr = np.asarray(arr, dtype=np.float64)
+    mask = ~np.isnan(arr)
+    valid = mask.astype(np.float64)
+    column_means = np.where(mask, arr, 0.0).sum(axis=0) / np.maximum(valid.sum(axis=0), 1)
+    centered = np.where(mask, arr - column_means, 0.0)
+    
+    # Entry [i, j] sums column i over the rows where column j is also present
+    n_pair = _pair_counts(mask)
+    sum_pair = centered.T @ valid
+    sum_sq_pair = (centered * centered).T @ valid
+    sum_prod = centered.T @ centered
+    
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cov = sum_prod - sum_pair * sum_pair.T / n_pair
+        var = sum_sq_pair - sum_pair * sum_pair / n_pair
+        denom = var * var.T
+        pearson = np.where((n_pair >= 2) & (var > 0) & (var.T > 0), cov / np.sqrt(denom), np.nan)
+    np.clip(pearson, -1.0, 1.0, out=pearson)
+    
+    # Self-correlation is exactly 1 for any non-constant column
+    diagonal = np.diagonal(pearson).copy()
+    np.fill_diagonal(pearson, np.where(np.isnan(diagonal), np.nan, 1.0))
+    
+    return pearson, n_pair
+
+
+def _spearman_matrix(arr: np.ndarray) -> np.ndarray:
+    """
+    Pairwise-complete Spearman matrix
+    
+    Without missing values each column is ranked once and correlated as a
+    block; otherwise pandas re-ranks every pair on its complete rows.
+    """
+    if np.isnan(arr).any():
+        return pd.DataFrame(arr).corr(method='spearman').to_numpy()
+    return _pairwise_pearson(stats.rankdata(arr, method='average', axis=0))[0]
+
+
 class TrendDetector:
     """Identifies temporal patterns in data with advanced trend detection"""
     
+    def __init__(self, max_workers: int = 4):
+        self.max_workers = max_workers
+    
     def detect_trends(self, df: pd.DataFrame, numeric_cols: List[str], 
-                     datetime_cols: List[str]) -> List[Dict[str, Any]]:
+                     datetime_cols: List[str],
+                     numeric_arr: Optional[np.ndarray] = None,
+                     valid_counts: Optional[np.ndarray] = None) -> List[Dict[str, Any]]:
         """
         Identify trends in numeric columns over time with advanced analysis
         
@@ -32,6 +179,8 @@ class TrendDetector:
             df: pandas DataFrame
             numeric_cols: List of numeric column names
             datetime_cols: List of datetime column names
+            numeric_arr: Optional float block of df[numeric_cols] shared across analyzers
+            valid_counts: Optional per-column non-missing counts of that block
             
         Returns:
             List of trend analysis results with advanced metrics
@@ -45,82 +194,136 @@ class TrendDetector:
         time_col = datetime_cols[0]
         
         # Convert datetime to numeric (days since first date)
-        df_sorted = df.sort_values(time_col)
-        time_numeric = (df_sorted[time_col] - df_sorted[time_col].min()).dt.total_seconds() / 86400
+        time_series = df[time_col]
+        time_days = ((time_series - time_series.min()).dt.total_seconds() / 86400).to_numpy(dtype=np.float64)
+        
+        # Fit linear trends for all numeric columns in one vectorized solve
+        # (least squares is order-independent, so the unsorted block can be used)
+        arr = _numeric_block(df, numeric_cols, numeric_arr)
+        slopes, intercepts, r_squared = linreg_batched(time_days, arr)
+        valid_counts = _valid_counts(arr, valid_counts)
+        nan_frac = (len(arr) - valid_counts) / len(arr)
+        
+        # Sort only the time axis and the numeric block, not the whole DataFrame (NaT last)
+        # and build the sorted time index once; columns take boolean subsets of it
+        order = np.argsort(time_days, kind='stable')
+        sorted_index = pd.DatetimeIndex(time_series.array[order])
+        time_days = time_days[order]
+        Y = arr[order]
+        
+        # Columns with every value present share one time index, so decompose them together
+        seasonal_results = {}
+        if not np.isnan(time_days).any():
+            complete = np.flatnonzero(np.isfinite(Y).all(axis=0))
+            if len(complete):
+                batch = self._batch_seasonal(Y[:, complete], sorted_index)
+                seasonal_results = dict(zip(complete, batch))
+        
+        # Other columns missing the same rows share a time index, so infer its period once
+        periods = {}
+        
+        # Skip columns with too many missing values
+        columns = [j for j in range(len(numeric_cols)) if nan_frac[j] <= 0.3]
+        
+        # Columns are independent; BLAS, statsmodels' filters and the change-point
+        # kernel release the GIL, so fan them out over a thread pool
+        analyze_column = partial(
+            self._analyze_column, numeric_cols=numeric_cols, time_col=time_col,
+            time_days=time_days, Y=Y, sorted_index=sorted_index,
+            fits=(slopes, intercepts, r_squared),
+            seasonal_results=seasonal_results, periods=periods
+        )
+        if self.max_workers > 1 and len(columns) > 1:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(columns))) as executor:
+                results = list(executor.map(analyze_column, columns))
+        else:
+            results = [analyze_column(j) for j in columns]
         
-        for num_col in numeric_cols:
-            # Skip if too many missing values
-            if df_sorted[num_col].isna().sum() / len(df_sorted) > 0.3:
-                continue
-            
-            # Prepare data
-            valid_mask = ~(df_sorted[num_col].isna() | time_numeric.isna())
-            X = time_numeric[valid_mask].values.reshape(-1, 1)
-            y = df_sorted[num_col][valid_mask].values
-            time_index = df_sorted[time_col][valid_mask]
-            
-            if len(X) < 3:
-                continue
-            
-            # Linear trend analysis
-            linear_result = self._fit_linear_trend(X, y)
-            
-            # Polynomial trend analysis
-            polynomial_result = self._fit_polynomial_trend(X, y)
-            
-            # Moving averages
-            moving_averages = self._calculate_moving_averages(y, time_index)
-            
-            # Seasonal decomposition (if enough data)
-            seasonal_result = self._detect_seasonality(y, time_index)
-            
-            # Change point detection
-            change_points = self._detect_change_points(X, y)
-            
-            # Year-over-year growth (if applicable)
-            yoy_growth = self._calculate_yoy_growth(y, time_index)
-            
-            # Determine direction
-            slope = linear_result['slope']
-            y_std = np.std(y)
-            if y_std == 0 or abs(slope) < 0.01 * max(y_std, 1):
-                direction = 'stable'
-            elif slope > 0:
-                direction = 'increasing'
-            else:
-                direction = 'decreasing'
-            
-            trend_data = {
-                'column': num_col,
-                'time_column': time_col,
-                'direction': direction,
-                'slope': float(slope),
-                'r_squared': float(linear_result['r_squared']),
-                'strength': 'strong' if linear_result['r_squared'] > 0.7 else 'moderate' if linear_result['r_squared'] > 0.4 else 'weak',
-                'intercept': float(linear_result['intercept']),
-                'confidence_interval': linear_result['confidence_interval'],
-                'polynomial': polynomial_result,
-                'moving_averages': moving_averages,
-                'change_points': change_points,
-            }
-            
-            if seasonal_result:
-                trend_data['seasonal'] = seasonal_result
-            
-            if yoy_growth:
-                trend_data['yoy_growth'] = yoy_growth
-            
-            trends.append(trend_data)
+        trends = [trend for trend in results if trend is not None]
         
         return trends
     
-    def _fit_linear_trend(self, X: np.ndarray, y: np.ndarray) -> Dict[str, Any]:
-        """Fit linear regression with confidence intervals"""
-        model = LinearRegression()
-        model.fit(X, y)
+    def _analyze_column(self, j: int, numeric_cols: List[str], time_col: str,
+                        time_days: np.ndarray, Y: np.ndarray, sorted_index: pd.DatetimeIndex,
+                        fits: Tuple[np.ndarray, np.ndarray, np.ndarray],
+                        seasonal_results: Dict[int, Optional[Dict[str, Any]]],
+                        periods: Dict[bytes, Optional[int]]) -> Optional[Dict[str, Any]]:
+        """Run the per-column trend analysis for column j of the time-sorted block"""
+        num_col = numeric_cols[j]
+        slopes, intercepts, r_squared = fits
+        
+        # Prepare data
+        valid_mask = ~(np.isnan(Y[:, j]) | np.isnan(time_days))
+        X = time_days[valid_mask].reshape(-1, 1)
+        y = Y[valid_mask, j].astype(np.float64)
+        
+        if len(X) < 3:
+            return None
+        
+        # Linear trend analysis
+        linear_result = self._fit_linear_trend(X, y, slopes[j], intercepts[j], r_squared[j])
+        
+        # Polynomial trend analysis
+        polynomial_result = self._fit_polynomial_trend(X, y, linear_r_squared=r_squared[j])
+        
+        # Moving averages
+        moving_averages = self._calculate_moving_averages(y)
+        
+        # Seasonal decomposition (if enough data)
+        if j in seasonal_results:
+            seasonal_result = seasonal_results[j]
+        else:
+            time_index = sorted_index[valid_mask]
+            key = np.packbits(valid_mask).tobytes()
+            if key not in periods:
+                periods[key] = self._seasonal_period(time_index)
+            seasonal_result = None
+            if periods[key] is not None:
+                seasonal_result = self._detect_seasonality(y, time_index, periods[key])
+        
+        # Change point detection
+        change_points = self._detect_change_points(X, y)
+        
+        # Year-over-year growth (if applicable)
+        yoy_growth = self._calculate_yoy_growth(y)
+        
+        # Determine direction
+        slope = linear_result['slope']
+        y_std = np.std(y)
+        if y_std == 0 or abs(slope) < 0.01 * max(y_std, 1):
+            direction = 'stable'
+        elif slope > 0:
+            direction = 'increasing'
+        else:
+            direction = 'decreasing'
+        
+        trend_data = {
+            'column': num_col,
+            'time_column': time_col,
+            'direction': direction,
+            'slope': float(slope),
+            'r_squared': float(linear_result['r_squared']),
+            'strength': 'strong' if linear_result['r_squared'] > 0.7 else 'moderate' if linear_result['r_squared'] > 0.4 else 'weak',
+            'intercept': float(linear_result['intercept']),
+            'confidence_interval': linear_result['confidence_interval'],
+            'polynomial': polynomial_result,
+            'moving_averages': moving_averages,
+            'change_points': change_points,
+        }
         
+        if seasonal_result:
+            trend_data['seasonal'] = seasonal_result
+        
+        if yoy_growth:
+            trend_data['yoy_growth'] = yoy_growth
+        
+        return trend_data
+    
+    def _fit_linear_trend(self, X: np.ndarray, y: np.ndarray, slope: float,
+                          intercept: float, r_squared: float) -> Dict[str, Any]:
+        """Compute the 95% confidence band half-width around a fitted linear trend"""
         # Predictions
-        y_pred = model.predict(X)
+        y_pred = intercept + slope * X[:, 0]
         
         # Calculate residuals and standard error
         residuals = y - y_pred
@@ -133,121 +336,175 @@ class TrendDetector:
         se = np.sqrt(mse)
         margin = t_val * se
         
-        ci_lower = (y_pred - margin).tolist()
-        ci_upper = (y_pred + margin).tolist()
-        
+        # The band is intercept + slope * x +- margin at every point, so send the
+        # half-width instead of two length-n bound arrays
         return {
-            'slope': float(model.coef_[0]),
-            'intercept': float(model.intercept_),
-            'r_squared': float(model.score(X, y)),
+            'slope': float(slope),
+            'intercept': float(intercept),
+            'r_squared': float(r_squared),
             'confidence_interval': {
-                'lower': ci_lower,
-                'upper': ci_upper
+                'margin': float(margin),
+                'n': n
             }
         }
     
-    def _fit_polynomial_trend(self, X: np.ndarray, y: np.ndarray, degree: int = 2) -> Optional[Dict[str, Any]]:
+    def _fit_polynomial_trend(self, X: np.ndarray, y: np.ndarray, degree: int = 2,
+                              linear_r_squared: Optional[float] = None) -> Optional[Dict[str, Any]]:
         """Fit polynomial trend (degree 2 or 3)"""
         if len(X) < degree + 2:
             return None
         
         try:
-            # Try degree 2 polynomial
-            poly_features = PolynomialFeatures(degree=degree)
-            X_poly = poly_features.fit_transform(X)
-            
-            model = LinearRegression()
-            model.fit(X_poly, y)
-            
-            r_squared = model.score(X_poly, y)
+            # Vandermonde columns [x, x^2, ...] by repeated multiplication
+            x = X[:, 0]
+            X_poly = np.empty((len(x), degree))
+            X_poly[:, 0] = x
+            for k in range(1, degree):
+                X_poly[:, k] = X_poly[:, k - 1] * x
+            
+            # Least squares on centered columns, with the intercept absorbed by centering
+            X_centered = X_poly - X_poly.mean(axis=0)
+            y_centered = y - y.mean()
+            coef = np.linalg.lstsq(X_centered, y_centered, rcond=None)[0]
+            
+            ss_res = np.sum((y_centered - X_centered @ coef) ** 2)
+            ss_tot = np.sum(y_centered ** 2)
+            if ss_tot > 0:
+                r_squared = 1 - ss_res / ss_tot
+            else:
+                r_squared = 1.0 if ss_res == 0 else 0.0
             
             # Only return if polynomial fits significantly better than linear
-            linear_model = LinearRegression()
-            linear_model.fit(X, y)
-            linear_r_squared = linear_model.score(X, y)
+            if linear_r_squared is None:
+                linear_r_squared = linreg_batched(x, y[:, None])[2][0]
             
             if r_squared > linear_r_squared + 0.05:  # At least 5% improvement
                 return {
                     'degree': degree,
                     'r_squared': float(r_squared),
-                    'coefficients': model.coef_.tolist()
+                    # Bias column first, as with PolynomialFeatures (its weight is the intercept's job)
+                    'coefficients': [0.0] + coef.tolist()
                 }
         except Exception:
             pass
         
         return None
     
-    def _calculate_moving_averages(self, y: np.ndarray, time_index: pd.Series) -> Dict[str, List[float]]:
-        """Calculate moving averages for different periods"""
+    def _calculate_moving_averages(self, y: np.ndarray) -> Dict[str, np.ndarray]:
+        """Calculate trailing moving averages for different periods (partial windows at the start)"""
         moving_averages = {}
         
-        # Convert to pandas Series for rolling calculations
-        series = pd.Series(y, index=time_index)
+        # One cumulative sum serves every window; centering keeps the differences precise
+        offset = y.mean()
+        cumulative = np.concatenate(([0.0], np.cumsum(y - offset)))
         
         # Calculate for different windows (7, 30, 90 days)
         for window in [7, 30, 90]:
-            if len(series) >= window:
-                ma = series.rolling(window=window, min_periods=1).mean()
-                moving_averages[f'{window}d'] = ma.tolist()
+            if len(y) >= window:
+                ma = np.empty(len(y))
+                ma[:window] = cumulative[1:window + 1] / np.arange(1, window + 1)
+                ma[window:] = (cumulative[window + 1:] - cumulative[1:-window]) / window
+                moving_averages[f'{window}d'] = ma + offset
         
         return moving_averages
     
-    def _detect_seasonality(self, y: np.ndarray, time_index: pd.Series) -> Optional[Dict[str, Any]]:
-        """Detect seasonal patterns using seasonal decomposition"""
+    def _detect_seasonality(self, y: np.ndarray, time_index: pd.Series,
+                            period: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """Detect seasonal patterns using seasonal decomposition (period inferred unless given)"""
         if not STATSMODELS_AVAILABLE or len(y) < 14:  # Need at least 2 periods
             return None
         
         try:
-            # Create time series
-            series = pd.Series(y, index=time_index)
-            
-            # Infer frequency
-            freq = pd.infer_freq(time_index)
-            if freq is None:
-                # Try to set a reasonable period based on data length
-                if len(series) >= 365:
-                    period = 365  # Yearly seasonality
-                elif len(series) >= 30:
-                    period = 30  # Monthly seasonality
-                elif len(series) >= 7:
-                    period = 7  # Weekly seasonality
-                else:
-                    return None
-            else:
-                # Determine period based on frequency
-                if 'D' in freq:
-                    period = 7  # Weekly for daily data
-                elif 'W' in freq:
-                    period = 4  # Monthly for weekly data
-                elif 'M' in freq:
-                    period = 12  # Yearly for monthly data
-                else:
-                    period = min(len(series) // 2, 12)
+            if period is None:
+                period = self._seasonal_period(time_index)
             
             # Perform seasonal decomposition
-            if len(series) >= 2 * period:
+            if period is not None and len(y) >= 2 * period:
+                series = pd.Series(y, index=time_index)
                 decomposition = seasonal_decompose(series, model='additive', period=period, extrapolate_trend='freq')
-                
-                # Calculate strength of seasonality
-                seasonal_var = np.var(decomposition.seasonal.dropna())
-                residual_var = np.var(decomposition.resid.dropna())
-                
-                if residual_var > 0:
-                    seasonal_strength = seasonal_var / (seasonal_var + residual_var)
-                else:
-                    seasonal_strength = 0
-                
-                if seasonal_strength > 0.1:  # Significant seasonality
-                    return {
-                        'period': int(period),
-                        'strength': float(seasonal_strength),
-                        'pattern': decomposition.seasonal.head(period).tolist()
-                    }
+                return self._summarize_seasonality(decomposition.seasonal.to_numpy(),
+                                                   decomposition.resid.to_numpy(), period)
         except Exception:
             pass
         
         return None
     
+    def _batch_seasonal(self, block: np.ndarray, time_index: pd.DatetimeIndex) -> List[Optional[Dict[str, Any]]]:
+        """
+        Detect seasonality for several columns sharing one time index in a single decomposition
+        
+        Args:
+            block: 2-D array (rows x columns) without missing or infinite values
+            time_index: Sorted time index shared by every column
+            
+        Returns:
+            Seasonal result (or None) per column, as _detect_seasonality would give
+        """
+        n_cols = block.shape[1]
+        if not STATSMODELS_AVAILABLE or len(block) < 14:  # Need at least 2 periods
+            return [None] * n_cols
+        
+        try:
+            period = self._seasonal_period(time_index)
+            if period is None or len(block) < 2 * period:
+                return [None] * n_cols
+            
+            # seasonal_decompose filters every column of a 2-D input at once
+            decomposition = seasonal_decompose(np.asarray(block, dtype=np.float64), model='additive',
+                                               period=period, extrapolate_trend='freq')
+        except Exception:
+            return [self._detect_seasonality(block[:, j].astype(np.float64), time_index) for j in range(n_cols)]
+        
+        seasonal = decomposition.seasonal.reshape(len(block), n_cols)
+        resid = decomposition.resid.reshape(len(block), n_cols)
+        return [self._summarize_seasonality(seasonal[:, j], resid[:, j], period) for j in range(n_cols)]
+    
+    def _seasonal_period(self, time_index: pd.Series) -> Optional[int]:
+        """Pick a seasonal period from the inferred frequency or the series length (None if unusable)"""
+        # Infer frequency
+        try:
+            freq = pd.infer_freq(time_index)
+        except Exception:
+            return None  # Too few or unsortable timestamps
+        if freq is None:
+            # Try to set a reasonable period based on data length
+            if len(time_index) >= 365:
+                return 365  # Yearly seasonality
+            elif len(time_index) >= 30:
+                return 30  # Monthly seasonality
+            elif len(time_index) >= 7:
+                return 7  # Weekly seasonality
+            return None
+        
+        # Determine period based on frequency
+        if 'D' in freq:
+            return 7  # Weekly for daily data
+        elif 'W' in freq:
+            return 4  # Monthly for weekly data
+        elif 'M' in freq:
+            return 12  # Yearly for monthly data
+        return min(len(time_index) // 2, 12)
+    
+    def _summarize_seasonality(self, seasonal: np.ndarray, resid: np.ndarray,
+                               period: int) -> Optional[Dict[str, Any]]:
+        """Report a decomposition as seasonal when its seasonal strength is significant"""
+        # Calculate strength of seasonality
+        seasonal_var = np.var(seasonal[~np.isnan(seasonal)])
+        residual_var = np.var(resid[~np.isnan(resid)])
+        
+        if residual_var > 0:
+            seasonal_strength = seasonal_var / (seasonal_var + residual_var)
+        else:
+            seasonal_strength = 0
+        
+        if seasonal_strength > 0.1:  # Significant seasonality
+            return {
+                'period': int(period),
+                'strength': float(seasonal_strength),
+                'pattern': seasonal[:period].copy()  # Don't keep the full component alive
+            }
+        return None
+    
     def _detect_change_points(self, X: np.ndarray, y: np.ndarray) -> List[Dict[str, Any]]:
         """Detect significant change points in the trend"""
         change_points = []
@@ -257,65 +514,52 @@ class TrendDetector:
         
         # Use sliding window to detect changes in slope
         window_size = max(5, len(X) // 10)
+        y_std = np.std(y)
+        if not y_std > 0:
+            return change_points
         
-        for i in range(window_size, len(X) - window_size, window_size):
-            # Fit before and after
-            X_before = X[max(0, i - window_size):i]
-            y_before = y[max(0, i - window_size):i]
-            
-            X_after = X[i:min(len(X), i + window_size)]
-            y_after = y[i:min(len(y), i + window_size)]
-            
-            if len(X_before) < 3 or len(X_after) < 3:
-                continue
-            
-            # Fit linear models
-            model_before = LinearRegression()
-            model_before.fit(X_before, y_before)
-            slope_before = model_before.coef_[0]
-            
-            model_after = LinearRegression()
-            model_after.fit(X_after, y_after)
-            slope_after = model_after.coef_[0]
-            
-            # Check for significant change
-            slope_change = abs(slope_after - slope_before)
-            y_std = np.std(y)
-            
-            if y_std > 0 and slope_change > 0.1 * y_std:
-                change_points.append({
-                    'index': int(i),
-                    'x_value': float(X[i][0]),
-                    'y_value': float(y[i]),
-                    'slope_before': float(slope_before),
-                    'slope_after': float(slope_after),
-                    'significance': float(slope_change / y_std)
-                })
-        
-        # Sort by significance and return top 3
-        change_points.sort(key=lambda x: x['significance'], reverse=True)
-        return change_points[:3]
-    
-    def _calculate_yoy_growth(self, y: np.ndarray, time_index: pd.Series) -> Optional[Dict[str, Any]]:
-        """Calculate year-over-year growth rates"""
+        # Fit before and after every candidate in one kernel call
+        indices, slopes_before, slopes_after = change_point_slopes(X[:, 0], y, window_size)
+        
+        # Check for significant change
+        slope_changes = np.abs(slopes_after - slopes_before)
+        candidates = np.flatnonzero(slope_changes > 0.1 * y_std)
+        
+        # Sort by significance (stable, like list.sort) and keep the top 3
+        top = candidates[np.argsort(-slope_changes[candidates], kind='stable')[:3]]
+        for k in top:
+            i = indices[k]
+            change_points.append({
+                'index': int(i),
+                'x_value': float(X[i][0]),
+                'y_value': float(y[i]),
+                'slope_before': float(slopes_before[k]),
+                'slope_after': float(slopes_after[k]),
+                'significance': float(slope_changes[k] / y_std)
+            })
+        
+        return change_points
+    
+    def _calculate_yoy_growth(self, y: np.ndarray) -> Optional[Dict[str, Any]]:
+        """Calculate year-over-year growth rates (points 365 observations apart)"""
         if len(y) < 365:  # Need at least a year of data
             return None
         
-        try:
-            series = pd.Series(y, index=time_index)
-            
-            # Calculate YoY growth
-            yoy = series.pct_change(periods=365) * 100
-            
-            if yoy.notna().sum() > 0:
-                return {
-                    'average_growth': float(yoy.mean()),
-                    'latest_growth': float(yoy.iloc[-1]) if not pd.isna(yoy.iloc[-1]) else None,
-                    'max_growth': float(yoy.max()),
-                    'min_growth': float(yoy.min())
-                }
-        except Exception:
-            pass
+        # Calculate YoY growth on two aligned slices; growth from a zero base is undefined
+        current = y[365:]
+        base = y[:-365]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            yoy = (current / np.where(base == 0, np.nan, base) - 1) * 100
+        
+        finite = np.isfinite(yoy)
+        if finite.any():
+            growth = yoy[finite]
+            return {
+                'average_growth': float(growth.mean()),
+                'latest_growth': float(yoy[-1]) if finite[-1] else None,
+                'max_growth': float(growth.max()),
+                'min_growth': float(growth.min())
+            }
         
         return None
 
@@ -323,18 +567,26 @@ class TrendDetector:
 class CorrelationCalculator:
     """Calculates correlations between numeric variables with statistical significance"""
     
+    # Indexed by np.digitize(|r|, [0.5, 0.7], right=True): <=0.5, (0.5, 0.7], >0.7
+    SIGNIFICANCE_LABELS = np.array(['weak', 'moderate', 'strong'])
+    
     def __init__(self, threshold: float = 0.5, significance_level: float = 0.05):
         self.threshold = threshold
         self.significance_level = significance_level
     
     def calculate_correlations(self, df: pd.DataFrame, 
-                              numeric_cols: List[str]) -> List[Dict[str, Any]]:
+                              numeric_cols: List[str],
+                              numeric_arr: Optional[np.ndarray] = None,
+                              correlation_matrix: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
         """
         Calculate Pearson and Spearman correlation coefficients with p-values
         
         Args:
             df: pandas DataFrame
             numeric_cols: List of numeric column names
+            numeric_arr: Optional float block of df[numeric_cols] shared across analyzers
+            correlation_matrix: Optional result of get_correlation_matrix for the same
+                columns, whose matrices are reused instead of recomputed
             
         Returns:
             List of significant correlations with statistical tests
@@ -342,88 +594,94 @@ class CorrelationCalculator:
         if len(numeric_cols) < 2:
             return []
         
-        correlations = []
+        # Flatten the upper triangle (skips diagonal and duplicates)
+        arr = _numeric_block(df, numeric_cols, numeric_arr)
+        rows, cols = triu_pairs(len(numeric_cols))
+        if correlation_matrix is not None:
+            pearson_coefs = correlation_matrix['pearson_matrix'][rows, cols]
+            spearman_coefs = correlation_matrix['spearman_matrix'][rows, cols]
+        else:
+            # Pearson upper triangle from the kernel, Spearman matrix as ndarray
+            pearson_coefs = pearson_upper(arr)
+            spearman_coefs = _spearman_matrix(arr)[rows, cols]
         
-        # Calculate correlation matrices
-        pearson_matrix = df[numeric_cols].corr(method='pearson')
-        spearman_matrix = df[numeric_cols].corr(method='spearman')
+        # Drop pairs where both correlations are below threshold before any p-value work
+        keep = (np.abs(pearson_coefs) >= self.threshold) | (np.abs(spearman_coefs) >= self.threshold)
+        rows, cols = rows[keep], cols[keep]
+        pearson_coefs, spearman_coefs = pearson_coefs[keep], spearman_coefs[keep]
         
-        # Calculate p-values for each pair
-        for i, col1 in enumerate(numeric_cols):
-            for j, col2 in enumerate(numeric_cols):
-                if i >= j:  # Skip diagonal and duplicates
-                    continue
-                
-                # Get valid data for this pair
-                valid_data = df[[col1, col2]].dropna()
-                
-                if len(valid_data) < 3:
-                    continue
-                
-                # Pearson correlation with p-value
-                pearson_coef = pearson_matrix.loc[col1, col2]
-                pearson_r, pearson_p = stats.pearsonr(valid_data[col1], valid_data[col2])
-                
-                # Spearman correlation with p-value
-                spearman_coef = spearman_matrix.loc[col1, col2]
-                spearman_r, spearman_p = stats.spearmanr(valid_data[col1], valid_data[col2])
-                
-                # Skip if both correlations are below threshold
-                if abs(pearson_coef) < self.threshold and abs(spearman_coef) < self.threshold:
-                    continue
-                
-                # Determine which correlation to use (prefer Pearson if significant)
-                if pearson_p < self.significance_level:
-                    primary_coef = pearson_coef
-                    primary_p = pearson_p
-                    primary_method = 'pearson'
-                else:
-                    primary_coef = spearman_coef
-                    primary_p = spearman_p
-                    primary_method = 'spearman'
-                
-                # Determine significance level
-                if abs(primary_coef) > 0.7:
-                    significance = 'strong'
-                elif abs(primary_coef) > 0.5:
-                    significance = 'moderate'
-                else:
-                    significance = 'weak'
-                
-                # Only include statistically significant correlations
-                if primary_p < self.significance_level:
-                    correlations.append({
-                        'column1': col1,
-                        'column2': col2,
-                        'coefficient': float(primary_coef),
-                        'p_value': float(primary_p),
-                        'method': primary_method,
-                        'significance': significance,
-                        'direction': 'positive' if primary_coef > 0 else 'negative',
-                        'pearson': {
-                            'coefficient': float(pearson_coef),
-                            'p_value': float(pearson_p)
-                        },
-                        'spearman': {
-                            'coefficient': float(spearman_coef),
-                            'p_value': float(spearman_p)
-                        },
-                        'is_significant': primary_p < self.significance_level
-                    })
-        
-        # Sort by absolute correlation
-        correlations.sort(key=lambda x: abs(x['coefficient']), reverse=True)
+        if len(rows) == 0:
+            return []
+        
+        # p-values for the surviving pairs in one vectorized t-test, using
+        # pairwise-complete observation counts (a mask product only if anything is missing)
+        missing = np.isnan(arr)
+        if missing.any():
+            # Restrict the product to the columns that appear in a surviving pair
+            used = np.union1d(rows, cols)
+            pair_counts = _pair_counts(~missing[:, used])[np.searchsorted(used, rows), np.searchsorted(used, cols)]
+        else:
+            pair_counts = np.full(len(rows), float(len(arr)))
+        pearson_p = self._correlation_p_values(pearson_coefs, pair_counts)
+        spearman_p = self._correlation_p_values(spearman_coefs, pair_counts)
+        
+        # Prefer Pearson if significant, otherwise fall back to Spearman
+        use_pearson = pearson_p < self.significance_level
+        primary_coefs = np.where(use_pearson, pearson_coefs, spearman_coefs)
+        primary_p = np.where(use_pearson, pearson_p, spearman_p)
+        abs_primary = np.abs(primary_coefs)
+        significance = self.SIGNIFICANCE_LABELS[np.digitize(abs_primary, [0.5, 0.7], right=True)]
+        
+        # Only include statistically significant correlations, sorted by absolute correlation
+        significant = np.flatnonzero(primary_p < self.significance_level)
+        order = significant[np.argsort(-abs_primary[significant], kind='stable')]
+        
+        correlations = []
+        for k in order:
+            primary_coef = float(primary_coefs[k])
+            correlations.append({
+                'column1': numeric_cols[rows[k]],
+                'column2': numeric_cols[cols[k]],
+                'coefficient': primary_coef,
+                'p_value': float(primary_p[k]),
+                'method': 'pearson' if use_pearson[k] else 'spearman',
+                'significance': str(significance[k]),
+                'direction': 'positive' if primary_coef > 0 else 'negative',
+                'pearson': {
+                    'coefficient': float(pearson_coefs[k]),
+                    'p_value': float(pearson_p[k])
+                },
+                'spearman': {
+                    'coefficient': float(spearman_coefs[k]),
+                    'p_value': float(spearman_p[k])
+                },
+                'is_significant': True
+            })
         
         return correlations
     
+    def _correlation_p_values(self, r: np.ndarray, n: np.ndarray) -> np.ndarray:
+        """
+        Two-sided p-values for correlation coefficients (t-test with n - 2 dof)
+        
+        Matches scipy.stats.pearsonr and spearmanr; NaN where n < 3.
+        """
+        with np.errstate(divide='ignore', invalid='ignore'):
+            dof = n - 2
+            t_stat = r * np.sqrt(dof / ((1.0 - r) * (1.0 + r)))
+            p_values = 2 * stats.t.sf(np.abs(t_stat), dof)
+        return np.where(n >= 3, p_values, np.nan)
+    
     def get_correlation_matrix(self, df: pd.DataFrame, 
-                              numeric_cols: List[str]) -> Dict[str, Any]:
+                              numeric_cols: List[str],
+                              numeric_arr: Optional[np.ndarray] = None) -> Dict[str, Any]:
         """
         Generate full correlation matrix for heatmap visualization
         
         Args:
             df: pandas DataFrame
             numeric_cols: List of numeric column names
+            numeric_arr: Optional float block of df[numeric_cols] shared across analyzers
             
         Returns:
             Dictionary with correlation matrix and p-values
@@ -437,36 +695,35 @@ class CorrelationCalculator:
             }
         
         # Calculate correlation matrices
-        pearson_matrix = df[numeric_cols].corr(method='pearson')
-        spearman_matrix = df[numeric_cols].corr(method='spearman')
+        arr = _numeric_block(df, numeric_cols, numeric_arr)
+        pearson_matrix, pair_counts = _pairwise_pearson(arr)
+        spearman_matrix = _spearman_matrix(arr)
         
-        # Calculate p-value matrix
-        n = len(numeric_cols)
-        p_value_matrix = np.ones((n, n))
-        
-        for i, col1 in enumerate(numeric_cols):
-            for j, col2 in enumerate(numeric_cols):
-                if i != j:
-                    valid_data = df[[col1, col2]].dropna()
-                    if len(valid_data) >= 3:
-                        _, p_val = stats.pearsonr(valid_data[col1], valid_data[col2])
-                        p_value_matrix[i, j] = p_val
+        # Calculate p-value matrix (1 on the diagonal and where fewer than 3 rows overlap)
+        p_value_matrix = self._correlation_p_values(pearson_matrix, pair_counts)
+        p_value_matrix = np.where(pair_counts >= 3, p_value_matrix, 1.0)
+        np.fill_diagonal(p_value_matrix, 1.0)
         
         return {
             'columns': numeric_cols,
-            'pearson_matrix': pearson_matrix.values.tolist(),
-            'spearman_matrix': spearman_matrix.values.tolist(),
-            'p_value_matrix': p_value_matrix.tolist()
+            'pearson_matrix': pearson_matrix,
+            'spearman_matrix': spearman_matrix,
+            'p_value_matrix': p_value_matrix
         }
     
     def calculate_partial_correlations(self, df: pd.DataFrame, 
-                                      numeric_cols: List[str]) -> List[Dict[str, Any]]:
+                                      numeric_cols: List[str],
+                                      numeric_arr: Optional[np.ndarray] = None,
+                                      correlation_matrix: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
         """
         Calculate partial correlations (correlation between two variables controlling for others)
         
         Args:
             df: pandas DataFrame
             numeric_cols: List of numeric column names
+            numeric_arr: Optional float block of df[numeric_cols] shared across analyzers
+            correlation_matrix: Optional result of get_correlation_matrix for the same
+                columns; its Pearson matrix is inverted directly when nothing is missing
             
         Returns:
             List of partial correlation results
@@ -476,6 +733,10 @@ class CorrelationCalculator:
         
         partial_correlations = []
         
+        # Every pair controls for all remaining columns on the same complete-case rows,
+        # so all partial correlations come from one precision matrix
+        partial_matrix = self._partial_correlation_matrix(df, numeric_cols, numeric_arr, correlation_matrix)
+        
         # For each pair, calculate partial correlation controlling for all other variables
         for i, col1 in enumerate(numeric_cols):
             for j, col2 in enumerate(numeric_cols):
@@ -489,8 +750,11 @@ class CorrelationCalculator:
                     continue
                 
                 try:
-                    # Calculate partial correlation
-                    partial_r = self._partial_correlation(df, col1, col2, control_vars)
+                    # Calculate partial correlation (regression fallback for singular covariance)
+                    if partial_matrix is not None:
+                        partial_r = partial_matrix[i, j]
+                    else:
+                        partial_r = self._partial_correlation(df, col1, col2, control_vars)
                     
                     if abs(partial_r) > self.threshold:
                         partial_correlations.append({
@@ -505,6 +769,40 @@ class CorrelationCalculator:
         
         return partial_correlations
     
+    def _partial_correlation_matrix(self, df: pd.DataFrame,
+                                    numeric_cols: List[str],
+                                    numeric_arr: Optional[np.ndarray] = None,
+                                    correlation_matrix: Optional[Dict[str, Any]] = None) -> Optional[np.ndarray]:
+        """
+        Partial correlation of every column pair given all other columns
+        
+        Uses the closed form -P[i, j] / sqrt(P[i, i] * P[j, j]) on the precision
+        matrix P of the complete-case covariance. Returns None when that covariance
+        is singular (e.g. constant or collinear columns).
+        """
+        k = len(numeric_cols)
+        arr = _numeric_block(df, numeric_cols, numeric_arr)
+        complete = ~np.isnan(arr).any(axis=1)
+        
+        if np.count_nonzero(complete) < k + 2:
+            return np.zeros((k, k))
+        
+        if correlation_matrix is not None and complete.all():
+            # Every row is complete, so the pairwise Pearson matrix already is the
+            # complete-case correlation; its precision gives the same partials as
+            # the covariance's (the closed form is scale invariant)
+            cov = np.asarray(correlation_matrix['pearson_matrix'])
+            if np.isnan(cov).any():
+                return None  # A constant column makes the covariance singular
+        else:
+            cov = np.cov(arr[complete].astype(np.float64), rowvar=False)
+        if np.linalg.matrix_rank(cov) < k:
+            return None
+        
+        precision = np.linalg.inv(cov)
+        scale = np.sqrt(np.diag(precision))
+        return -precision / np.outer(scale, scale)
+    
     def _partial_correlation(self, df: pd.DataFrame, x: str, y: str, 
                            control: List[str]) -> float:
         """Calculate partial correlation between x and y controlling for control variables"""
@@ -540,48 +838,71 @@ class CorrelationCalculator:
 class DistributionAnalyzer:
     """Analyzes distribution characteristics of numeric data with advanced metrics"""
     
+    # Above this many points the KDE is binned and convolved instead of summed exactly
+    KDE_EXACT_MAX_POINTS = 2000
+    KDE_BINS = 2048
+    
     def analyze_distributions(self, df: pd.DataFrame, 
-                            numeric_cols: List[str]) -> List[Dict[str, Any]]:
+                            numeric_cols: List[str],
+                            numeric_arr: Optional[np.ndarray] = None,
+                            valid_counts: Optional[np.ndarray] = None,
+                            moments: Optional[Tuple[np.ndarray, ...]] = None) -> List[Dict[str, Any]]:
         """
         Calculate comprehensive distribution statistics
         
         Args:
             df: pandas DataFrame
             numeric_cols: List of numeric column names
+            numeric_arr: Optional float block of df[numeric_cols] shared across analyzers
+            valid_counts: Optional per-column non-missing counts of that block
+            moments: Optional column_moments of that block (means, stds, skews, kurts)
             
         Returns:
             List of distribution statistics with advanced metrics
         """
         distributions = []
         
-        for col in numeric_cols:
-            # Skip if too many missing values
-            if df[col].isna().sum() / len(df) > 0.3:
+        if not numeric_cols:
+            return distributions
+        
+        # Compute basic statistics for all columns in one vectorized pass
+        arr = _numeric_block(df, numeric_cols, numeric_arr)
+        valid_counts = _valid_counts(arr, valid_counts)
+        nan_frac = (len(arr) - valid_counts) / len(arr)
+        
+        means, std_devs, skews, kurts = moments if moments is not None else column_moments(arr)
+        
+        # Sort every column once (NaN last); order statistics become index lookups
+        # and each column's valid values are a sorted prefix reused below
+        sorted_block = np.sort(arr.astype(np.float64, copy=False), axis=0)
+        mins, q1s, q2s, q3s, maxs = _sorted_quantiles(sorted_block, valid_counts, [0, 0.25, 0.5, 0.75, 1])
+        
+        for j, col in enumerate(numeric_cols):
+            # Skip if too many missing values or too few points
+            if nan_frac[j] > 0.3 or valid_counts[j] < 3:
                 continue
             
-            data = df[col].dropna()
-            
-            if len(data) < 3:
-                continue
+            data = sorted_block[:valid_counts[j], j]
             
             # Basic statistics
             basic_stats = {
                 'column': col,
-                'mean': float(data.mean()),
-                'median': float(data.median()),
-                'std_dev': float(data.std()),
-                'min': float(data.min()),
-                'max': float(data.max()),
-                'skewness': float(stats.skew(data)),
-                'kurtosis': float(stats.kurtosis(data)),
+                'mean': float(means[j]),
+                'median': float(q2s[j]),
+                'std_dev': float(std_devs[j]),
+                'min': float(mins[j]),
+                'max': float(maxs[j]),
+                'skewness': float(skews[j]),
+                'kurtosis': float(kurts[j]),
+                # Quartiles for box plots
+                'q1': float(q1s[j]),
+                'q2': float(q2s[j]),  # median
+                'q3': float(q3s[j]),
+                'iqr': float(q3s[j] - q1s[j])
             }
             
-            # Quartiles for box plots
-            quartiles = self._calculate_quartiles(data)
-            basic_stats.update(quartiles)
-            
             # Histogram bins with optimal width
-            histogram = self._calculate_histogram(data)
+            histogram = self._calculate_histogram(data, q3s[j] - q1s[j])
             basic_stats['histogram'] = histogram
             
             # Kernel density estimation
@@ -592,66 +913,87 @@ class DistributionAnalyzer:
             # Normality tests
             normality = self._test_normality(data)
             basic_stats['normality'] = normality
+            # Whether any test accepts normality, so consumers need not rescan the tests
+            basic_stats['is_normal'] = any(bool(test['is_normal']) for test in normality.values())
             
             distributions.append(basic_stats)
         
         return distributions
     
-    def _calculate_quartiles(self, data: pd.Series) -> Dict[str, float]:
-        """Calculate quartiles (Q1, Q2/median, Q3) for box plot"""
-        return {
-            'q1': float(data.quantile(0.25)),
-            'q2': float(data.quantile(0.50)),  # median
-            'q3': float(data.quantile(0.75)),
-            'iqr': float(data.quantile(0.75) - data.quantile(0.25))
-        }
-    
-    def _calculate_histogram(self, data: pd.Series, max_bins: int = 30) -> Dict[str, Any]:
-        """Calculate histogram with optimal bin width"""
+    def _calculate_histogram(self, data: np.ndarray, iqr: float, max_bins: int = 30) -> Dict[str, Any]:
+        """Calculate histogram with optimal bin width from sorted values and their IQR"""
         # Use Freedman-Diaconis rule for bin width
-        q75, q25 = np.percentile(data, [75, 25])
-        iqr = q75 - q25
-        
-        if iqr > 0:
-            bin_width = 2 * iqr / (len(data) ** (1/3))
-            n_bins = int(np.ceil((data.max() - data.min()) / bin_width))
-            n_bins = min(max(n_bins, 5), max_bins)  # Between 5 and max_bins
-        else:
-            n_bins = 10
+        n_bins = _histogram_bin_count(len(data), iqr, data[-1] - data[0], max_bins)
         
         counts, bin_edges = np.histogram(data, bins=n_bins)
         
         return {
-            'counts': counts.tolist(),
-            'bin_edges': bin_edges.tolist(),
+            'counts': counts,
+            'bin_edges': bin_edges,
             'n_bins': n_bins
         }
     
-    def _calculate_kde(self, data: pd.Series, n_points: int = 100) -> Optional[Dict[str, Any]]:
+    def _calculate_kde(self, data: np.ndarray, n_points: int = 100) -> Optional[Dict[str, Any]]:
         """Calculate kernel density estimation for smooth distribution"""
         if len(data) < 3:
             return None
         
         try:
-            from scipy.stats import gaussian_kde
-            
-            # Create KDE
-            kde = gaussian_kde(data)
-            
-            # Evaluate KDE on a grid
-            x_min, x_max = data.min(), data.max()
+            # Evaluate KDE on a grid (data is sorted)
+            x_min, x_max = data[0], data[-1]
             x_range = x_max - x_min
             x_grid = np.linspace(x_min - 0.1 * x_range, x_max + 0.1 * x_range, n_points)
-            y_grid = kde(x_grid)
+            
+            if len(data) <= self.KDE_EXACT_MAX_POINTS:
+                from scipy.stats import gaussian_kde
+                
+                # Create KDE
+                kde = gaussian_kde(data)
+                y_grid = kde(x_grid)
+            else:
+                y_grid = self._binned_kde(data, x_grid)
+                if y_grid is None:
+                    return None
             
             return {
-                'x': x_grid.tolist(),
-                'y': y_grid.tolist()
+                'x': x_grid,
+                'y': y_grid
             }
         except Exception:
             return None
     
-    def _test_normality(self, data: pd.Series) -> Dict[str, Any]:
+    def _binned_kde(self, values: np.ndarray, x_grid: np.ndarray) -> Optional[np.ndarray]:
+        """
+        Gaussian KDE via a fine histogram convolved with the kernel (FFT)
+        
+        Uses the same Scott's-rule bandwidth as scipy's gaussian_kde, so the
+        result matches it to within the binning error, in O(bins log bins).
+        """
+        from scipy.signal import fftconvolve
+        
+        n = len(values)
+        bandwidth = np.std(values, ddof=1) * n ** (-1 / 5)
+        if not bandwidth > 0:
+            return None  # gaussian_kde cannot fit constant data either
+        
+        # Linear binning: split each point between its two nearest grid centers
+        centers = np.linspace(x_grid[0], x_grid[-1], self.KDE_BINS)
+        bin_width = centers[1] - centers[0]
+        position = (values - centers[0]) / bin_width
+        lower = np.clip(np.floor(position).astype(np.int64), 0, self.KDE_BINS - 2)
+        upper_weight = position - lower
+        counts = (np.bincount(lower, weights=1.0 - upper_weight, minlength=self.KDE_BINS)
+                  + np.bincount(lower + 1, weights=upper_weight, minlength=self.KDE_BINS))
+        
+        # Discretized Gaussian on +-4 bandwidths at the same spacing
+        half_width = int(np.ceil(4 * bandwidth / bin_width))
+        offsets = np.arange(-half_width, half_width + 1) * bin_width
+        kernel = np.exp(-0.5 * (offsets / bandwidth) ** 2) / (bandwidth * np.sqrt(2 * np.pi))
+        
+        density = fftconvolve(counts, kernel, mode='same') / n
+        return np.interp(x_grid, centers, np.maximum(density, 0.0))
+    
+    def _test_normality(self, data: np.ndarray) -> Dict[str, Any]:
         """Perform normality tests (Shapiro-Wilk, Anderson-Darling)"""
         normality_results = {}
         
@@ -696,170 +1038,292 @@ class DistributionAnalyzer:
 
 
 class OutlierDetector:
-    """Detects outliers using multiple methods (IQR, Z-score, Isolation Forest)"""
+    """Detects outliers using multiple methods (IQR, Z-score, HBOS or Isolation Forest)"""
+    
+    def __init__(self, use_isolation_forest: bool = False, max_workers: int = 4):
+        # HBOS is the default density-based method; Isolation Forest trains
+        # an ensemble per column and is only used when explicitly requested
+        self.use_isolation_forest = use_isolation_forest
+        self.max_workers = max_workers
     
     def detect_outliers(self, df: pd.DataFrame, 
-                       numeric_cols: List[str]) -> List[Dict[str, Any]]:
+                       numeric_cols: List[str],
+                       numeric_arr: Optional[np.ndarray] = None,
+                       valid_counts: Optional[np.ndarray] = None,
+                       moments: Optional[Tuple[np.ndarray, ...]] = None) -> List[Dict[str, Any]]:
         """
         Detect outliers using multiple methods
         
         Args:
             df: pandas DataFrame
             numeric_cols: List of numeric column names
+            numeric_arr: Optional float block of df[numeric_cols] shared across analyzers
+            valid_counts: Optional per-column non-missing counts of that block
+            moments: Optional column_moments of that block; its means and stds
+                feed the z-score mask
             
         Returns:
             List of outlier detection results with multiple methods
         """
         outliers = []
         
-        for col in numeric_cols:
-            data = df[col].dropna()
-            
-            if len(data) < 4:
-                continue
-            
-            # IQR method
-            iqr_result = self._detect_outliers_iqr(data)
-            
-            # Z-score method
-            zscore_result = self._detect_outliers_zscore(data)
-            
-            # Isolation Forest method (for larger datasets)
-            isolation_result = None
-            if len(data) >= 50:
-                isolation_result = self._detect_outliers_isolation_forest(data)
-            
-            # Combine results
-            outlier_result = {
-                'column': col,
-                'methods': {
-                    'iqr': iqr_result,
-                    'zscore': zscore_result
-                }
-            }
-            
-            if isolation_result:
-                outlier_result['methods']['isolation_forest'] = isolation_result
-            
-            # Get consensus outliers (detected by at least 2 methods)
-            consensus_outliers = self._get_consensus_outliers(
-                iqr_result, zscore_result, isolation_result
-            )
-            
-            if consensus_outliers['count'] > 0:
-                outlier_result['consensus'] = consensus_outliers
-                outliers.append(outlier_result)
+        if not numeric_cols:
+            return outliers
+        
+        # IQR bounds and masks for all columns in one batched pass
+        arr = _numeric_block(df, numeric_cols, numeric_arr)
+        valid_counts = _valid_counts(arr, valid_counts)
+        q1s, q3s, iqr_masks = iqr_outliers(arr)
+        iqrs = q3s - q1s
+        lower_bounds = q1s - 1.5 * iqrs
+        upper_bounds = q3s + 1.5 * iqrs
+        iqr_counts = iqr_masks.sum(axis=0)
+        
+        # Z-score statistics and masks in one batched pass as well
+        z_means, z_stds, z_masks = zscore_outliers(arr, moments=None if moments is None else moments[:2])
+        z_counts = z_masks.sum(axis=0)
+        
+        # A constant column has no IQR or z-score outliers, so it can never reach a
+        # two-method consensus; skip it before any per-column detector runs
+        # (fmax/fmin skip NaN without warning; all-missing columns compare as NaN)
+        constant = np.fmax.reduce(arr, axis=0) == np.fmin.reduce(arr, axis=0)
+        columns = [j for j in range(len(numeric_cols)) if valid_counts[j] >= 4 and not constant[j]]
+        
+        # Columns are independent; the density detectors spend their time in
+        # numpy/sklearn, so fan them out over a thread pool like detect_trends
+        parallel = self.max_workers > 1 and len(columns) > 1
+        analyze_column = partial(
+            self._analyze_column, df=df, numeric_cols=numeric_cols, arr=arr,
+            valid_counts=valid_counts, iqr=(iqr_masks, iqr_counts, iqrs, lower_bounds, upper_bounds),
+            zscore=(z_masks, z_counts, z_means, z_stds),
+            # One forest per column at a time when columns already run in parallel
+            n_jobs=1 if parallel else -1
+        )
+        if parallel:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(columns))) as executor:
+                results = list(executor.map(analyze_column, columns))
+        else:
+            results = [analyze_column(j) for j in columns]
+        
+        outliers = [outlier for outlier in results if outlier is not None]
         
         return outliers
     
-    def _detect_outliers_iqr(self, data: pd.Series) -> Dict[str, Any]:
-        """Detect outliers using Interquartile Range method"""
-        q1 = data.quantile(0.25)
-        q3 = data.quantile(0.75)
-        iqr = q3 - q1
+    def _analyze_column(self, j: int, df: pd.DataFrame, numeric_cols: List[str],
+                        arr: np.ndarray, valid_counts: np.ndarray, iqr: Tuple,
+                        zscore: Tuple, n_jobs: int) -> Optional[Dict[str, Any]]:
+        """Run every detector on column j and return it if any consensus outliers exist"""
+        col = numeric_cols[j]
+        iqr_masks, iqr_counts, iqrs, lower_bounds, upper_bounds = iqr
+        z_masks, z_counts, z_means, z_stds = zscore
+        
+        # IQR method
+        iqr_result = self._detect_outliers_iqr(
+            df.index, arr[:, j], iqr_masks[:, j], int(iqr_counts[j]),
+            int(valid_counts[j]), lower_bounds[j], upper_bounds[j]
+        )
+        
+        # Z-score method
+        zscore_result = self._detect_outliers_zscore(
+            df.index, arr[:, j], z_masks[:, j], int(z_counts[j]),
+            int(valid_counts[j]), z_means[j], z_stds[j]
+        )
+        
+        # Density-based method (for larger datasets)
+        isolation_result = None
+        density_mask = None
+        if valid_counts[j] >= 50:
+            # Non-missing values straight from the shared block instead of df[col].dropna();
+            # a complete column is used as a view without a mask or a copy
+            if valid_counts[j] == len(arr):
+                rows = None
+                values = arr[:, j]
+            else:
+                # Row positions of the values, so labels are only looked up for reported outliers
+                rows = np.flatnonzero(~np.isnan(arr[:, j]))
+                values = arr[rows, j]
+            values = values.astype(np.float64, copy=False)
+            if self.use_isolation_forest:
+                density = self._detect_outliers_isolation_forest(df.index, values, rows=rows, n_jobs=n_jobs)
+            else:
+                density = self._detect_outliers_hbos(df.index, values, iqrs[j], rows=rows)
+            if density:
+                isolation_result, density_mask = density
+                if rows is not None:
+                    # Scatter back onto all rows so it lines up with the IQR/z-score masks
+                    scattered = np.zeros(len(arr), dtype=bool)
+                    scattered[rows] = density_mask
+                    density_mask = scattered
+        
+        # Combine results
+        outlier_result = {
+            'column': col,
+            'methods': {
+                'iqr': iqr_result,
+                'zscore': zscore_result
+            }
+        }
+        
+        if isolation_result:
+            outlier_result['methods'][isolation_result['method']] = isolation_result
         
-        lower_bound = q1 - 1.5 * iqr
-        upper_bound = q3 + 1.5 * iqr
+        # Get consensus outliers (detected by at least 2 methods)
+        consensus_outliers = self._get_consensus_outliers(
+            df.index, iqr_masks[:, j], z_masks[:, j], density_mask,
+            iqr_result, zscore_result
+        )
         
-        outlier_mask = (data < lower_bound) | (data > upper_bound)
-        outlier_indices = data[outlier_mask].index.tolist()
-        outlier_values = data[outlier_mask].tolist()
+        if consensus_outliers['count'] > 0:
+            outlier_result['consensus'] = consensus_outliers
+            return outlier_result
+        
+        return None
+    
+    def _detect_outliers_iqr(self, index: pd.Index, values: np.ndarray, outlier_mask: np.ndarray,
+                             count: int, n_valid: int, lower_bound: float,
+                             upper_bound: float) -> Dict[str, Any]:
+        """Build Interquartile Range result from a precomputed column mask"""
+        positions = np.flatnonzero(outlier_mask)[:20]  # Limit to 20
         
         return {
             'method': 'iqr',
-            'count': int(outlier_mask.sum()),
-            'percentage': float(outlier_mask.sum() / len(data) * 100),
+            'count': count,
+            'percentage': float(count / n_valid * 100),
             'lower_bound': float(lower_bound),
             'upper_bound': float(upper_bound),
-            'indices': outlier_indices[:20],  # Limit to 20
-            'values': outlier_values[:20]
+            'indices': _index_labels(index, positions),
+            'values': values[positions].tolist()
         }
     
-    def _detect_outliers_zscore(self, data: pd.Series, threshold: float = 3.0) -> Dict[str, Any]:
-        """Detect outliers using Z-score method"""
-        mean = data.mean()
-        std = data.std()
+    def _detect_outliers_zscore(self, index: pd.Index, values: np.ndarray, outlier_mask: np.ndarray,
+                                count: int, n_valid: int, mean: float, std: float,
+                                threshold: float = 3.0) -> Dict[str, Any]:
+        """
+        Build Z-score result from a precomputed column mask (empty when std is 0)
         
-        if std == 0:
-            return {
-                'method': 'zscore',
-                'count': 0,
-                'percentage': 0.0,
-                'threshold': threshold,
-                'indices': [],
-                'values': [],
-                'zscores': []
-            }
+        Lists the 20 most extreme outliers by |z|, most extreme first (ties in row order).
+        """
+        positions = np.flatnonzero(outlier_mask)
+        outlier_values = values[positions].astype(np.float64)
+        zscores = np.abs((outlier_values - mean) / std)
         
-        zscores = np.abs((data - mean) / std)
-        outlier_mask = zscores > threshold
-        outlier_indices = data[outlier_mask].index.tolist()
-        outlier_values = data[outlier_mask].tolist()
-        outlier_zscores = zscores[outlier_mask].tolist()
+        # Quickselect the top 20 before ordering just those
+        top = np.argpartition(-zscores, 19)[:20] if len(positions) > 20 else np.arange(len(positions))
+        top = top[np.lexsort((top, -zscores[top]))]
         
         return {
             'method': 'zscore',
-            'count': int(outlier_mask.sum()),
-            'percentage': float(outlier_mask.sum() / len(data) * 100),
+            'count': count,
+            'percentage': float(count / n_valid * 100),
             'threshold': threshold,
-            'indices': outlier_indices[:20],
-            'values': outlier_values[:20],
-            'zscores': outlier_zscores[:20]
+            'indices': _index_labels(index, positions[top]),
+            'values': outlier_values[top].tolist(),
+            'zscores': zscores[top].tolist()
         }
     
-    def _detect_outliers_isolation_forest(self, data: pd.Series, 
-                                         contamination: float = 0.1) -> Optional[Dict[str, Any]]:
-        """Detect outliers using Isolation Forest algorithm"""
+    def _detect_outliers_hbos(self, index: pd.Index, values: np.ndarray, iqr: float,
+                              contamination: float = 0.05,
+                              rows: Optional[np.ndarray] = None) -> Optional[Tuple[Dict[str, Any], np.ndarray]]:
+        """
+        Detect outliers with a Histogram-Based Outlier Score (rarer bins score higher)
+        
+        `rows` gives the positions of `values` in `index` when missing rows were
+        dropped. Returns the result together with the outlier mask over `values`.
+        """
         try:
-            # Reshape data for sklearn
-            X = data.values.reshape(-1, 1)
+            n_bins = _histogram_bin_count(len(values), iqr, values.max() - values.min())
+            counts, bin_edges = np.histogram(values, bins=n_bins)
             
-            # Fit Isolation Forest
-            iso_forest = IsolationForest(contamination=contamination, random_state=42)
-            predictions = iso_forest.fit_predict(X)
+            # Score each point by the negative log density of its bin
+            bin_scores = -np.log(np.clip(counts / len(values), 1e-12, None))
+            bin_index = np.clip(np.searchsorted(bin_edges, values, side='right') - 1, 0, n_bins - 1)
+            scores = bin_scores[bin_index]
             
-            # -1 indicates outlier, 1 indicates inlier
-            outlier_mask = predictions == -1
-            outlier_indices = data[outlier_mask].index.tolist()
-            outlier_values = data[outlier_mask].tolist()
+            outlier_mask = scores > np.quantile(scores, 1 - contamination)
+            count = int(np.count_nonzero(outlier_mask))
+            positions = np.flatnonzero(outlier_mask)[:20]  # Limit to 20
             
-            # Get anomaly scores
+            return {
+                'method': 'hbos',
+                'count': count,
+                'percentage': float(count / len(values) * 100),
+                'contamination': contamination,
+                'indices': _index_labels(index, positions if rows is None else rows[positions]),
+                'values': values[positions].tolist(),
+                'anomaly_scores': scores[positions].tolist()
+            }, outlier_mask
+        except Exception:
+            return None
+    
+    def _detect_outliers_isolation_forest(self, index: pd.Index, values: np.ndarray,
+                                         contamination: float = 0.1,
+                                         rows: Optional[np.ndarray] = None,
+                                         n_jobs: int = -1) -> Optional[Tuple[Dict[str, Any], np.ndarray]]:
+        """
+        Detect outliers using Isolation Forest algorithm (skipped below 100 values)
+        
+        `rows` gives the positions of `values` in `index` when missing rows were
+        dropped. Returns the result together with the outlier mask over `values`.
+        """
+        if len(values) < 100:
+            return None
+        
+        try:
+            # Reshape data for sklearn; its trees work in float32, so convert once
+            # here rather than separately inside fit() and score_samples()
+            X = values.astype(np.float32, copy=False).reshape(-1, 1)
+            
+            # Fit Isolation Forest (trees built in parallel); a single feature
+            # needs far fewer trees than the default 100 to isolate extreme values
+            iso_forest = IsolationForest(
+                n_estimators=50,
+                max_samples=min(256, len(X)),
+                contamination=contamination,
+                random_state=42,
+                n_jobs=n_jobs
+            )
+            iso_forest.fit(X)
+            
+            # Get anomaly scores; predict() would flag exactly scores < offset_,
+            # so derive the outliers from the same scores instead of walking the trees again
             scores = iso_forest.score_samples(X)
-            outlier_scores = scores[outlier_mask].tolist()
+            outlier_mask = scores < iso_forest.offset_
+            count = int(np.count_nonzero(outlier_mask))
+            positions = np.flatnonzero(outlier_mask)[:20]  # Limit to 20
             
             return {
                 'method': 'isolation_forest',
-                'count': int(outlier_mask.sum()),
-                'percentage': float(outlier_mask.sum() / len(data) * 100),
+                'count': count,
+                'percentage': float(count / len(values) * 100),
                 'contamination': contamination,
-                'indices': outlier_indices[:20],
-                'values': outlier_values[:20],
-                'anomaly_scores': outlier_scores[:20]
-            }
+                'indices': _index_labels(index, positions if rows is None else rows[positions]),
+                'values': values[positions].tolist(),
+                'anomaly_scores': scores[positions].tolist()
+            }, outlier_mask
         except Exception:
             return None
     
-    def _get_consensus_outliers(self, iqr_result: Dict, zscore_result: Dict, 
-                               isolation_result: Optional[Dict]) -> Dict[str, Any]:
-        """Get outliers detected by at least 2 methods"""
-        # Get sets of outlier indices
-        iqr_indices = set(iqr_result['indices'])
-        zscore_indices = set(zscore_result['indices'])
-        
-        if isolation_result:
-            isolation_indices = set(isolation_result['indices'])
-            # Find indices detected by at least 2 methods
-            consensus = (iqr_indices & zscore_indices) | \
-                       (iqr_indices & isolation_indices) | \
-                       (zscore_indices & isolation_indices)
+    def _get_consensus_outliers(self, index: pd.Index, iqr_mask: np.ndarray,
+                                zscore_mask: np.ndarray, density_mask: Optional[np.ndarray],
+                                iqr_result: Dict, zscore_result: Dict) -> Dict[str, Any]:
+        """Get outliers detected by at least 2 methods from row-aligned masks"""
+        if density_mask is None:
+            # With only two methods the consensus is their intersection
+            consensus = iqr_mask & zscore_mask
         else:
-            # Only have 2 methods, so consensus is intersection
-            consensus = iqr_indices & zscore_indices
+            # At least two of three votes: bool masks viewed as uint8 lanes (no copy),
+            # summed in place and compared once
+            votes = np.add(iqr_mask.view(np.uint8), zscore_mask.view(np.uint8))
+            votes += density_mask.view(np.uint8)
+            consensus = votes >= 2
+        count = int(np.count_nonzero(consensus))
+        denominator = (iqr_result['count'] + zscore_result['count']) or 1
         
         return {
-            'count': len(consensus),
-            'percentage': float(len(consensus) / max(len(iqr_result['indices']) + len(zscore_result['indices']), 1) * 100),
-            'indices': list(consensus)[:20]
+            'count': count,
+            'percentage': count / denominator * 100,
+            # Skip the position scan when nothing agreed (the column is then dropped)
+            'indices': _index_labels(index, np.flatnonzero(consensus)[:20]) if count else []  # Limit to 20
         }
 
 
@@ -881,36 +1345,76 @@ class FrequencyAnalyzer:
         frequencies = []
         
         for col in categorical_cols:
-            value_counts = df[col].value_counts()
+            series = df[col]
+            
+            # One hashing pass to integer codes (-1 for missing), then a histogram
+            if isinstance(series.dtype, pd.CategoricalDtype):
+                codes = series.cat.codes.to_numpy()
+                uniques = series.cat.categories
+            else:
+                codes, uniques = pd.factorize(series)
+            # Shift by one so missing values land in slot 0 instead of masking them out first
+            counts = np.bincount(codes + 1, minlength=len(uniques) + 1)[1:]
             
-            # Get top 5 categories
-            top_5 = value_counts.head(5)
+            # Get top 5 categories (ties keep first-seen order)
+            top_5 = self._top_k_indices(counts, 5)
+            top_counts = counts[top_5]
+            top_percentages = top_counts / len(df) * 100
             
             frequencies.append({
                 'column': col,
-                'unique_count': int(df[col].nunique()),
+                'unique_count': int(np.count_nonzero(counts)),
                 'top_categories': [
                     {
-                        'value': str(val),
-                        'count': int(count),
-                        'percentage': float(count / len(df) * 100)
+                        'value': str(uniques[idx]),
+                        'count': count,
+                        'percentage': percentage
                     }
-                    for val, count in top_5.items()
+                    for idx, count, percentage in zip(top_5, top_counts.tolist(), top_percentages.tolist())
                 ],
-                'total_count': int(len(df[col].dropna()))
+                'total_count': int(counts.sum())
             })
         
         return frequencies
+    
+    def _top_k_indices(self, counts: np.ndarray, k: int) -> np.ndarray:
+        """
+        Indices of the k largest counts, ordered by count then index, in O(U)
+        
+        Selects with np.partition instead of sorting every category, then only
+        orders the (at most k) winners.
+        """
+        k = min(k, len(counts))
+        if k == 0:
+            return np.empty(0, dtype=np.intp)
+        
+        kth_largest = np.partition(counts, len(counts) - k)[len(counts) - k]
+        above = np.flatnonzero(counts > kth_largest)
+        # Fill the remaining slots with the earliest categories tied at the cut-off
+        tied = np.flatnonzero(counts == kth_largest)[:k - len(above)]
+        top = np.concatenate([above, tied])
+        
+        return top[np.lexsort((top, -counts[top]))]
 
 
 class InsightGenerator:
     """Generates intelligent insights from statistical analysis results"""
     
+    # Weight of each impact level in the composite ranking score
+    IMPACT_WEIGHTS = {
+        'high': 1.0,
+        'medium': 0.7,
+        'low': 0.4
+    }
+    
     def generate_insights(self, analysis_results: Dict[str, Any], 
                          df: pd.DataFrame) -> List[Dict[str, Any]]:
         """
         Generate ranked insights from analysis results
         
+        Candidates are ranked on their score alone; the insight dicts, with their
+        titles, descriptions and recommendations, are only built for the top 5.
+        
         Args:
             analysis_results: Dictionary containing all analysis results
             df: Original DataFrame for additional context
@@ -918,144 +1422,174 @@ class InsightGenerator:
         Returns:
             List of insights ranked by significance and impact
         """
-        insights = []
+        candidates = []
         
         # Extract insights from trends
-        trend_insights = self._extract_trend_insights(analysis_results.get('trends', []))
-        insights.extend(trend_insights)
+        candidates.extend(self._extract_trend_insights(analysis_results.get('trends', [])))
         
         # Extract insights from correlations
-        correlation_insights = self._extract_correlation_insights(analysis_results.get('correlations', []))
-        insights.extend(correlation_insights)
+        candidates.extend(self._extract_correlation_insights(analysis_results.get('correlations', [])))
         
         # Extract insights from outliers
-        outlier_insights = self._extract_outlier_insights(analysis_results.get('outliers', []))
-        insights.extend(outlier_insights)
+        candidates.extend(self._extract_outlier_insights(analysis_results.get('outliers', [])))
         
         # Extract insights from distributions
-        distribution_insights = self._extract_distribution_insights(analysis_results.get('distributions', []))
-        insights.extend(distribution_insights)
+        candidates.extend(self._extract_distribution_insights(analysis_results.get('distributions', [])))
         
-        # Rank insights by significance and impact
-        ranked_insights = self._rank_insights(insights)
+        # Keep the top 5 with a bounded heap (ties stay in extraction order)
+        insights = []
+        for score, build, args in heapq.nlargest(5, candidates, key=itemgetter(0)):
+            insight = build(*args)
+            insight['score'] = score
+            insights.append(insight)
         
-        # Return top 5 insights
-        return ranked_insights[:5]
+        return insights
     
-    def _extract_trend_insights(self, trends: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """Extract insights from trend analysis"""
-        insights = []
+    def _candidate(self, significance: float, impact: str,
+                   build: Callable[..., Dict[str, Any]], *args) -> Tuple[float, Callable, Tuple]:
+        """
+        Pair an insight's composite score with a deferred builder for its payload
+        
+        Candidates stay flat (score, builder, arguments) tuples, one small object
+        each, until ranking decides which few are turned into dicts.
+        """
+        # Composite score: 70% significance, 30% impact
+        score = 0.7 * significance + 0.3 * self.IMPACT_WEIGHTS.get(impact, 0.5)
+        
+        return score, build, (*args, significance, impact)
+    
+    def _extract_trend_insights(self, trends: List[Dict[str, Any]]) -> List[Tuple[float, Callable, Tuple]]:
+        """Extract insight candidates from trend analysis"""
+        candidates = []
         
         for trend in trends:
             # Strong trends
-            if trend.get('strength') == 'strong' and trend.get('r_squared', 0) > 0.7:
-                direction = trend['direction']
-                column = trend['column']
+            if (trend.get('strength') == 'strong' and trend.get('r_squared', 0) > 0.7
+                    and trend['direction'] in ('increasing', 'decreasing')):
                 r_squared = trend['r_squared']
                 
                 # Calculate significance score
-                significance = r_squared
-                
-                # Generate description
-                if direction == 'increasing':
-                    description = f"{column} shows a strong upward trend with {r_squared:.1%} of variance explained by time."
-                    recommendation = f"Monitor {column} for continued growth and plan for capacity accordingly."
-                elif direction == 'decreasing':
-                    description = f"{column} shows a strong downward trend with {r_squared:.1%} of variance explained by time."
-                    recommendation = f"Investigate causes of decline in {column} and implement corrective measures."
-                else:
-                    continue
-                
-                # Check for seasonal patterns
-                if 'seasonal' in trend and trend['seasonal']:
-                    seasonal_strength = trend['seasonal'].get('strength', 0)
-                    if seasonal_strength > 0.3:
-                        description += f" Additionally, seasonal patterns detected with {seasonal_strength:.1%} strength."
-                        recommendation += f" Consider seasonal adjustments in planning."
-                
-                # Check for change points
-                if 'change_points' in trend and trend['change_points']:
-                    change_point = trend['change_points'][0]
-                    description += f" A significant inflection point was detected at index {change_point['index']}."
+                significance = float(r_squared)
+                impact = 'high' if r_squared > 0.85 else 'medium'
                 
-                insights.append({
-                    'type': 'trend',
-                    'title': f"Strong {direction} trend in {column}",
-                    'description': description,
-                    'significance': float(significance),
-                    'impact': 'high' if r_squared > 0.85 else 'medium',
-                    'recommendation': recommendation,
-                    'related_column': column
-                })
+                candidates.append(self._candidate(significance, impact, self._build_trend_insight, trend))
         
-        return insights
+        return candidates
     
-    def _extract_correlation_insights(self, correlations: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """Extract insights from correlation analysis"""
-        insights = []
+    def _build_trend_insight(self, trend: Dict[str, Any], significance: float,
+                             impact: str) -> Dict[str, Any]:
+        """Format a trend insight"""
+        direction = trend['direction']
+        column = trend['column']
+        r_squared = trend['r_squared']
+        
+        # Generate description
+        if direction == 'increasing':
+            description = f"{column} shows a strong upward trend with {r_squared:.1%} of variance explained by time."
+            recommendation = f"Monitor {column} for continued growth and plan for capacity accordingly."
+        else:
+            description = f"{column} shows a strong downward trend with {r_squared:.1%} of variance explained by time."
+            recommendation = f"Investigate causes of decline in {column} and implement corrective measures."
+        
+        # Check for seasonal patterns
+        if 'seasonal' in trend and trend['seasonal']:
+            seasonal_strength = trend['seasonal'].get('strength', 0)
+            if seasonal_strength > 0.3:
+                description += f" Additionally, seasonal patterns detected with {seasonal_strength:.1%} strength."
+                recommendation += f" Consider seasonal adjustments in planning."
+        
+        # Check for change points
+        if 'change_points' in trend and trend['change_points']:
+            change_point = trend['change_points'][0]
+            description += f" A significant inflection point was detected at index {change_point['index']}."
+        
+        return {
+            'type': 'trend',
+            'title': f"Strong {direction} trend in {column}",
+            'description': description,
+            'significance': significance,
+            'impact': impact,
+            'recommendation': recommendation,
+            'related_column': column
+        }
+    
+    def _extract_correlation_insights(self, correlations: List[Dict[str, Any]]) -> List[Tuple[float, Callable, Tuple]]:
+        """Extract insight candidates from correlation analysis"""
+        candidates = []
         
         for corr in correlations[:3]:  # Top 3 correlations
             if abs(corr.get('coefficient', 0)) > 0.7:
-                col1 = corr['column1']
-                col2 = corr['column2']
                 coef = corr['coefficient']
-                direction = corr['direction']
-                
-                significance = abs(coef)
                 
-                if direction == 'positive':
-                    description = f"{col1} and {col2} show a strong positive correlation ({coef:.2f}). When {col1} increases, {col2} tends to increase as well."
-                    recommendation = f"Leverage the relationship between {col1} and {col2} for predictive modeling or joint optimization."
-                else:
-                    description = f"{col1} and {col2} show a strong negative correlation ({coef:.2f}). When {col1} increases, {col2} tends to decrease."
-                    recommendation = f"Consider the trade-off between {col1} and {col2} in decision-making processes."
+                significance = float(abs(coef))
+                impact = 'high' if abs(coef) > 0.85 else 'medium'
                 
-                insights.append({
-                    'type': 'correlation',
-                    'title': f"Strong {direction} correlation between {col1} and {col2}",
-                    'description': description,
-                    'significance': float(significance),
-                    'impact': 'high' if abs(coef) > 0.85 else 'medium',
-                    'recommendation': recommendation,
-                    'related_columns': [col1, col2]
-                })
+                candidates.append(self._candidate(significance, impact, self._build_correlation_insight, corr))
         
-        return insights
+        return candidates
     
-    def _extract_outlier_insights(self, outliers: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """Extract insights from outlier detection"""
-        insights = []
+    def _build_correlation_insight(self, corr: Dict[str, Any], significance: float,
+                                   impact: str) -> Dict[str, Any]:
+        """Format a correlation insight"""
+        col1 = corr['column1']
+        col2 = corr['column2']
+        coef = corr['coefficient']
+        direction = corr['direction']
+        
+        if direction == 'positive':
+            description = f"{col1} and {col2} show a strong positive correlation ({coef:.2f}). When {col1} increases, {col2} tends to increase as well."
+            recommendation = f"Leverage the relationship between {col1} and {col2} for predictive modeling or joint optimization."
+        else:
+            description = f"{col1} and {col2} show a strong negative correlation ({coef:.2f}). When {col1} increases, {col2} tends to decrease."
+            recommendation = f"Consider the trade-off between {col1} and {col2} in decision-making processes."
+        
+        return {
+            'type': 'correlation',
+            'title': f"Strong {direction} correlation between {col1} and {col2}",
+            'description': description,
+            'significance': significance,
+            'impact': impact,
+            'recommendation': recommendation,
+            'related_columns': [col1, col2]
+        }
+    
+    def _extract_outlier_insights(self, outliers: List[Dict[str, Any]]) -> List[Tuple[float, Callable, Tuple]]:
+        """Extract insight candidates from outlier detection"""
+        candidates = []
         
         for outlier in outliers:
-            column = outlier['column']
-            
             # Check consensus outliers
             if 'consensus' in outlier and outlier['consensus']['count'] > 0:
                 count = outlier['consensus']['count']
                 
                 # Calculate significance based on percentage
                 iqr_pct = outlier['methods']['iqr'].get('percentage', 0)
-                significance = min(iqr_pct / 10, 1.0)  # Normalize to 0-1
+                significance = float(min(iqr_pct / 10, 1.0))  # Normalize to 0-1
                 
                 if count > 2:  # Only report if multiple outliers
-                    description = f"{column} contains {count} significant outliers detected by multiple methods. These values deviate substantially from the typical range."
-                    recommendation = f"Investigate the {count} outlier values in {column} to determine if they represent data errors, special cases, or genuine anomalies requiring attention."
-                    
-                    insights.append({
-                        'type': 'outlier',
-                        'title': f"Anomalies detected in {column}",
-                        'description': description,
-                        'significance': float(significance),
-                        'impact': 'high' if count > 5 else 'medium',
-                        'recommendation': recommendation,
-                        'related_column': column
-                    })
+                    impact = 'high' if count > 5 else 'medium'
+                    candidates.append(self._candidate(
+                        significance, impact, self._build_outlier_insight, outlier['column'], count
+                    ))
         
-        return insights
+        return candidates
     
-    def _extract_distribution_insights(self, distributions: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """Extract insights from distribution analysis"""
-        insights = []
+    def _build_outlier_insight(self, column: str, count: int, significance: float,
+                               impact: str) -> Dict[str, Any]:
+        """Format an outlier insight"""
+        return {
+            'type': 'outlier',
+            'title': f"Anomalies detected in {column}",
+            'description': f"{column} contains {count} significant outliers detected by multiple methods. These values deviate substantially from the typical range.",
+            'significance': significance,
+            'impact': impact,
+            'recommendation': f"Investigate the {count} outlier values in {column} to determine if they represent data errors, special cases, or genuine anomalies requiring attention.",
+            'related_column': column
+        }
+    
+    def _extract_distribution_insights(self, distributions: List[Dict[str, Any]]) -> List[Tuple[float, Callable, Tuple]]:
+        """Extract insight candidates from distribution analysis"""
+        candidates = []
         
         for dist in distributions:
             column = dist['column']
@@ -1063,84 +1597,64 @@ class InsightGenerator:
             
             # Highly skewed distributions
             if abs(skewness) > 1.5:
-                significance = min(abs(skewness) / 3, 1.0)
+                significance = float(min(abs(skewness) / 3, 1.0))
                 
-                if skewness > 0:
-                    description = f"{column} has a highly right-skewed distribution (skewness: {skewness:.2f}), with most values concentrated at the lower end and a long tail of high values."
-                    recommendation = f"Consider log transformation or other normalization techniques for {column} in statistical modeling."
-                else:
-                    description = f"{column} has a highly left-skewed distribution (skewness: {skewness:.2f}), with most values concentrated at the higher end and a long tail of low values."
-                    recommendation = f"Investigate the lower tail of {column} for potential data quality issues or special cases."
-                
-                insights.append({
-                    'type': 'distribution',
-                    'title': f"Skewed distribution in {column}",
-                    'description': description,
-                    'significance': float(significance),
-                    'impact': 'medium',
-                    'recommendation': recommendation,
-                    'related_column': column
-                })
+                candidates.append(self._candidate(
+                    significance, 'medium', self._build_skew_insight, column, skewness
+                ))
             
-            # Check normality
-            if 'normality' in dist:
-                normality = dist['normality']
-                is_normal = False
-                
-                # Check if any test indicates normality
-                for test_name, test_result in normality.items():
-                    if isinstance(test_result, dict) and test_result.get('is_normal'):
-                        is_normal = True
-                        break
-                
-                if not is_normal and len(insights) < 5:
-                    description = f"{column} does not follow a normal distribution based on statistical tests. This may affect certain statistical analyses."
-                    recommendation = f"Use non-parametric methods or appropriate transformations when analyzing {column}."
-                    
-                    insights.append({
-                        'type': 'distribution',
-                        'title': f"Non-normal distribution in {column}",
-                        'description': description,
-                        'significance': 0.5,
-                        'impact': 'low',
-                        'recommendation': recommendation,
-                        'related_column': column
-                    })
+            # Check normality (summarized across tests by DistributionAnalyzer)
+            if 'normality' in dist and not dist.get('is_normal', False) and len(candidates) < 5:
+                candidates.append(self._candidate(
+                    0.5, 'low', self._build_non_normal_insight, column
+                ))
         
-        return insights
+        return candidates
     
-    def _rank_insights(self, insights: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """Rank insights by significance and impact"""
-        # Define impact weights
-        impact_weights = {
-            'high': 1.0,
-            'medium': 0.7,
-            'low': 0.4
-        }
-        
-        # Calculate composite score
-        for insight in insights:
-            significance = insight.get('significance', 0.5)
-            impact = insight.get('impact', 'medium')
-            impact_weight = impact_weights.get(impact, 0.5)
-            
-            # Composite score: 70% significance, 30% impact
-            insight['score'] = 0.7 * significance + 0.3 * impact_weight
-        
-        # Sort by score
-        insights.sort(key=lambda x: x['score'], reverse=True)
+    def _build_skew_insight(self, column: str, skewness: float, significance: float,
+                            impact: str) -> Dict[str, Any]:
+        """Format a skewed-distribution insight"""
+        if skewness > 0:
+            description = f"{column} has a highly right-skewed distribution (skewness: {skewness:.2f}), with most values concentrated at the lower end and a long tail of high values."
+            recommendation = f"Consider log transformation or other normalization techniques for {column} in statistical modeling."
+        else:
+            description = f"{column} has a highly left-skewed distribution (skewness: {skewness:.2f}), with most values concentrated at the higher end and a long tail of low values."
+            recommendation = f"Investigate the lower tail of {column} for potential data quality issues or special cases."
         
-        return insights
+        return {
+            'type': 'distribution',
+            'title': f"Skewed distribution in {column}",
+            'description': description,
+            'significance': significance,
+            'impact': impact,
+            'recommendation': recommendation,
+            'related_column': column
+        }
+    
+    def _build_non_normal_insight(self, column: str, significance: float,
+                                  impact: str) -> Dict[str, Any]:
+        """Format a non-normal distribution insight"""
+        return {
+            'type': 'distribution',
+            'title': f"Non-normal distribution in {column}",
+            'description': f"{column} does not follow a normal distribution based on statistical tests. This may affect certain statistical analyses.",
+            'significance': significance,
+            'impact': impact,
+            'recommendation': f"Use non-parametric methods or appropriate transformations when analyzing {column}.",
+            'related_column': column
+        }
 
 
 class StatisticalAnalyzer:
     """Main statistical analysis engine with advanced analytics and insights"""
     
-    def __init__(self, correlation_threshold: float = 0.5):
+    def __init__(self, correlation_threshold: float = 0.5, max_workers: int = 5,
+                 use_isolation_forest: bool = False):
+        self.max_workers = max_workers
         self.trend_detector = TrendDetector()
         self.correlation_calculator = CorrelationCalculator(correlation_threshold)
         self.distribution_analyzer = DistributionAnalyzer()
-        self.outlier_detector = OutlierDetector()
+        self.outlier_detector = OutlierDetector(use_isolation_forest)
         self.frequency_analyzer = FrequencyAnalyzer()
         self.insight_generator = InsightGenerator()
     
@@ -1159,20 +1673,41 @@ class StatisticalAnalyzer:
         categorical_cols = metadata.get('categorical_columns', [])
         datetime_cols = metadata.get('datetime_columns', [])
         
-        # Perform all analyses
-        trends = self.trend_detector.detect_trends(df, numeric_cols, datetime_cols)
-        correlations = self.correlation_calculator.calculate_correlations(df, numeric_cols)
-        distributions = self.distribution_analyzer.analyze_distributions(df, numeric_cols)
-        outliers = self.outlier_detector.detect_outliers(df, numeric_cols)
-        frequencies = self.frequency_analyzer.analyze_frequencies(df, categorical_cols)
-        
-        # Get correlation matrix for heatmap
-        correlation_matrix = self.correlation_calculator.get_correlation_matrix(df, numeric_cols)
-        
-        # Get partial correlations if enough variables
-        partial_correlations = []
-        if len(numeric_cols) >= 3:
-            partial_correlations = self.correlation_calculator.calculate_partial_correlations(df, numeric_cols)
+        # Extract the numeric block once and share it across analyzers
+        numeric_arr = _numeric_block(df, numeric_cols, downcast=True) if numeric_cols else None
+        # One missing-value pass feeds every analyzer's 30%-missing and minimum-size checks
+        valid_counts = _valid_counts(numeric_arr) if numeric_cols else None
+        # Means, stds, skewness and kurtosis for every column in one kernel, shared by
+        # the distribution statistics and the z-score outliers
+        moments = column_moments(numeric_arr) if numeric_cols else None
+        
+        # Perform all analyses concurrently; they only read df and the shared block,
+        # and numpy/pandas/numba release the GIL in their hot loops. The heaviest
+        # blocks are submitted first so they start even when max_workers is small.
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            trends_future = executor.submit(
+                self.trend_detector.detect_trends, df, numeric_cols, datetime_cols,
+                numeric_arr=numeric_arr, valid_counts=valid_counts)
+            
+            # Correlation matrix for the heatmap, significant pairs and partial
+            # correlations, all derived from one Pearson/Spearman computation
+            correlation_future = executor.submit(self._analyze_correlations, df, numeric_cols, numeric_arr)
+            
+            distributions_future = executor.submit(
+                self.distribution_analyzer.analyze_distributions, df, numeric_cols,
+                numeric_arr=numeric_arr, valid_counts=valid_counts, moments=moments)
+            outliers_future = executor.submit(
+                self.outlier_detector.detect_outliers, df, numeric_cols,
+                numeric_arr=numeric_arr, valid_counts=valid_counts, moments=moments)
+            frequencies_future = executor.submit(
+                self.frequency_analyzer.analyze_frequencies, df, categorical_cols)
+            
+            # Collect in a fixed order regardless of which block finishes first
+            trends = trends_future.result()
+            correlation_matrix, correlations, partial_correlations = correlation_future.result()
+            distributions = distributions_future.result()
+            outliers = outliers_future.result()
+            frequencies = frequencies_future.result()
         
         results = {
             'trends': trends,
@@ -1196,3 +1731,19 @@ class StatisticalAnalyzer:
         results['insights'] = insights
         
         return results
+    
+    def _analyze_correlations(self, df: pd.DataFrame, numeric_cols: List[str],
+                              numeric_arr: Optional[np.ndarray]) -> Tuple[Dict[str, Any], List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """Correlation matrix, significant correlations and partial correlations from one matrix pass"""
+        calculator = self.correlation_calculator
+        correlation_matrix = calculator.get_correlation_matrix(df, numeric_cols, numeric_arr=numeric_arr)
+        correlations = calculator.calculate_correlations(
+            df, numeric_cols, numeric_arr=numeric_arr, correlation_matrix=correlation_matrix)
+        
+        # Get partial correlations if enough variables
+        partial_correlations = []
+        if len(numeric_cols) >= 3:
+            partial_correlations = calculator.calculate_partial_correlations(
+                df, numeric_cols, numeric_arr=numeric_arr, correlation_matrix=correlation_matrix)
+        
+        return correlation_matrix, correlations, partial_correlations
@@ -4,19 +4,288 @@ Uses Google Gemini API to generate business-focused narratives from statistical
 """
 
 import google.generativeai as genai
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Generator, List, Optional, Tuple
+from collections import OrderedDict
+from functools import lru_cache
+from google.api_core import exceptions as google_exceptions
+import asyncio
+import dataclasses
+import hashlib
+import random
+import re
+import threading
 import time
 import logging
+import orjson
 from config import config
+try:
+    import diskcache
+    DISKCACHE_AVAILABLE = True
+except ImportError:
+    DISKCACHE_AVAILABLE = False
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+# Static part of every prompt. It does not depend on the request (the
+# audience is named at the end of the data section), so every prompt starts
+# with the same bytes.
+_SYSTEM_INSTRUCTION = """You are a data storytelling expert who transforms statistical analysis into clear, 
+business-focused narratives. Your audience is named in the AUDIENCE section of each request and needs 
+actionable insights without technical jargon.
+
+Generate a data story with exactly THREE sections:
+
+1. SUMMARY (150-250 words): Provide an overview of the dataset and what it represents. Describe the overall 
+characteristics, scope, and context of the data.
+
+2. KEY FINDINGS (200-300 words): Highlight the 3-5 most significant insights discovered in the analysis. Focus on 
+trends, patterns, correlations, and anomalies that matter for decision-making. Use specific numbers but explain 
+them in business terms.
+
+3. RECOMMENDATIONS (150-250 words): Provide actionable suggestions based on the findings. What should stakeholders 
+do with these insights? Be specific and practical.
+
+IMPORTANT RULES:
+- Use clear, business-appropriate language
+- Avoid technical statistical terms (no "p-value", "standard deviation" without explanation)
+- All numerical claims must be accurate and based on the provided statistics
+- Write in a professional but engaging tone
+- Focus on "so what?" - why these insights matter
+- Use specific numbers from the analysis to support claims
+"""
+
+# Section layout requested when the model answers in free text rather than JSON
+_MARKDOWN_FORMAT = """
+Format your response with clear section headers:
+## Summary
+[content]
+
+## Key Findings
+[content]
+
+## Recommendations
+[content]
+"""
+
+# Structured output needs an SDK whose GenerationConfig accepts a response
+# schema (newer than the pinned 0.3.2); without it sections are parsed from
+# the markdown headers above
+_JSON_OUTPUT = 'response_schema' in {field.name for field in dataclasses.fields(genai.GenerationConfig)}
+
+_NARRATIVE_SCHEMA = {
+    'type': 'OBJECT',
+    'properties': {
+        'summary': {'type': 'STRING'},
+        'keyFindings': {'type': 'STRING'},
+        'recommendations': {'type': 'STRING'},
+    },
+    'required': ['summary', 'keyFindings', 'recommendations'],
+}
+
+# Section header markers, matched anywhere in a lowercased line and checked
+# in this order so a line naming several sections keeps the first
+_SECTION_PATTERNS = (
+    ('summary', re.compile(r'# summary|summary:|\*\*summary\*\*')),
+    ('keyFindings', re.compile(r'# key findings|key findings:|\*\*key findings\*\*|# findings')),
+    ('recommendations', re.compile(r'# recommendation|recommendations:|\*\*recommendations\*\*')),
+)
+
+# Any header marker at all, so ordinary content lines cost a single scan.
+# Searching the lowercased line is several times faster than re.IGNORECASE.
+_SECTION_RE = re.compile('|'.join(pattern.pattern for _, pattern in _SECTION_PATTERNS))
+
+
+def _header_section(line: str) -> Optional[str]:
+    """Section key named by a header line, or None for a content line"""
+    # Every marker contains '#', ':' or '*'; plain prose lines skip the regex
+    if '#' not in line and ':' not in line and '*' not in line:
+        return None
+    line_lower = line.lower()
+    if not _SECTION_RE.search(line_lower):
+        return None
+    return next(key for key, pattern in _SECTION_PATTERNS if pattern.search(line_lower))
+
+
+# Handlers and levels are configured by the application (main.py)
 logger = logging.getLogger(__name__)
 
 
+class PromptBlockedError(ValueError):
+    """Gemini refused the prompt itself; resending it cannot succeed"""
+
+
+# Failures that repeat for the same request: a blocked prompt, or the API
+# rejecting the request/credentials. Everything else (rate limits, timeouts,
+# server errors, and malformed or incomplete model output, which is sampled
+# afresh on each call) is worth another attempt.
+_PERMANENT_ERRORS = (
+    PromptBlockedError,
+    google_exceptions.InvalidArgument,
+    google_exceptions.FailedPrecondition,
+    google_exceptions.PermissionDenied,
+    google_exceptions.Unauthenticated,
+    google_exceptions.NotFound,
+)
+
+
+class _SectionStreamParser:
+    """
+    Incremental counterpart of NarrativeGenerator._parse_response
+    
+    Fed raw response chunks, it reports each section as soon as the next
+    header closes it; close() reports the last one. Only the current section
+    and a trailing partial line are held.
+    """
+    
+    def __init__(self):
+        self._partial = ''
+        self._section: Optional[str] = None
+        self._content: List[str] = []
+    
+    def feed(self, chunk: str) -> List[Tuple[str, str]]:
+        """Consume a chunk and return the sections it completed"""
+        completed = []
+        lines = (self._partial + chunk).split('\n')
+        self._partial = lines.pop()
+        for line in lines:
+            self._consume(line, completed)
+        return completed
+    
+    def close(self) -> List[Tuple[str, str]]:
+        """Finish the response and return the final section, if any"""
+        completed = []
+        self._consume(self._partial, completed)
+        self._partial = ''
+        self._flush(completed)
+        self._section = None
+        return completed
+    
+    def _consume(self, line: str, completed: List[Tuple[str, str]]) -> None:
+        section = _header_section(line)
+        if section is not None:
+            self._flush(completed)
+            self._section = section
+            self._content = []
+        elif self._section and line.strip():
+            self._content.append(line)
+    
+    def _flush(self, completed: List[Tuple[str, str]]) -> None:
+        if self._section and self._content:
+            completed.append((self._section, '\n'.join(self._content).strip()))
+
+
+class NarrativeCache:
+    """
+    In-process LRU of parsed narratives, keyed by prompt and model settings
+    
+    The prompt already encodes everything from the analysis that reaches
+    Gemini (plus the audience level), so identical prompts under the same
+    model and generation config are answered without an API call. Entries
+    are shared across generator instances and event-loop/worker threads.
+    
+    With a directory (and diskcache installed) entries are also written
+    through to disk, so they survive restarts and are shared by worker
+    processes on the same host; memory misses fall back to the disk tier.
+    """
+    
+    def __init__(self, max_size: int = 256, directory: Optional[str] = None):
+        self.max_size = max_size
+        self._entries: "OrderedDict[bytes, Dict[str, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        
+        self._disk = None
+        if directory:
+            if DISKCACHE_AVAILABLE:
+                self._disk = diskcache.Cache(directory)
+            else:
+                logger.warning("NARRATIVE_CACHE_DIR is set but diskcache is not installed; "
+                               "caching narratives in memory only")
+    
+    @staticmethod
+    def key_for(prompt: str, model_name: str, generation_config: Dict[str, Any]) -> bytes:
+        """Hash the prompt together with the model and its generation settings"""
+        settings = orjson.dumps([model_name, generation_config], option=orjson.OPT_SORT_KEYS)
+        digest = hashlib.blake2b(settings, digest_size=16)
+        digest.update(b'\0')
+        digest.update(prompt.encode())
+        # Raw 16-byte digest: half the size of the hex form as a dict key
+        return digest.digest()
+    
+    def get(self, key: bytes) -> Optional[Dict[str, str]]:
+        with self._lock:
+            narratives = self._entries.get(key)
+            if narratives is not None:
+                self._entries.move_to_end(key)
+                return dict(narratives)
+        
+        if self._disk is None:
+            return None
+        narratives = self._disk.get(key)
+        if narratives is None:
+            return None
+        self._remember(key, narratives)
+        return dict(narratives)
+    
+    def set(self, key: bytes, narratives: Dict[str, str]) -> None:
+        self._remember(key, narratives)
+        if self._disk is not None:
+            self._disk.set(key, dict(narratives))
+    
+    def clear(self) -> None:
+        """Drop all entries, on disk as well as in memory"""
+        with self._lock:
+            self._entries.clear()
+        if self._disk is not None:
+            self._disk.clear()
+    
+    def _remember(self, key: bytes, narratives: Dict[str, str]) -> None:
+        with self._lock:
+            self._entries[key] = dict(narratives)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+
+narrative_cache = NarrativeCache(max_size=config.NARRATIVE_CACHE_SIZE, directory=config.NARRATIVE_CACHE_DIR)
+
+# The SDK keeps one grpc.aio client per process, bound to the event loop it
+# was first used on, so every synchronous batch runs on this one loop
+_batch_loop: Optional[asyncio.AbstractEventLoop] = None
+_batch_loop_lock = threading.Lock()
+
+
+def _get_batch_loop() -> asyncio.AbstractEventLoop:
+    """Event loop shared by all run_batch_sync calls, started on first use"""
+    global _batch_loop
+    with _batch_loop_lock:
+        if _batch_loop is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name='narrative-batch-loop', daemon=True).start()
+            _batch_loop = loop
+        return _batch_loop
+
+
 class NarrativeGenerator:
     """Generates AI-powered narratives from statistical analysis results"""
     
+    # Exponential backoff between attempts: 1s, 2s, 4s (before jitter)
+    RETRY_DELAYS = [1, 2, 4]
+    
+    # In-flight Gemini calls allowed per generate_variants_async/_batch call
+    MAX_CONCURRENT_REQUESTS = 5
+    
+    # Items per analysis section that reach the prompt (and so the cache key);
+    # the analysis lists are sliced in place rather than copied into a slim dict
+    PROMPT_LIMITS = {
+        'trends': 5,
+        'correlations': 5,
+        'distributions': 5,
+        'frequencies': 3,
+        'outliers': 3,
+    }
+    PROMPT_TOP_CATEGORIES = 3
+    
+    # Audience levels produced by generate_all_audiences
+    AUDIENCE_LEVELS = ('executive', 'technical', 'general')
+    
     def __init__(self, api_key: Optional[str] = None, model: Optional[str] = None):
         """
         Initialize the narrative generator
@@ -45,6 +314,15 @@ class NarrativeGenerator:
             "top_k": 40,
         }
         
+        # JSON mode spends no tokens on headers and needs no header parsing
+        self.json_output = _JSON_OUTPUT
+        if self.json_output:
+            self.generation_config["response_mime_type"] = "application/json"
+            self.generation_config["response_schema"] = _NARRATIVE_SCHEMA
+            self.system_instruction = _SYSTEM_INSTRUCTION
+        else:
+            self.system_instruction = _SYSTEM_INSTRUCTION + _MARKDOWN_FORMAT
+        
         self.model = genai.GenerativeModel(
             model_name=self.model_name,
             generation_config=self.generation_config
@@ -65,6 +343,19 @@ class NarrativeGenerator:
         Returns:
             Formatted prompt string
         """
+        return self.system_instruction + "\n" + self._build_data_section(analysis, audience_level)
+    
+    def _build_data_section(self, analysis: Dict[str, Any], audience_level: str = 'general') -> str:
+        """
+        Build the per-request part of the prompt from the analysis results
+        
+        Args:
+            analysis: Statistical analysis results
+            audience_level: Target audience ('executive', 'technical', 'general')
+            
+        Returns:
+            Statistics and audience sections followed by the closing request
+        """
         # Extract key statistics
         summary = analysis.get('summary', {})
         trends = analysis.get('trends', [])
@@ -72,48 +363,11 @@ class NarrativeGenerator:
         distributions = analysis.get('distributions', [])
         frequencies = analysis.get('frequencies', [])
         outliers = analysis.get('outliers', [])
+        limits = self.PROMPT_LIMITS
         
         # Build prompt sections
         prompt_parts = []
         
-        # System instruction
-        system_instruction = f"""You are a data storytelling expert who transforms statistical analysis into clear, 
-business-focused narratives. Your audience is {audience_level} level stakeholders who need actionable insights 
-without technical jargon.
-
-Generate a data story with exactly THREE sections:
-
-1. SUMMARY (150-250 words): Provide an overview of the dataset and what it represents. Describe the overall 
-characteristics, scope, and context of the data.
-
-2. KEY FINDINGS (200-300 words): Highlight the 3-5 most significant insights discovered in the analysis. Focus on 
-trends, patterns, correlations, and anomalies that matter for decision-making. Use specific numbers but explain 
-them in business terms.
-
-3. RECOMMENDATIONS (150-250 words): Provide actionable suggestions based on the findings. What should stakeholders 
-do with these insights? Be specific and practical.
-
-IMPORTANT RULES:
-- Use clear, business-appropriate language
-- Avoid technical statistical terms (no "p-value", "standard deviation" without explanation)
-- All numerical claims must be accurate and based on the provided statistics
-- Write in a professional but engaging tone
-- Focus on "so what?" - why these insights matter
-- Use specific numbers from the analysis to support claims
-
-Format your response with clear section headers:
-## Summary
-[content]
-
-## Key Findings
-[content]
-
-## Recommendations
-[content]
-"""
-        
-        prompt_parts.append(system_instruction)
-        
         # Dataset overview
         prompt_parts.append(f"\n\n### DATASET OVERVIEW")
         prompt_parts.append(f"- Total rows: {summary.get('total_rows', 0)}")
@@ -125,7 +379,7 @@ Format your response with clear section headers:
         # Trends
         if trends:
             prompt_parts.append(f"\n\n### TRENDS DETECTED")
-            for i, trend in enumerate(trends[:5], 1):
+            for i, trend in enumerate(trends[:limits['trends']], 1):
                 column = trend.get('column', 'Unknown')
                 direction = trend.get('direction', 'stable')
                 time_column = trend.get('time_column', 'time')
@@ -140,7 +394,7 @@ Format your response with clear section headers:
         # Correlations
         if correlations:
             prompt_parts.append(f"\n\n### CORRELATIONS FOUND")
-            for i, corr in enumerate(correlations[:5], 1):
+            for i, corr in enumerate(correlations[:limits['correlations']], 1):
                 column1 = corr.get('column1', 'Unknown')
                 column2 = corr.get('column2', 'Unknown')
                 significance = corr.get('significance', 'moderate')
@@ -155,7 +409,7 @@ Format your response with clear section headers:
         # Distributions
         if distributions:
             prompt_parts.append(f"\n\n### DISTRIBUTION STATISTICS")
-            for i, dist in enumerate(distributions[:5], 1):
+            for i, dist in enumerate(distributions[:limits['distributions']], 1):
                 column = dist.get('column', 'Unknown')
                 mean = dist.get('mean', 0)
                 median = dist.get('median', 0)
@@ -171,8 +425,8 @@ Format your response with clear section headers:
         # Frequencies
         if frequencies:
             prompt_parts.append(f"\n\n### CATEGORICAL DISTRIBUTIONS")
-            for i, freq in enumerate(frequencies[:3], 1):
-                top_cats = freq.get('top_categories', [])[:3]
+            for i, freq in enumerate(frequencies[:limits['frequencies']], 1):
+                top_cats = freq.get('top_categories', [])[:self.PROMPT_TOP_CATEGORIES]
                 if top_cats:
                     cats_str = ", ".join([f"{cat['value']} ({cat['percentage']:.1f}%)" for cat in top_cats])
                     prompt_parts.append(
@@ -187,31 +441,32 @@ Format your response with clear section headers:
         # Outliers
         if outliers:
             prompt_parts.append(f"\n\n### OUTLIERS DETECTED")
-            for i, outlier in enumerate(outliers[:3], 1):
+            for i, outlier in enumerate(outliers[:limits['outliers']], 1):
+                iqr_method = outlier.get('methods', {}).get('iqr')
+                
                 # Get consensus outlier info if available, otherwise use IQR method
-                if 'consensus' in outlier and outlier['consensus'].get('count', 0) > 0:
-                    count = outlier['consensus']['count']
-                    # Get IQR bounds for context
-                    iqr_method = outlier.get('methods', {}).get('iqr', {})
-                    lower_bound = iqr_method.get('lower_bound', 0)
-                    upper_bound = iqr_method.get('upper_bound', 0)
-                    percentage = iqr_method.get('percentage', 0)
-                    
-                    prompt_parts.append(
-                        f"{i}. {outlier['column']}: {count} outliers ({percentage:.1f}% of data) "
-                        f"outside range [{lower_bound:.2f}, {upper_bound:.2f}]"
-                    )
-                elif 'methods' in outlier and 'iqr' in outlier['methods']:
-                    iqr_method = outlier['methods']['iqr']
+                count = outlier.get('consensus', {}).get('count', 0)
+                if count <= 0:
+                    if iqr_method is None:
+                        continue
                     count = iqr_method.get('count', 0)
-                    percentage = iqr_method.get('percentage', 0)
-                    lower_bound = iqr_method.get('lower_bound', 0)
-                    upper_bound = iqr_method.get('upper_bound', 0)
-                    
-                    prompt_parts.append(
-                        f"{i}. {outlier['column']}: {count} outliers ({percentage:.1f}% of data) "
-                        f"outside range [{lower_bound:.2f}, {upper_bound:.2f}]"
-                    )
+                
+                # IQR bounds give context either way
+                if iqr_method is None:
+                    iqr_method = {}
+                lower_bound = iqr_method.get('lower_bound', 0)
+                upper_bound = iqr_method.get('upper_bound', 0)
+                percentage = iqr_method.get('percentage', 0)
+                
+                prompt_parts.append(
+                    f"{i}. {outlier['column']}: {count} outliers ({percentage:.1f}% of data) "
+                    f"outside range [{lower_bound:.2f}, {upper_bound:.2f}]"
+                )
+        
+        # Audience goes last so prompts for different audiences of the same
+        # analysis share everything before it as a common prefix
+        prompt_parts.append(f"\n\n### AUDIENCE")
+        prompt_parts.append(f"Write for {audience_level} level stakeholders.")
         
         prompt_parts.append("\n\nNow generate the three-section narrative based on this analysis:")
         
@@ -227,6 +482,9 @@ Format your response with clear section headers:
         Returns:
             Dictionary with 'summary', 'keyFindings', 'recommendations' keys
         """
+        if self.json_output:
+            return self._parse_json_response(response_text)
+        
         sections = {
             'summary': '',
             'keyFindings': '',
@@ -239,28 +497,15 @@ Format your response with clear section headers:
         current_content = []
         
         for line in lines:
-            line_lower = line.lower().strip()
-            
             # Detect section headers - be more flexible with matching
-            if any(marker in line_lower for marker in ['## summary', '# summary', 'summary:', '**summary**']):
+            header = _header_section(line)
+            if header is not None:
                 if current_section and current_content:
                     sections[current_section] = '\n'.join(current_content).strip()
-                current_section = 'summary'
+                current_section = header
                 current_content = []
                 # Skip the header line itself
                 continue
-            elif any(marker in line_lower for marker in ['## key findings', '# key findings', 'key findings:', '**key findings**', '## findings', '# findings']):
-                if current_section and current_content:
-                    sections[current_section] = '\n'.join(current_content).strip()
-                current_section = 'keyFindings'
-                current_content = []
-                continue
-            elif any(marker in line_lower for marker in ['## recommendations', '# recommendations', 'recommendations:', '**recommendations**', '## recommendation', '# recommendation']):
-                if current_section and current_content:
-                    sections[current_section] = '\n'.join(current_content).strip()
-                current_section = 'recommendations'
-                current_content = []
-                continue
             elif current_section and line.strip():
                 # Include all non-empty lines (including those starting with #)
                 current_content.append(line)
@@ -284,6 +529,182 @@ Format your response with clear section headers:
         
         return sections
     
+    def _extract_response_text(self, response: Any) -> str:
+        """
+        Check a Gemini response for blocks and return its text
+        
+        Args:
+            response: Complete (or fully consumed streaming) Gemini response
+            
+        Returns:
+            Non-empty response text
+            
+        Raises:
+            ValueError: If the response is empty or was blocked
+        """
+        # Extract text from response - handle both simple and complex responses
+        if not response:
+            raise ValueError("Empty response from Gemini API")
+        
+        # Check for safety filter blocks
+        if hasattr(response, 'prompt_feedback'):
+            if hasattr(response.prompt_feedback, 'block_reason'):
+                block_reason = response.prompt_feedback.block_reason
+                if block_reason:
+                    raise PromptBlockedError(f"Gemini API blocked the prompt: {block_reason}")
+        
+        # Check if response was blocked
+        if not response.candidates or len(response.candidates) == 0:
+            raise ValueError("No candidates in Gemini API response - possibly blocked by safety filters")
+        
+        candidate = response.candidates[0]
+        
+        # Check finish reason
+        if hasattr(candidate, 'finish_reason'):
+            finish_reason = str(candidate.finish_reason)
+            if 'SAFETY' in finish_reason:
+                raise ValueError(f"Response blocked by safety filters: {finish_reason}")
+            elif finish_reason not in ['STOP', '1', 'FinishReason.STOP']:
+                logger.warning(f"Unusual finish reason: {finish_reason}")
+        
+        try:
+            # Try simple text accessor first
+            response_text = response.text
+        except Exception as e:
+            # Fall back to parts accessor for complex responses
+            logger.debug("Failed to get response.text: %s, trying parts accessor", e)
+            if candidate.content and candidate.content.parts:
+                parts = candidate.content.parts
+                response_text = ''.join(part.text for part in parts if hasattr(part, 'text'))
+            else:
+                raise ValueError(f"No valid response content from Gemini API: {str(e)}")
+        
+        if not response_text or not response_text.strip():
+            raise ValueError("Empty response text from Gemini API")
+        
+        return response_text
+    
+    @staticmethod
+    def _is_retryable(error: Exception) -> bool:
+        """Whether another attempt at the same prompt could succeed"""
+        return not isinstance(error, _PERMANENT_ERRORS)
+    
+    def _retry_delay(self, attempt: int) -> float:
+        """
+        Backoff before the next attempt, jittered to ±50% so concurrent
+        requests throttled together do not retry in lockstep
+        """
+        return self.RETRY_DELAYS[attempt] * random.uniform(0.5, 1.5)
+    
+    @staticmethod
+    def _use_empty_fallback(analysis: Dict[str, Any]) -> bool:
+        """Whether the analysis has nothing for Gemini to narrate and the fallback is enabled"""
+        if not config.NARRATIVE_EMPTY_FALLBACK:
+            return False
+        return not any(analysis.get(key) for key in ('trends', 'correlations', 'distributions',
+                                                       'frequencies', 'outliers'))
+    
+    @staticmethod
+    def _empty_analysis_narrative(analysis: Dict[str, Any]) -> Dict[str, str]:
+        """
+        Templated narrative for an analysis with no trends, correlations,
+        distributions, frequencies or outliers
+        
+        Without any findings Gemini can only produce boilerplate, so this is
+        returned without an API call.
+        
+        Args:
+            analysis: Statistical analysis results (only 'summary' is used)
+            
+        Returns:
+            Dictionary with narrative sections
+        """
+        summary = analysis.get('summary', {})
+        logger.info("Analysis has no findings; using the templated narrative")
+        
+        return {
+            'summary': (
+                f"This dataset contains {summary.get('total_rows', 0)} rows across "
+                f"{summary.get('total_columns', 0)} columns ({summary.get('numeric_columns', 0)} numeric, "
+                f"{summary.get('categorical_columns', 0)} categorical and "
+                f"{summary.get('datetime_columns', 0)} date/time). The analysis did not find enough "
+                f"structured data to describe trends, relationships or typical values."
+            ),
+            'keyFindings': (
+                "No significant findings were detected. The checks for trends over time, relationships "
+                "between columns, value distributions, common categories and unusual values all came "
+                "back empty. This usually means the columns hold mostly free text, identifiers or "
+                "missing entries rather than measurable values."
+            ),
+            'recommendations': (
+                "Confirm that the file contains the intended data and that numbers and dates are "
+                "formatted consistently so they are recognized as such. Adding more rows, or columns "
+                "that measure outcomes over time or by category, will give the analysis something "
+                "to work with. Then run the analysis again."
+            ),
+        }
+    
+    def _complete_attempt(self, prompt: str, response: Any, analysis: Dict[str, Any],
+                          attempt: int) -> Dict[str, str]:
+        """
+        Turn one Gemini response into validated narrative sections
+        
+        Args:
+            prompt: The prompt that produced the response
+            response: Complete Gemini response
+            analysis: Source statistical analysis
+            attempt: Zero-based attempt number
+            
+        Returns:
+            Dictionary with narrative sections
+        """
+        response_text = self._extract_response_text(response)
+        
+        # Log response for debugging (truncated)
+        logger.debug("Response (first 500 chars): %.500s...", response_text)
+        
+        # Parse response into sections
+        narratives = self._parse_response(response_text)
+        
+        # Validate narratives
+        self._validate_narratives(narratives, analysis)
+        
+        logger.info("Narrative generation successful")
+        
+        # Log API interaction
+        self._log_api_interaction(prompt, response_text, attempt + 1, success=True)
+        
+        return narratives
+    
+    def _parse_json_response(self, response_text: str) -> Dict[str, str]:
+        """
+        Read the three narrative sections from a JSON-mode response
+        
+        Args:
+            response_text: JSON object returned under _NARRATIVE_SCHEMA
+            
+        Returns:
+            Dictionary with 'summary', 'keyFindings', 'recommendations' keys
+            
+        Raises:
+            ValueError: If the text is not a JSON object or a section is empty
+        """
+        data = orjson.loads(response_text)
+        if not isinstance(data, dict):
+            raise ValueError("Gemini JSON response is not an object")
+        
+        sections = {
+            key: str(data.get(key) or '').strip()
+            for key in ('summary', 'keyFindings', 'recommendations')
+        }
+        
+        missing_sections = [key for key, value in sections.items() if not value]
+        if missing_sections:
+            logger.error("Missing sections: %s", missing_sections)
+            raise ValueError(f"Missing section(s): {', '.join(missing_sections)}")
+        
+        return sections
+    
     def generate_narrative(self, analysis: Dict[str, Any], metadata: Dict[str, Any],
                           audience_level: str = 'general') -> Dict[str, str]:
         """
@@ -300,95 +721,366 @@ Format your response with clear section headers:
         Raises:
             Exception: If generation fails after all retries
         """
+        if self._use_empty_fallback(analysis):
+            return self._empty_analysis_narrative(analysis)
+        
         prompt = self._build_prompt(analysis, metadata, audience_level)
         
+        # Identical prompts are answered from the cache without an API call
+        cache_key = NarrativeCache.key_for(prompt, self.model_name, self.generation_config)
+        cached = narrative_cache.get(cache_key)
+        if cached is not None:
+            logger.info("Narrative served from cache")
+            return cached
+        
         last_error = None
-        retry_delays = [1, 2, 4]  # Exponential backoff: 1s, 2s, 4s
         
         for attempt in range(self.max_retries):
             try:
                 logger.info(f"Generating narrative (attempt {attempt + 1}/{self.max_retries})")
                 
                 # Log prompt for debugging (truncated)
-                logger.debug(f"Prompt (first 500 chars): {prompt[:500]}...")
+                logger.debug("Prompt (first 500 chars): %.500s...", prompt)
                 
                 # Generate content
                 response = self.model.generate_content(prompt)
+                narratives = self._complete_attempt(prompt, response, analysis, attempt)
+                narrative_cache.set(cache_key, narratives)
+                return narratives
                 
-                # Extract text from response - handle both simple and complex responses
-                if not response:
-                    raise ValueError("Empty response from Gemini API")
+            except Exception as e:
+                last_error = e
+                logger.warning(f"Narrative generation attempt {attempt + 1} failed: {str(e)}")
                 
-                # Check for safety filter blocks
-                if hasattr(response, 'prompt_feedback'):
-                    if hasattr(response.prompt_feedback, 'block_reason'):
-                        block_reason = response.prompt_feedback.block_reason
-                        if block_reason:
-                            raise ValueError(f"Gemini API blocked the prompt: {block_reason}")
+                # Log failed interaction
+                self._log_api_interaction(prompt, str(e), attempt + 1, success=False)
                 
-                # Check if response was blocked
-                if not response.candidates or len(response.candidates) == 0:
-                    raise ValueError("No candidates in Gemini API response - possibly blocked by safety filters")
+                # The same prompt would fail the same way again
+                if not self._is_retryable(e):
+                    break
                 
-                candidate = response.candidates[0]
+                # Wait before retry (except on last attempt)
+                if attempt < self.max_retries - 1:
+                    delay = self._retry_delay(attempt)
+                    logger.info(f"Retrying in {delay:.1f} seconds...")
+                    time.sleep(delay)
+        
+        # All retries failed
+        error_msg = f"Narrative generation failed after {attempt + 1} attempts. Last error: {str(last_error)}"
+        logger.error(error_msg)
+        raise Exception(error_msg)
+    
+    async def generate_narrative_async(self, analysis: Dict[str, Any], metadata: Dict[str, Any],
+                                       audience_level: str = 'general') -> Dict[str, str]:
+        """
+        Generate narrative without blocking the event loop
+        
+        Same retry, parsing and validation as generate_narrative, but the Gemini
+        call is awaited and backoff uses asyncio.sleep, so one event loop can keep
+        many requests in flight instead of pinning a thread per request.
+        
+        Args:
+            analysis: Statistical analysis results
+            metadata: Dataset metadata
+            audience_level: Target audience level
+            
+        Returns:
+            Dictionary with narrative sections
+            
+        Raises:
+            Exception: If generation fails after all retries
+        """
+        if self._use_empty_fallback(analysis):
+            return self._empty_analysis_narrative(analysis)
+        
+        prompt = self._build_prompt(analysis, metadata, audience_level)
+        
+        cache_key = NarrativeCache.key_for(prompt, self.model_name, self.generation_config)
+        cached = narrative_cache.get(cache_key)
+        if cached is not None:
+            logger.info("Narrative served from cache")
+            return cached
+        
+        last_error = None
+        
+        for attempt in range(self.max_retries):
+            try:
+                logger.info(f"Generating narrative (attempt {attempt + 1}/{self.max_retries})")
                 
-                # Check finish reason
-                if hasattr(candidate, 'finish_reason'):
-                    finish_reason = str(candidate.finish_reason)
-                    if 'SAFETY' in finish_reason:
-                        raise ValueError(f"Response blocked by safety filters: {finish_reason}")
-                    elif finish_reason not in ['STOP', '1', 'FinishReason.STOP']:
-                        logger.warning(f"Unusual finish reason: {finish_reason}")
+                response = await self.model.generate_content_async(prompt)
+                narratives = self._complete_attempt(prompt, response, analysis, attempt)
+                narrative_cache.set(cache_key, narratives)
+                return narratives
                 
-                try:
-                    # Try simple text accessor first
-                    response_text = response.text
-                except Exception as e:
-                    # Fall back to parts accessor for complex responses
-                    logger.debug(f"Failed to get response.text: {e}, trying parts accessor")
-                    if candidate.content and candidate.content.parts:
-                        parts = candidate.content.parts
-                        response_text = ''.join(part.text for part in parts if hasattr(part, 'text'))
-                    else:
-                        raise ValueError(f"No valid response content from Gemini API: {str(e)}")
+            except Exception as e:
+                last_error = e
+                logger.warning(f"Narrative generation attempt {attempt + 1} failed: {str(e)}")
+                self._log_api_interaction(prompt, str(e), attempt + 1, success=False)
                 
-                if not response_text or not response_text.strip():
-                    raise ValueError("Empty response text from Gemini API")
+                if not self._is_retryable(e):
+                    break
                 
-                # Log response for debugging (truncated)
-                logger.debug(f"Response (first 500 chars): {response_text[:500]}...")
+                if attempt < self.max_retries - 1:
+                    delay = self._retry_delay(attempt)
+                    logger.info(f"Retrying in {delay:.1f} seconds...")
+                    await asyncio.sleep(delay)
+        
+        error_msg = f"Narrative generation failed after {attempt + 1} attempts. Last error: {str(last_error)}"
+        logger.error(error_msg)
+        raise Exception(error_msg)
+    
+    async def generate_variants_async(self, analysis: Dict[str, Any], metadata: Dict[str, Any],
+                                      audience_levels: List[str]) -> Dict[str, Dict[str, str]]:
+        """
+        Generate one narrative per audience level concurrently
+        
+        At most MAX_CONCURRENT_REQUESTS calls are in flight at once to stay
+        within Gemini rate limits.
+        
+        Args:
+            analysis: Statistical analysis results
+            metadata: Dataset metadata
+            audience_levels: Target audience levels, e.g. ['executive', 'technical']
+            
+        Returns:
+            Dictionary mapping each audience level to its narrative sections
+            
+        Raises:
+            Exception: If any variant fails after all retries
+        """
+        results = await self._generate_bounded(
+            [(analysis, metadata, level) for level in audience_levels]
+        )
+        return dict(zip(audience_levels, results))
+    
+    async def generate_narrative_batch(self, jobs: List[Dict[str, Any]],
+                                       max_concurrency: Optional[int] = None) -> List[Any]:
+        """
+        Generate narratives for many datasets, e.g. an offline backfill
+        
+        Jobs share the async client with at most max_concurrency in flight,
+        and repeated prompts are answered from the narrative cache. One job
+        failing after its retries does not abort the others.
+        
+        Args:
+            jobs: Dicts with 'analysis', 'metadata' and optional 'audience_level'
+            max_concurrency: In-flight request limit (defaults to MAX_CONCURRENT_REQUESTS)
+            
+        Returns:
+            Per job, in order, its narrative sections or the exception it raised
+        """
+        return await self._generate_bounded(
+            [(job['analysis'], job['metadata'], job.get('audience_level', 'general')) for job in jobs],
+            return_exceptions=True,
+            max_concurrency=max_concurrency
+        )
+    
+    def run_batch_sync(self, jobs: List[Dict[str, Any]],
+                       max_concurrency: Optional[int] = None) -> List[Any]:
+        """
+        generate_narrative_batch for synchronous callers such as scripts
+        
+        Blocks until the batch is done. Batches run on a long-lived background
+        loop rather than a fresh asyncio.run loop, which would leave the SDK's
+        async client bound to a closed loop from the second call on. Code
+        already inside an event loop should await generate_narrative_batch.
+        
+        Args:
+            jobs: Dicts with 'analysis', 'metadata' and optional 'audience_level'
+            max_concurrency: In-flight request limit (defaults to MAX_CONCURRENT_REQUESTS)
+            
+        Returns:
+            Per job, in order, its narrative sections or the exception it raised
+        """
+        future = asyncio.run_coroutine_threadsafe(
+            self.generate_narrative_batch(jobs, max_concurrency), _get_batch_loop()
+        )
+        return future.result()
+    
+    async def _generate_bounded(self, requests: List[Tuple[Dict[str, Any], Dict[str, Any], str]],
+                                return_exceptions: bool = False,
+                                max_concurrency: Optional[int] = None) -> List[Any]:
+        """
+        Run generate_narrative_async over (analysis, metadata, audience_level)
+        requests with bounded concurrency, returning results in request order
+        """
+        semaphore = asyncio.Semaphore(max_concurrency or self.MAX_CONCURRENT_REQUESTS)
+        
+        async def generate(analysis: Dict[str, Any], metadata: Dict[str, Any],
+                           audience_level: str) -> Dict[str, str]:
+            async with semaphore:
+                return await self.generate_narrative_async(analysis, metadata, audience_level)
+        
+        return await asyncio.gather(
+            *(generate(*request) for request in requests), return_exceptions=return_exceptions
+        )
+    
+    async def generate_all_audiences(self, analysis: Dict[str, Any],
+                                     metadata: Dict[str, Any]) -> Dict[str, Dict[str, str]]:
+        """
+        Generate the executive, technical and general narratives concurrently
+        
+        The three prompts differ only in their trailing AUDIENCE section, so
+        the system instruction and statistics form a shared prefix that
+        server-side prefix caching can reuse.
+        
+        Args:
+            analysis: Statistical analysis results
+            metadata: Dataset metadata
+            
+        Returns:
+            Dictionary mapping each of AUDIENCE_LEVELS to its narrative sections
+        """
+        return await self.generate_variants_async(analysis, metadata, list(self.AUDIENCE_LEVELS))
+    
+    def generate_narrative_stream(self, analysis: Dict[str, Any], metadata: Dict[str, Any],
+                                  audience_level: str = 'general') -> Generator[str, None, Dict[str, str]]:
+        """
+        Stream narrative text as Gemini generates it
+        
+        Yields raw text chunks (section headers included) so the Summary can be
+        shown while Key Findings and Recommendations are still being generated.
+        Once the stream completes the joined text is parsed and validated exactly
+        like generate_narrative, and the sections dict is the generator's return
+        value (available through ``yield from`` or StopIteration.value).
+        
+        Attempts that fail before any text has been yielded are retried with the
+        usual backoff; a failure after that is raised, since the caller already
+        holds part of the narrative.
+        
+        Args:
+            analysis: Statistical analysis results
+            metadata: Dataset metadata
+            audience_level: Target audience level
+            
+        Yields:
+            Text chunks in generation order
+            
+        Returns:
+            Dictionary with narrative sections
+            
+        Raises:
+            Exception: If generation fails after all retries
+        """
+        if self._use_empty_fallback(analysis):
+            narratives = self._empty_analysis_narrative(analysis)
+            yield self._narrative_markdown(narratives)
+            return narratives
+        
+        prompt = self._build_prompt(analysis, metadata, audience_level)
+        
+        # A narrative already generated for this prompt (e.g. by /analyze) is
+        # replayed as a single chunk instead of paying for another call
+        cache_key = NarrativeCache.key_for(prompt, self.model_name, self.generation_config)
+        cached = narrative_cache.get(cache_key)
+        if cached is not None:
+            logger.info("Narrative served from cache")
+            yield self._narrative_markdown(cached)
+            return cached
+        
+        last_error = None
+        
+        for attempt in range(self.max_retries):
+            buffer = []
+            try:
+                logger.info(f"Streaming narrative (attempt {attempt + 1}/{self.max_retries})")
                 
-                # Parse response into sections
-                narratives = self._parse_response(response_text)
+                stream = self.model.generate_content(prompt, stream=True)
+                for chunk in stream:
+                    text = chunk.text
+                    if text:
+                        buffer.append(text)
+                        yield text
+                stream.resolve()
                 
-                # Validate narratives
-                self._validate_narratives(narratives, analysis)
+                # The resolved stream carries the aggregated candidates and
+                # feedback, so the usual block checks apply to it unchanged
+                self._extract_response_text(stream)
+                response_text = ''.join(buffer)
                 
-                logger.info("Narrative generation successful")
+                narratives = self._parse_response(response_text)
+                self._validate_narratives(narratives, analysis)
                 
-                # Log API interaction
+                logger.info("Narrative streaming successful")
                 self._log_api_interaction(prompt, response_text, attempt + 1, success=True)
                 
+                narrative_cache.set(cache_key, narratives)
                 return narratives
                 
             except Exception as e:
                 last_error = e
-                logger.warning(f"Narrative generation attempt {attempt + 1} failed: {str(e)}")
-                
-                # Log failed interaction
+                logger.warning(f"Narrative streaming attempt {attempt + 1} failed: {str(e)}")
                 self._log_api_interaction(prompt, str(e), attempt + 1, success=False)
                 
-                # Wait before retry (except on last attempt)
+                # Text already handed to the caller cannot be taken back
+                if buffer:
+                    raise
+                
+                if not self._is_retryable(e):
+                    break
+                
                 if attempt < self.max_retries - 1:
-                    delay = retry_delays[attempt]
-                    logger.info(f"Retrying in {delay} seconds...")
+                    delay = self._retry_delay(attempt)
+                    logger.info(f"Retrying in {delay:.1f} seconds...")
                     time.sleep(delay)
         
-        # All retries failed
-        error_msg = f"Narrative generation failed after {self.max_retries} attempts. Last error: {str(last_error)}"
+        error_msg = f"Narrative streaming failed after {attempt + 1} attempts. Last error: {str(last_error)}"
         logger.error(error_msg)
         raise Exception(error_msg)
     
+    @staticmethod
+    def _narrative_markdown(narratives: Dict[str, str]) -> str:
+        """Render finished sections in the markdown layout the model streams"""
+        return (
+            f"## Summary\n\n{narratives['summary']}\n\n"
+            f"## Key Findings\n\n{narratives['keyFindings']}\n\n"
+            f"## Recommendations\n\n{narratives['recommendations']}"
+        )
+    
+    def generate_sections_stream(self, analysis: Dict[str, Any], metadata: Dict[str, Any],
+                                 audience_level: str = 'general'
+                                 ) -> Generator[Tuple[str, str], None, Dict[str, str]]:
+        """
+        Stream narrative sections, each as soon as Gemini finishes it
+        
+        Built on generate_narrative_stream: chunks are split into sections on
+        the fly, so the Summary arrives while Key Findings is being decoded.
+        The last section is only emitted once the full response has passed
+        validation. A section repeated by the model is emitted again, and
+        the later text is what the returned dict keeps, as in _parse_response.
+        In JSON output mode sections are not delimited in the text, so all
+        three are emitted once the response is complete.
+        
+        Args:
+            analysis: Statistical analysis results
+            metadata: Dataset metadata
+            audience_level: Target audience level
+            
+        Yields:
+            (section key, section text) tuples in generation order
+            
+        Returns:
+            Dictionary with narrative sections
+        """
+        stream = self.generate_narrative_stream(analysis, metadata, audience_level)
+        parser = None if self.json_output else _SectionStreamParser()
+        
+        while True:
+            try:
+                chunk = next(stream)
+            except StopIteration as stop:
+                narratives = stop.value
+                break
+            if parser is not None:
+                yield from parser.feed(chunk)
+        
+        if parser is not None:
+            yield from parser.close()
+        else:
+            yield from narratives.items()
+        
+        return narratives
+    
     def _validate_narratives(self, narratives: Dict[str, str], analysis: Dict[str, Any]) -> None:
         """
         Validate generated narratives against source data
@@ -438,15 +1130,25 @@ Format your response with clear section headers:
             attempt: Attempt number
             success: Whether the call succeeded
         """
-        log_entry = {
-            'timestamp': time.time(),
-            'model': self.model_name,
-            'attempt': attempt,
-            'success': success,
-            'prompt_length': len(prompt),
-            'response_length': len(response) if success else 0,
-            'error': None if success else response
-        }
+        if not logger.isEnabledFor(logging.INFO):
+            return
         
         # In production, this would go to a proper logging/monitoring system
-        logger.info(f"API Interaction: {log_entry}")
+        logger.info(
+            "API Interaction: model=%s attempt=%d success=%s prompt_length=%d response_length=%d error=%s",
+            self.model_name, attempt, success, len(prompt),
+            len(response) if success else 0, None if success else response
+        )
+
+
+@lru_cache(maxsize=1)
+def get_narrative_generator() -> NarrativeGenerator:
+    """
+    Process-wide generator built from config
+    
+    genai.configure and the GenerativeModel (with its transport) are set up
+    once instead of per request. The generator keeps no per-call state, so
+    concurrent requests can share it. A failed construction (e.g. missing
+    API key) is not cached and is retried on the next call.
+    """
+    return NarrativeGenerator()
@@ -5,18 +5,36 @@ Handles file reading, type detection, and data cleaning
 
 import pandas as pd
 import numpy as np
-from typing import Dict, Any, Tuple
-import io
+from typing import Dict, Any, BinaryIO, Optional, Tuple
+import tempfile
 import requests
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+try:
+    import pyarrow.csv as pacsv
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
 
 
 class DataPreprocessor:
     """Preprocesses uploaded datasets for analysis"""
     
-    def __init__(self, min_columns: int = 2, min_rows: int = 10):
+    # Downloads are streamed in chunks and spill to a temporary file past
+    # the spool size, so a large upload is never held in memory as bytes
+    DOWNLOAD_CHUNK_SIZE = 1 << 20
+    DOWNLOAD_SPOOL_SIZE = 64 << 20
+    
+    # Values parsed to decide whether an object column holds dates
+    DATETIME_PROBE_SIZE = 100
+    
+    def __init__(self, min_columns: int = 2, min_rows: int = 10, max_workers: int = 4,
+                 memory_efficient: bool = True):
         self.min_columns = min_columns
         self.min_rows = min_rows
+        self.max_workers = max_workers
+        # Store integer columns in the smallest integer type that holds them
+        self.memory_efficient = memory_efficient
     
     def read_file(self, file_url: str) -> pd.DataFrame:
         """
@@ -28,28 +46,71 @@ class DataPreprocessor:
         Returns:
             pandas DataFrame
         """
-        response = requests.get(file_url, timeout=30)
-        response.raise_for_status()
-        
-        content = response.content
+        with tempfile.SpooledTemporaryFile(max_size=self.DOWNLOAD_SPOOL_SIZE) as buffer:
+            with requests.get(file_url, stream=True, timeout=30) as response:
+                response.raise_for_status()
+                for chunk in response.iter_content(chunk_size=self.DOWNLOAD_CHUNK_SIZE):
+                    buffer.write(chunk)
+            
+            return self._parse_file(buffer)
+    
+    def _parse_file(self, buffer: BinaryIO) -> pd.DataFrame:
+        """
+        Parse a downloaded CSV or Excel file
         
+        Args:
+            buffer: Seekable binary file holding the raw file content
+            
+        Returns:
+            pandas DataFrame
+        """
         # Try to determine file type from content
         try:
             # Try CSV first
-            df = pd.read_csv(io.BytesIO(content))
+            buffer.seek(0)
+            df = self._read_csv(buffer)
         except Exception:
             try:
                 # Try Excel
-                df = pd.read_excel(io.BytesIO(content), engine='openpyxl')
+                buffer.seek(0)
+                df = pd.read_excel(buffer, engine='openpyxl')
             except Exception:
                 try:
                     # Try older Excel format
-                    df = pd.read_excel(io.BytesIO(content), engine='xlrd')
+                    buffer.seek(0)
+                    df = pd.read_excel(buffer, engine='xlrd')
                 except Exception as e:
                     raise ValueError(f"Unable to parse file. Supported formats: CSV, Excel (.xlsx, .xls)") from e
         
         return df
     
+    def _read_csv(self, buffer: BinaryIO) -> pd.DataFrame:
+        """
+        Parse a CSV file, using Arrow's multi-threaded reader when available
+        
+        Args:
+            buffer: Seekable binary file holding the raw file content
+            
+        Returns:
+            pandas DataFrame
+        """
+        if PYARROW_AVAILABLE:
+            try:
+                table = pacsv.read_csv(
+                    buffer,
+                    read_options=pacsv.ReadOptions(use_threads=True, block_size=8 << 20),
+                    # Empty fields are missing values, as in pd.read_csv
+                    convert_options=pacsv.ConvertOptions(strings_can_be_null=True)
+                )
+                # Plain numpy dtypes so type detection and cleaning behave as with pandas
+                return table.to_pandas(date_as_object=False, coerce_temporal_nanoseconds=True,
+                                       self_destruct=True)
+            except Exception:
+                # Arrow is stricter (e.g. ragged rows); let pandas have a go
+                buffer.seek(0)
+        
+        return pd.read_csv(buffer)
+    
     def validate_data(self, df: pd.DataFrame) -> None:
         """
         Validate that data meets minimum requirements
@@ -76,28 +137,35 @@ class DataPreprocessor:
         Returns:
             Dictionary mapping column names to types: 'numeric', 'categorical', 'datetime', 'text'
         """
-        column_types = {}
+        columns = list(df.columns)
         
-        for col in df.columns:
-            # Skip if all null
-            if df[col].isna().all():
-                column_types[col] = 'text'
-                continue
-            
-            # Try datetime
-            if self._is_datetime(df[col]):
-                column_types[col] = 'datetime'
-            # Try numeric
-            elif pd.api.types.is_numeric_dtype(df[col]):
-                column_types[col] = 'numeric'
-            # Check if categorical (limited unique values)
-            elif self._is_categorical(df[col]):
-                column_types[col] = 'categorical'
-            # Default to text
-            else:
-                column_types[col] = 'text'
-        
-        return column_types
+        # Columns are classified independently, so wide frames fan the
+        # datetime parsing and unique counts out over a thread pool
+        if self.max_workers > 1 and len(columns) > 1:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(columns))) as executor:
+                types = list(executor.map(self._classify_column, (df[col] for col in columns)))
+        else:
+            types = [self._classify_column(df[col]) for col in columns]
+        
+        return dict(zip(columns, types))
+    
+    def _classify_column(self, series: pd.Series) -> str:
+        """Detect the data type of a single column"""
+        # Skip if all null
+        if series.isna().all():
+            return 'text'
+        
+        # Try datetime
+        if self._is_datetime(series):
+            return 'datetime'
+        # Try numeric
+        if pd.api.types.is_numeric_dtype(series):
+            return 'numeric'
+        # Check if categorical (limited unique values)
+        if self._is_categorical(series):
+            return 'categorical'
+        # Default to text
+        return 'text'
     
     def _is_datetime(self, series: pd.Series) -> bool:
         """Check if a series can be parsed as datetime"""
@@ -108,9 +176,15 @@ class DataPreprocessor:
         if pd.api.types.is_numeric_dtype(series):
             return False
         
+        # Probe the first 100 non-null values; look at a short prefix first
+        # so long columns are not scanned and copied in full by dropna
+        sample = series.iloc[:2 * self.DATETIME_PROBE_SIZE].dropna()
+        if len(sample) < self.DATETIME_PROBE_SIZE and len(series) > 2 * self.DATETIME_PROBE_SIZE:
+            sample = series.dropna()
+        
         # Try to parse as datetime
         try:
-            pd.to_datetime(series.dropna().head(100), errors='raise')
+            pd.to_datetime(sample.head(self.DATETIME_PROBE_SIZE), errors='raise')
             return True
         except (ValueError, TypeError):
             return False
@@ -124,8 +198,9 @@ class DataPreprocessor:
             threshold: Maximum ratio of unique values to total values
         """
         if pd.api.types.is_object_dtype(series):
-            unique_ratio = series.nunique() / len(series)
-            return unique_ratio < threshold or series.nunique() <= 20
+            unique_count = series.nunique()
+            unique_ratio = unique_count / len(series)
+            return unique_ratio < threshold or unique_count <= 20
         return False
     
     def handle_missing_values(self, df: pd.DataFrame, column_types: Dict[str, str]) -> pd.DataFrame:
@@ -139,31 +214,40 @@ class DataPreprocessor:
         Returns:
             DataFrame with imputed values
         """
+        missing_ratio = df.isna().mean()
+        
+        # Group the columns to fill by strategy; complete columns need no fill
+        # and more than 30% missing is left as is
+        columns_by_type = {'numeric': [], 'categorical': [], 'datetime': [], 'text': []}
+        for col in df.columns:
+            if 0 < missing_ratio[col] <= 0.3:
+                col_type = column_types.get(col, 'text')
+                columns_by_type.get(col_type, columns_by_type['text']).append(col)
+        
+        fill_values = {}
+        
+        # Use mean for numeric columns
+        if columns_by_type['numeric']:
+            fill_values.update(df[columns_by_type['numeric']].mean().to_dict())
+        
+        # Use mode for categorical columns
+        for col in columns_by_type['categorical']:
+            mode_value = df[col].mode()
+            if len(mode_value) > 0:
+                fill_values[col] = mode_value[0]
+        
+        # Fill text with empty string
+        fill_values.update(dict.fromkeys(columns_by_type['text'], ''))
+        
+        # Per-column assignment beats DataFrame.fillna(dict), which copies
+        # the frame and then refills column by column anyway
         df_clean = df.copy()
+        for col, value in fill_values.items():
+            df_clean[col] = df_clean[col].fillna(value)
         
-        for col in df_clean.columns:
-            missing_ratio = df_clean[col].isna().sum() / len(df_clean)
-            
-            # Skip if more than 30% missing
-            if missing_ratio > 0.3:
-                continue
-            
-            col_type = column_types.get(col, 'text')
-            
-            if col_type == 'numeric':
-                # Use mean for numeric columns
-                df_clean[col].fillna(df_clean[col].mean(), inplace=True)
-            elif col_type == 'categorical':
-                # Use mode for categorical columns
-                mode_value = df_clean[col].mode()
-                if len(mode_value) > 0:
-                    df_clean[col].fillna(mode_value[0], inplace=True)
-            elif col_type == 'datetime':
-                # Forward fill for datetime
-                df_clean[col] = df_clean[col].ffill()
-            else:
-                # Fill text with empty string
-                df_clean[col].fillna('', inplace=True)
+        # Forward fill for datetime
+        for col in columns_by_type['datetime']:
+            df_clean[col] = df_clean[col].ffill()
         
         return df_clean
     
@@ -184,6 +268,10 @@ class DataPreprocessor:
             try:
                 if col_type == 'numeric':
                     df_converted[col] = pd.to_numeric(df_converted[col], errors='coerce')
+                    if self.memory_efficient and pd.api.types.is_integer_dtype(df_converted[col]):
+                        # Exact for every value; floats stay float64, since pandas
+                        # reductions over float32 (e.g. groupby means) lose precision
+                        df_converted[col] = pd.to_numeric(df_converted[col], downcast='integer')
                 elif col_type == 'datetime':
                     df_converted[col] = pd.to_datetime(df_converted[col], errors='coerce')
                 elif col_type == 'categorical':
@@ -194,12 +282,34 @@ class DataPreprocessor:
         
         return df_converted
     
-    def preprocess(self, file_url: str) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    def _schema_matches(self, df: pd.DataFrame, schema: Dict[str, str]) -> bool:
+        """
+        Check that a cached schema still describes the loaded frame
+        
+        The columns must be the same, and columns typed 'numeric' or
+        'datetime' must still hold numbers or dates: the file behind a URL can
+        be replaced, and imputation would fail on a stale numeric type.
+        """
+        if list(schema) != list(df.columns):
+            return False
+        
+        for col, col_type in schema.items():
+            if col_type == 'numeric' and not pd.api.types.is_numeric_dtype(df[col]):
+                return False
+            if col_type == 'datetime' and not self._is_datetime(df[col]):
+                return False
+        
+        return True
+    
+    def preprocess(self, file_url: str,
+                   schema_override: Optional[Dict[str, str]] = None) -> Tuple[pd.DataFrame, Dict[str, Any]]:
         """
         Complete preprocessing pipeline
         
         Args:
             file_url: URL to the data file
+            schema_override: Previously detected column types for this file; used
+                instead of type detection when it still fits the loaded file
             
         Returns:
             Tuple of (cleaned DataFrame, metadata dictionary)
@@ -210,8 +320,11 @@ class DataPreprocessor:
         # Validate
         self.validate_data(df)
         
-        # Detect types
-        column_types = self.detect_column_types(df)
+        # Detect types (skipped when a matching schema is supplied)
+        if schema_override is not None and self._schema_matches(df, schema_override):
+            column_types = dict(schema_override)
+        else:
+            column_types = self.detect_column_types(df)
         
         # Handle missing values
         df_clean = self.handle_missing_values(df, column_types)
@@ -233,6 +346,9 @@ class DataPreprocessor:
             'categorical_columns': [col for col, t in column_types.items() if t == 'categorical'],
             'datetime_columns': [col for col, t in column_types.items() if t == 'datetime'],
             'text_columns': [col for col, t in column_types.items() if t == 'text'],
+            # Shallow count: deep=True walks every string and costs more than
+            # the rest of preprocessing on text-heavy files
+            'memory_bytes': int(df_final.memory_usage().sum()),
         }
         
         return df_final, metadata
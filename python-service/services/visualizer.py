@@ -108,7 +108,8 @@ class VisualizationSelector:
         matrix = correlation_matrix.get('pearson_matrix', [])
         columns = correlation_matrix.get('columns', [])
         
-        if not matrix or not columns:
+        # The matrix may be a NumPy array, so test its length rather than its truth value
+        if len(matrix) == 0 or not columns:
             return charts
         
         # Format data for heatmap
@@ -466,8 +467,9 @@ class VisualizationSelector:
             # Normalize to 0-100 scale for better visualization
             normalized_data = {}
             for metric in selected_metrics:
-                col_min = df[metric].min()
-                col_max = df[metric].max()
+                # As floats: the range of a narrow integer column can overflow its dtype
+                col_min = float(df[metric].min())
+                col_max = float(df[metric].max())
                 if col_max > col_min:
                     normalized_value = (cat_data[metric] - col_min) / (col_max - col_min) * 100
                 else:
@@ -71,6 +71,7 @@ def test_imports():
         ("numpy", "NumPy"),
         ("sklearn", "scikit-learn"),
         ("pymongo", "PyMongo"),
+        ("motor", "Motor"),
         ("google.generativeai", "Google Generative AI"),
     ]
     
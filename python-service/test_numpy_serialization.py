@@ -1,7 +1,8 @@
 """
-Test script to verify numpy type conversion for JSON serialization
+Test script to verify numpy type handling in JSON serialization
 """
 
+import json
 import numpy as np
 import sys
 import os
@@ -9,7 +10,7 @@ import os
 # Add parent directory to path
 sys.path.insert(0, os.path.dirname(__file__))
 
-from main import convert_numpy_types
+from main import dumps_json
 
 
 def test_numpy_conversion():
@@ -48,8 +49,8 @@ def test_numpy_conversion():
     print(f"  bool_value: {type(test_data['bool_value'])}")
     print(f"  array_value: {type(test_data['array_value'])}")
     
-    # Convert
-    converted = convert_numpy_types(test_data)
+    # Serialize and read back
+    converted = json.loads(dumps_json(test_data))
     
     print("\nConverted data types:")
     print(f"  int_value: {type(converted['int_value'])}")
@@ -83,16 +84,11 @@ def test_numpy_conversion():
     
     print("\n✓ All numpy type conversions passed!")
     
-    # Test JSON serialization
-    import json
+    # Test NaN handling (invalid in strict JSON)
     try:
-        json_str = json.dumps(converted)
-        print(f"\n✓ JSON serialization successful ({len(json_str)} chars)")
-        
-        # Verify we can deserialize
-        deserialized = json.loads(json_str)
-        print("✓ JSON deserialization successful")
-        
+        json_str = dumps_json({'value': np.float64('nan'), 'values': np.array([1.0, np.nan])})
+        assert json.loads(json_str) == {'value': None, 'values': [1.0, None]}
+        print(f"\n✓ NaN serialized as null ({len(json_str)} bytes)")
         return True
     except Exception as e:
         print(f"\n✗ JSON serialization failed: {e}")
@@ -133,7 +129,7 @@ def test_real_world_analysis_data():
         ]
     }
     
-    converted = convert_numpy_types(analysis_data)
+    converted = json.loads(dumps_json(analysis_data))
     
     # Verify all types are native Python
     assert isinstance(converted['summary']['total_rows'], int)
@@ -144,10 +140,9 @@ def test_real_world_analysis_data():
     print("✓ Realistic analysis data conversion passed!")
     
     # Test JSON serialization
-    import json
     try:
-        json_str = json.dumps(converted)
-        print(f"✓ JSON serialization successful ({len(json_str)} chars)")
+        json_str = dumps_json(analysis_data)
+        print(f"✓ JSON serialization successful ({len(json_str)} bytes)")
         return True
     except Exception as e:
         print(f"✗ JSON serialization failed: {e}")
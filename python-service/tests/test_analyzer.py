@@ -102,6 +102,51 @@ class TestCorrelationCalculator:
         
         # Random data should have weak correlation
         assert len(correlations) == 0
+    
+    def test_correlation_matrix_p_values_match_pearsonr(self):
+        """Test the vectorized p-value matrix against scipy on pairwise-complete rows"""
+        from scipy import stats
+        
+        rng = np.random.default_rng(0)
+        df = pd.DataFrame(rng.normal(size=(60, 3)), columns=['a', 'b', 'c'])
+        df['b'] += df['a']
+        df.loc[::7, 'c'] = np.nan
+        
+        calculator = CorrelationCalculator()
+        result = calculator.get_correlation_matrix(df, ['a', 'b', 'c'])
+        p_values = np.asarray(result['p_value_matrix'])
+        
+        for i, col1 in enumerate(['a', 'b', 'c']):
+            for j, col2 in enumerate(['a', 'b', 'c']):
+                if i == j:
+                    assert p_values[i, j] == 1.0
+                else:
+                    valid = df[[col1, col2]].dropna()
+                    _, expected = stats.pearsonr(valid[col1], valid[col2])
+                    assert p_values[i, j] == pytest.approx(expected, rel=1e-9, abs=1e-300)
+    
+    def test_shared_correlation_matrix_gives_same_results(self):
+        """Test correlations and partial correlations reuse a precomputed matrix consistently"""
+        rng = np.random.default_rng(1)
+        df = pd.DataFrame(rng.normal(size=(80, 4)), columns=['a', 'b', 'c', 'd'])
+        df['b'] += df['a']
+        df['c'] -= 2 * df['b']
+        cols = ['a', 'b', 'c', 'd']
+        
+        calculator = CorrelationCalculator()
+        matrix = calculator.get_correlation_matrix(df, cols)
+        
+        direct = calculator.calculate_correlations(df, cols)
+        shared = calculator.calculate_correlations(df, cols, correlation_matrix=matrix)
+        assert [(c['column1'], c['column2']) for c in shared] == [(c['column1'], c['column2']) for c in direct]
+        for expected, actual in zip(direct, shared):
+            assert actual['coefficient'] == pytest.approx(expected['coefficient'], rel=1e-12)
+        
+        direct = calculator.calculate_partial_correlations(df, cols)
+        shared = calculator.calculate_partial_correlations(df, cols, correlation_matrix=matrix)
+        assert len(shared) == len(direct) > 0
+        for expected, actual in zip(direct, shared):
+            assert actual['partial_coefficient'] == pytest.approx(expected['partial_coefficient'], rel=1e-9)
 
 
 class TestDistributionAnalyzer:
@@ -136,6 +181,16 @@ class TestDistributionAnalyzer:
         assert len(distributions) == 2
         assert distributions[0]['column'] == 'col1'
         assert distributions[1]['column'] == 'col2'
+    
+    def test_is_normal_summarizes_normality_tests(self):
+        """Test the is_normal flag reflects whether any normality test passed"""
+        np.random.seed(0)
+        df = pd.DataFrame({'skewed': np.random.exponential(1, 500)})
+        
+        dist = DistributionAnalyzer().analyze_distributions(df, ['skewed'])[0]
+        
+        assert dist['is_normal'] is False
+        assert dist['is_normal'] == any(test['is_normal'] for test in dist['normality'].values())
 
 
 class TestOutlierDetector:
@@ -172,6 +227,51 @@ class TestOutlierDetector:
         # May or may not detect outliers in random normal data
         # Just verify it doesn't crash
         assert isinstance(results, list)
+    
+    def test_constant_and_empty_columns_skipped(self):
+        """Test constant and all-missing columns report no outliers"""
+        df = pd.DataFrame({
+            'constant': [0.1] * 200,
+            'empty': [np.nan] * 200,
+            'spiky': [0.0] * 190 + [50.0] * 10
+        })
+        
+        results = OutlierDetector().detect_outliers(df, ['constant', 'empty', 'spiky'])
+        
+        assert [r['column'] for r in results] == ['spiky']
+    
+    def test_hbos_default_with_isolation_forest_opt_in(self):
+        """Test HBOS runs by default and Isolation Forest only when requested"""
+        data = [50] * 50 + [51] * 50 + [49] * 50 + [0, 5, 200, 250]
+        df = pd.DataFrame({'value': data})
+        
+        methods = OutlierDetector().detect_outliers(df, ['value'])[0]['methods']
+        assert 'hbos' in methods
+        assert 'isolation_forest' not in methods
+        assert set(methods['hbos']['indices']) == {150, 151, 152, 153}
+        
+        methods = OutlierDetector(use_isolation_forest=True).detect_outliers(df, ['value'])[0]['methods']
+        assert 'isolation_forest' in methods
+        assert 'hbos' not in methods
+    
+    def test_consensus_counts_beyond_reported_indices(self):
+        """Test consensus counts every agreed outlier, not just the 20 listed"""
+        data = list(np.linspace(90, 110, 1000)) + [1000] * 30
+        df = pd.DataFrame({'value': data})
+        
+        consensus = OutlierDetector().detect_outliers(df, ['value'])[0]['consensus']
+        assert consensus['count'] == 30
+        assert consensus['indices'] == list(range(1000, 1020))
+    
+    def test_zscore_lists_most_extreme_outliers_first(self):
+        """Test the z-score method reports the 20 largest |z| in descending order"""
+        data = list(np.linspace(90, 110, 1000)) + [1000 + 10 * i for i in range(30)]
+        df = pd.DataFrame({'value': data})
+        
+        zscore = OutlierDetector().detect_outliers(df, ['value'])[0]['methods']['zscore']
+        assert zscore['count'] == 30
+        assert zscore['indices'] == list(range(1029, 1009, -1))
+        assert zscore['zscores'] == sorted(zscore['zscores'], reverse=True)
 
 
 class TestFrequencyAnalyzer:
@@ -243,3 +343,27 @@ class TestStatisticalAnalyzer:
         
         # Verify frequencies calculated
         assert len(results['frequencies']) == 2
+    
+    def test_concurrent_analysis_matches_single_worker(self):
+        """Test results do not depend on how the analysis blocks are scheduled"""
+        np.random.seed(7)
+        df = pd.DataFrame({
+            'date': pd.date_range('2024-01-01', periods=120),
+            'sales': np.arange(120) * 1.5 + np.random.normal(0, 5, 120),
+            'cost': np.arange(120) * 0.8 + np.random.normal(0, 4, 120),
+            'returns': np.random.exponential(2, 120),
+            'region': ['North', 'South', 'East'] * 40
+        })
+        metadata = {
+            'numeric_columns': ['sales', 'cost', 'returns'],
+            'categorical_columns': ['region'],
+            'datetime_columns': ['date']
+        }
+        
+        concurrent = StatisticalAnalyzer(max_workers=5).analyze(df, metadata)
+        sequential = StatisticalAnalyzer(max_workers=1).analyze(df, metadata)
+        
+        for key in ('trends', 'correlations', 'distributions', 'outliers', 'frequencies'):
+            assert [r.get('column', r.get('column1')) for r in concurrent[key]] == \
+                [r.get('column', r.get('column1')) for r in sequential[key]]
+        assert [i['title'] for i in concurrent['insights']] == [i['title'] for i in sequential['insights']]
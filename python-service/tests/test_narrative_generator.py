@@ -2,14 +2,25 @@
 Tests for narrative generation module
 """
 
+import asyncio
 import pytest
-from unittest.mock import Mock, patch, MagicMock
-from services.narrative_generator import NarrativeGenerator
+from unittest.mock import AsyncMock, Mock, patch, MagicMock
+from google.api_core import exceptions as google_exceptions
+from services.narrative_generator import (
+    NarrativeCache, NarrativeGenerator, _SectionStreamParser, get_narrative_generator, narrative_cache
+)
 
 
 class TestNarrativeGenerator:
     """Test NarrativeGenerator class"""
     
+    @pytest.fixture(autouse=True)
+    def empty_narrative_cache(self):
+        """Keep cached narratives from leaking between tests"""
+        narrative_cache.clear()
+        yield
+        narrative_cache.clear()
+    
     @pytest.fixture
     def sample_analysis(self):
         """Sample analysis results for testing"""
@@ -96,6 +107,15 @@ The analysis reveals several significant insights. First, sales show a strong in
 
 Based on these findings, several actions are recommended. First, capitalize on the strong upward sales trend by maintaining current strategies and exploring opportunities to accelerate growth. Second, focus resources on category A which represents half of all business, while also investigating why categories B and C have lower representation. Third, investigate the 5 sales outliers to understand whether they represent exceptional opportunities that can be replicated or data quality issues that need correction. Fourth, leverage the strong sales-profit correlation to forecast future profitability based on sales projections. Finally, consider expanding data collection to include additional variables that might explain the remaining variance in the trends."""
     
+    @pytest.fixture
+    def mock_success_response(self, mock_gemini_response):
+        """Mock Gemini response object for a completed, unblocked generation"""
+        response = MagicMock()
+        response.text = mock_gemini_response
+        response.prompt_feedback.block_reason = None
+        response.candidates = [MagicMock(finish_reason='STOP')]
+        return response
+    
     def test_initialization_with_api_key(self):
         """Test initialization with API key"""
         with patch('google.generativeai.configure'):
@@ -178,6 +198,70 @@ These are findings."""
                 with pytest.raises(ValueError, match="Missing section"):
                     generator._parse_response(incomplete_response)
     
+    def test_parse_response_header_variants(self):
+        """Test bold, colon and mixed-case headers while plain mentions stay content"""
+        with patch('google.generativeai.configure'):
+            with patch('google.generativeai.GenerativeModel'):
+                generator = NarrativeGenerator(api_key='test-key')
+                
+                response = """**SUMMARY**
+Sales data overview. The summary of this period is stable.
+
+Key Findings:
+Growth was strong and recommendations follow below.
+
+### Recommendation
+Keep investing."""
+                
+                sections = generator._parse_response(response)
+                
+                assert sections['summary'] == "Sales data overview. The summary of this period is stable."
+                assert sections['keyFindings'] == "Growth was strong and recommendations follow below."
+                assert sections['recommendations'] == "Keep investing."
+    
+    def test_json_output_mode(self, sample_analysis, sample_metadata):
+        """Test structured output requests a schema and parses JSON sections"""
+        with patch('google.generativeai.configure'):
+            with patch('google.generativeai.GenerativeModel'):
+                with patch('services.narrative_generator._JSON_OUTPUT', True):
+                    generator = NarrativeGenerator(api_key='test-key')
+                
+                assert generator.generation_config['response_mime_type'] == 'application/json'
+                assert generator.generation_config['response_schema']['required'] == [
+                    'summary', 'keyFindings', 'recommendations'
+                ]
+                
+                prompt = generator._build_prompt(sample_analysis, sample_metadata, 'general')
+                assert '## Key Findings' not in prompt
+                
+                sections = generator._parse_response(
+                    '{"summary": " Overview. ", "keyFindings": "Growth.", "recommendations": "Invest."}'
+                )
+                assert sections == {
+                    'summary': 'Overview.',
+                    'keyFindings': 'Growth.',
+                    'recommendations': 'Invest.'
+                }
+                
+                with pytest.raises(ValueError, match="Missing section"):
+                    generator._parse_response('{"summary": "Overview.", "keyFindings": ""}')
+    
+    @pytest.mark.parametrize('chunk_size', [1, 7, 64, 10000])
+    def test_section_stream_parser_matches_parse_response(self, chunk_size, mock_gemini_response):
+        """Test incremental section parsing agrees with the full-text parser"""
+        with patch('google.generativeai.configure'):
+            with patch('google.generativeai.GenerativeModel'):
+                generator = NarrativeGenerator(api_key='test-key')
+        
+        parser = _SectionStreamParser()
+        emitted = []
+        for start in range(0, len(mock_gemini_response), chunk_size):
+            emitted.extend(parser.feed(mock_gemini_response[start:start + chunk_size]))
+        emitted.extend(parser.close())
+        
+        assert [name for name, _ in emitted] == ['summary', 'keyFindings', 'recommendations']
+        assert dict(emitted) == generator._parse_response(mock_gemini_response)
+    
     def test_validate_narratives_success(self, sample_analysis):
         """Test narrative validation with valid content"""
         with patch('google.generativeai.configure'):
@@ -295,6 +379,347 @@ These are findings."""
         with pytest.raises(Exception):
             generator.generate_narrative(sample_analysis, sample_metadata)
     
+    @patch('google.generativeai.GenerativeModel')
+    @patch('google.generativeai.configure')
+    def test_generate_narrative_stream(self, mock_configure, mock_model_class,
+                                       sample_analysis, sample_metadata, mock_gemini_response,
+                                       mock_success_response):
+        """Test streamed chunks arrive in order and parse into sections"""
+        pieces = mock_gemini_response.split('## ')
+        texts = [pieces[0]] + ['## ' + piece for piece in pieces[1:]]
+        chunks = [MagicMock(text=text) for text in texts if text]
+        
+        mock_stream = mock_success_response
+        mock_stream.__iter__.return_value = iter(chunks)
+        
+        mock_model = MagicMock()
+        mock_model.generate_content.return_value = mock_stream
+        mock_model_class.return_value = mock_model
+        
+        generator = NarrativeGenerator(api_key='test-key')
+        stream = generator.generate_narrative_stream(sample_analysis, sample_metadata)
+        
+        received = []
+        with pytest.raises(StopIteration) as stop:
+            while True:
+                received.append(next(stream))
+        
+        assert ''.join(received) == mock_gemini_response
+        assert received[0].startswith('## Summary')
+        mock_model.generate_content.assert_called_once()
+        assert mock_model.generate_content.call_args.kwargs == {'stream': True}
+        mock_stream.resolve.assert_called_once()
+        
+        narratives = stop.value.value
+        assert set(narratives) == {'summary', 'keyFindings', 'recommendations'}
+        assert len(narratives['keyFindings']) > 50
+    
+    @patch('google.generativeai.GenerativeModel')
+    @patch('google.generativeai.configure')
+    @patch('asyncio.sleep', new_callable=AsyncMock)
+    def test_generate_variants_async(self, mock_sleep, mock_configure, mock_model_class,
+                                     sample_analysis, sample_metadata, mock_success_response):
+        """Test concurrent audience variants, including an async retry"""
+        mock_model = MagicMock()
+        mock_model.generate_content_async = AsyncMock(
+            side_effect=[Exception("Rate limit")] + [mock_success_response] * 3
+        )
+        mock_model_class.return_value = mock_model
+        
+        generator = NarrativeGenerator(api_key='test-key')
+        levels = ['executive', 'technical', 'general']
+        
+        variants = asyncio.run(
+            generator.generate_variants_async(sample_analysis, sample_metadata, levels)
+        )
+        
+        assert list(variants) == levels
+        assert all(len(v['summary']) > 50 for v in variants.values())
+        assert mock_model.generate_content_async.await_count == 4
+        mock_sleep.assert_awaited_once()
+        assert 0.5 <= mock_sleep.await_args.args[0] <= 1.5
+        mock_model.generate_content.assert_not_called()
+    
+    @patch('google.generativeai.GenerativeModel')
+    @patch('google.generativeai.configure')
+    def test_generate_narrative_cached(self, mock_configure, mock_model_class,
+                                       sample_analysis, sample_metadata, mock_success_response):
+        """Test identical requests reuse the first narrative without calling the API"""
+        mock_model = MagicMock()
+        mock_model.generate_content.return_value = mock_success_response
+        mock_model_class.return_value = mock_model
+        
+        generator = NarrativeGenerator(api_key='test-key')
+        
+        first = generator.generate_narrative(sample_analysis, sample_metadata)
+        first['summary'] = 'edited by caller'
+        second = NarrativeGenerator(api_key='test-key').generate_narrative(sample_analysis, sample_metadata)
+        
+        assert mock_model.generate_content.call_count == 1
+        assert second['summary'] != 'edited by caller'
+        
+        # A different audience changes the prompt, so it is generated afresh
+        generator.generate_narrative(sample_analysis, sample_metadata, 'executive')
+        assert mock_model.generate_content.call_count == 2
+    
+    @patch('google.generativeai.GenerativeModel')
+    @patch('google.generativeai.configure')
+    def test_stream_served_from_cache(self, mock_configure, mock_model_class,
+                                      sample_analysis, sample_metadata, mock_success_response):
+        """Test streams replay a narrative cached by generate_narrative without calling the API"""
+        mock_model = MagicMock()
+        mock_model.generate_content.return_value = mock_success_response
+        mock_model_class.return_value = mock_model
+        
+        generator = NarrativeGenerator(api_key='test-key')
+        narratives = generator.generate_narrative(sample_analysis, sample_metadata)
+        
+        sections = list(generator.generate_sections_stream(sample_analysis, sample_metadata))
+        
+        assert dict(sections) == narratives
+        assert [name for name, _ in sections] == ['summary', 'keyFindings', 'recommendations']
+        assert mock_model.generate_content.call_count == 1
+    
+    @patch('google.generativeai.GenerativeModel')
+    @patch('google.generativeai.configure')
+    def test_generate_all_audiences_shares_prompt_prefix(self, mock_configure, mock_model_class,
+                                                         sample_analysis, sample_metadata,
+                                                         mock_success_response):
+        """Test all audience variants are generated and differ only after the statistics"""
+        mock_model = MagicMock()
+        mock_model.generate_content_async = AsyncMock(return_value=mock_success_response)
+        mock_model_class.return_value = mock_model
+        
+        generator = NarrativeGenerator(api_key='test-key')
+        variants = asyncio.run(generator.generate_all_audiences(sample_analysis, sample_metadata))
+        
+        assert list(variants) == ['executive', 'technical', 'general']
+        
+        prompts = [call.args[0] for call in mock_model.generate_content_async.await_args_list]
+        assert len(set(prompts)) == 3
+        prefixes = {prompt.split('### AUDIENCE')[0] for prompt in prompts}
+        assert len(prefixes) == 1
+        assert 'OUTLIERS DETECTED' in prefixes.pop()
+    
+    @patch('google.generativeai.GenerativeModel')
+    @patch('google.generativeai.configure')
+    def test_get_narrative_generator_is_shared(self, mock_configure, mock_model_class):
+        """Test the process-wide generator configures Gemini only once"""
+        get_narrative_generator.cache_clear()
+        try:
+            with patch('config.config.GEMINI_API_KEY', 'test-key'):
+                first = get_narrative_generator()
+                second = get_narrative_generator()
+        finally:
+            get_narrative_generator.cache_clear()
+        
+        assert first is second
+        mock_configure.assert_called_once_with(api_key='test-key')
+        mock_model_class.assert_called_once()
+    
+    @patch('google.generativeai.GenerativeModel')
+    @patch('google.generativeai.configure')
+    @patch('time.sleep')
+    def test_blocked_prompt_is_not_retried(self, mock_sleep, mock_configure, mock_model_class,
+                                           sample_analysis, sample_metadata):
+        """Test permanent failures stop after one attempt while transient ones retry"""
+        blocked_response = MagicMock()
+        blocked_response.prompt_feedback.block_reason = 'SAFETY'
+        
+        mock_model = MagicMock()
+        mock_model.generate_content.return_value = blocked_response
+        mock_model_class.return_value = mock_model
+        
+        generator = NarrativeGenerator(api_key='test-key')
+        
+        with pytest.raises(Exception, match="failed after 1 attempts.*blocked the prompt"):
+            generator.generate_narrative(sample_analysis, sample_metadata)
+        assert mock_model.generate_content.call_count == 1
+        mock_sleep.assert_not_called()
+        
+        mock_model.generate_content.reset_mock(return_value=True)
+        mock_model.generate_content.side_effect = google_exceptions.ResourceExhausted("quota")
+        
+        with pytest.raises(Exception, match="failed after 3 attempts"):
+            generator.generate_narrative(sample_analysis, sample_metadata)
+        assert mock_model.generate_content.call_count == 3
+        assert mock_sleep.call_count == 2
+    
+    @patch('google.generativeai.GenerativeModel')
+    @patch('google.generativeai.configure')
+    def test_generate_sections_stream(self, mock_configure, mock_model_class,
+                                      sample_analysis, sample_metadata, mock_gemini_response,
+                                      mock_success_response):
+        """Test the Summary is emitted before the later sections are received"""
+        received = []
+        
+        def chunks():
+            for start in range(0, len(mock_gemini_response), 50):
+                received.append(start)
+                yield MagicMock(text=mock_gemini_response[start:start + 50])
+        
+        mock_stream = mock_success_response
+        mock_stream.__iter__.side_effect = lambda: chunks()
+        
+        mock_model = MagicMock()
+        mock_model.generate_content.return_value = mock_stream
+        mock_model_class.return_value = mock_model
+        
+        generator = NarrativeGenerator(api_key='test-key')
+        sections = generator.generate_sections_stream(sample_analysis, sample_metadata)
+        
+        name, text = next(sections)
+        assert name == 'summary'
+        assert text.startswith('This dataset contains 100 rows')
+        assert max(received) < mock_gemini_response.index('## Recommendations')
+        
+        rest = list(sections)
+        assert [name for name, _ in rest] == ['keyFindings', 'recommendations']
+    
+    @patch('google.generativeai.GenerativeModel')
+    @patch('google.generativeai.configure')
+    @patch('asyncio.sleep', new_callable=AsyncMock)
+    def test_generate_narrative_batch(self, mock_sleep, mock_configure, mock_model_class,
+                                      sample_analysis, sample_metadata, mock_success_response):
+        """Test batch jobs keep their order and a failing job does not sink the rest"""
+        failing_analysis = dict(sample_analysis, summary={'total_rows': 7})
+        
+        async def generate_content_async(prompt):
+            if 'Total rows: 7' in prompt:
+                raise google_exceptions.PermissionDenied("no access")
+            return mock_success_response
+        
+        mock_model = MagicMock()
+        mock_model.generate_content_async = AsyncMock(side_effect=generate_content_async)
+        mock_model_class.return_value = mock_model
+        
+        generator = NarrativeGenerator(api_key='test-key')
+        results = asyncio.run(generator.generate_narrative_batch([
+            {'analysis': sample_analysis, 'metadata': sample_metadata},
+            {'analysis': failing_analysis, 'metadata': sample_metadata},
+            {'analysis': sample_analysis, 'metadata': sample_metadata, 'audience_level': 'technical'},
+        ]))
+        
+        assert len(results) == 3
+        assert 'summary' in results[0]
+        assert isinstance(results[1], Exception)
+        assert 'no access' in str(results[1])
+        assert 'summary' in results[2]
+    
+    @patch('google.generativeai.GenerativeModel')
+    @patch('google.generativeai.configure')
+    def test_empty_analysis_skips_gemini(self, mock_configure, mock_model_class, sample_metadata):
+        """Test an analysis without findings gets the templated narrative"""
+        mock_model = MagicMock()
+        mock_model_class.return_value = mock_model
+        empty_analysis = {
+            'summary': {'total_rows': 40, 'total_columns': 3},
+            'trends': [],
+            'correlations': [],
+            'outliers': []
+        }
+        
+        generator = NarrativeGenerator(api_key='test-key')
+        narratives = generator.generate_narrative(empty_analysis, sample_metadata)
+        
+        assert '40 rows across 3 columns' in narratives['summary']
+        generator._validate_narratives(narratives, empty_analysis)
+        
+        sections = list(generator.generate_sections_stream(empty_analysis, sample_metadata))
+        assert dict(sections) == narratives
+        mock_model.generate_content.assert_not_called()
+        
+        with patch('config.config.NARRATIVE_EMPTY_FALLBACK', False):
+            mock_model.generate_content.side_effect = google_exceptions.PermissionDenied("no access")
+            with pytest.raises(Exception, match="no access"):
+                generator.generate_narrative(empty_analysis, sample_metadata)
+        mock_model.generate_content.assert_called_once()
+    
+    @patch('google.generativeai.GenerativeModel')
+    @patch('google.generativeai.configure')
+    def test_run_batch_sync_bounds_concurrency(self, mock_configure, mock_model_class,
+                                               sample_analysis, sample_metadata, mock_success_response):
+        """Test the sync batch runner never exceeds max_concurrency in-flight calls"""
+        in_flight = 0
+        peak = 0
+        
+        async def generate_content_async(prompt):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0)
+            in_flight -= 1
+            return mock_success_response
+        
+        mock_model = MagicMock()
+        mock_model.generate_content_async = AsyncMock(side_effect=generate_content_async)
+        mock_model_class.return_value = mock_model
+        
+        jobs = [
+            {'analysis': dict(sample_analysis, summary={'total_rows': rows}), 'metadata': sample_metadata}
+            for rows in range(6)
+        ]
+        
+        generator = NarrativeGenerator(api_key='test-key')
+        results = generator.run_batch_sync(jobs, max_concurrency=2)
+        
+        assert len(results) == 6
+        assert all('summary' in result for result in results)
+        assert mock_model.generate_content_async.await_count == 6
+        assert peak == 2
+    
+    @patch('google.generativeai.GenerativeModel')
+    @patch('google.generativeai.configure')
+    def test_run_batch_sync_twice(self, mock_configure, mock_model_class,
+                                  sample_analysis, sample_metadata, mock_success_response):
+        """Test a second sync batch still reaches the async client bound to the first loop"""
+        loops = []
+        
+        async def generate_content_async(prompt):
+            # Like grpc.aio, the client only works on the loop it first ran on
+            loop = asyncio.get_running_loop()
+            if loops and loops[0] is not loop:
+                raise RuntimeError("Event loop is closed")
+            loops.append(loop)
+            return mock_success_response
+        
+        mock_model = MagicMock()
+        mock_model.generate_content_async = AsyncMock(side_effect=generate_content_async)
+        mock_model_class.return_value = mock_model
+        
+        generator = NarrativeGenerator(api_key='test-key')
+        first = generator.run_batch_sync([{'analysis': sample_analysis, 'metadata': sample_metadata}])
+        second = generator.run_batch_sync([
+            {'analysis': sample_analysis, 'metadata': sample_metadata, 'audience_level': 'technical'}
+        ])
+        
+        assert 'summary' in first[0]
+        assert 'summary' in second[0]
+        assert mock_model.generate_content_async.await_count == 2
+    
+    def test_narrative_cache_disk_tier(self, tmp_path):
+        """Test narratives written through to disk are found by a fresh cache"""
+        pytest.importorskip('diskcache')
+        key = NarrativeCache.key_for('prompt', 'gemini-1.5-flash', {'temperature': 0.7})
+        narratives = {'summary': 'S', 'keyFindings': 'K', 'recommendations': 'R'}
+        
+        NarrativeCache(max_size=4, directory=str(tmp_path)).set(key, narratives)
+        
+        assert NarrativeCache(max_size=4, directory=str(tmp_path)).get(key) == narratives
+        assert NarrativeCache(max_size=4).get(key) is None
+    
+    def test_narrative_cache_without_diskcache(self, tmp_path):
+        """Test a cache directory without diskcache installed degrades to memory only"""
+        key = NarrativeCache.key_for('prompt', 'gemini-1.5-flash', {'temperature': 0.7})
+        narratives = {'summary': 'S', 'keyFindings': 'K', 'recommendations': 'R'}
+        
+        with patch('services.narrative_generator.DISKCACHE_AVAILABLE', False):
+            cache = NarrativeCache(max_size=1, directory=str(tmp_path))
+        cache.set(key, narratives)
+        
+        assert cache.get(key) == narratives
+        assert list(tmp_path.iterdir()) == []
+    
     def test_log_api_interaction(self):
         """Test API interaction logging"""
         with patch('google.generativeai.configure'):
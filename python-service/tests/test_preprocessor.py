@@ -6,6 +6,7 @@ import pytest
 import pandas as pd
 import numpy as np
 from io import BytesIO
+from unittest.mock import MagicMock, patch
 from services.preprocessor import DataPreprocessor
 
 
@@ -43,6 +44,30 @@ class TestDataPreprocessor:
         with pytest.raises(ValueError, match="at least 10 rows"):
             self.preprocessor.validate_data(df)
     
+    @staticmethod
+    def _streamed_response(content):
+        """Mock requests response that serves content in small chunks"""
+        response = MagicMock()
+        response.__enter__.return_value = response
+        response.iter_content.side_effect = lambda chunk_size: (
+            content[i:i + 7] for i in range(0, len(content), 7)
+        )
+        return response
+    
+    def test_read_file_streams_csv_and_excel(self):
+        """Test that downloads are streamed and parsed as CSV, then Excel"""
+        expected = pd.DataFrame({'col1': range(12), 'col2': list('abcdefghijkl')})
+        excel = BytesIO()
+        expected.to_excel(excel, index=False)
+        
+        for content in (expected.to_csv(index=False).encode(), excel.getvalue()):
+            with patch('services.preprocessor.requests.get',
+                       return_value=self._streamed_response(content)) as get:
+                df = self.preprocessor.read_file('https://example.com/data')
+            
+            assert get.call_args.kwargs['stream'] is True
+            pd.testing.assert_frame_equal(df, expected)
+    
     def test_detect_column_types_numeric(self):
         """Test numeric column detection"""
         df = pd.DataFrame({
@@ -75,6 +100,19 @@ class TestDataPreprocessor:
         
         assert types['date'] == 'datetime'
     
+    def test_detect_column_types_sparse_datetime(self):
+        """Test that date strings after a long run of missing values are still probed"""
+        dates = pd.date_range('2024-01-01', periods=300).strftime('%Y-%m-%d')
+        df = pd.DataFrame({
+            'sparse_date': [None] * 500 + list(dates),
+            'sparse_text': [None] * 500 + list(dates[:50]) + ['not a date'] + list(dates[51:])
+        })
+        
+        types = self.preprocessor.detect_column_types(df)
+        
+        assert types['sparse_date'] == 'datetime'
+        assert types['sparse_text'] != 'datetime'
+    
     def test_detect_column_types_text(self):
         """Test text column detection"""
         df = pd.DataFrame({
@@ -85,6 +123,24 @@ class TestDataPreprocessor:
         
         assert types['text'] == 'text'
     
+    def test_detect_column_types_concurrent_matches_sequential(self):
+        """Test that classifying columns on a thread pool keeps every type and the column order"""
+        df = pd.DataFrame({
+            'numeric': range(100),
+            'category': ['A', 'B', 'C', 'D'] * 25,
+            'date': pd.date_range('2024-01-01', periods=100).strftime('%Y-%m-%d'),
+            'text': ['unique text ' + str(i) for i in range(100)],
+            'empty': [None] * 100
+        })
+        
+        concurrent = DataPreprocessor(max_workers=4).detect_column_types(df)
+        sequential = DataPreprocessor(max_workers=1).detect_column_types(df)
+        
+        assert concurrent == sequential
+        assert list(concurrent) == list(df.columns)
+        assert concurrent == {'numeric': 'numeric', 'category': 'categorical', 'date': 'datetime',
+                              'text': 'text', 'empty': 'text'}
+    
     def test_handle_missing_values_numeric(self):
         """Test missing value imputation for numeric columns"""
         df = pd.DataFrame({
@@ -137,6 +193,28 @@ class TestDataPreprocessor:
         assert pd.api.types.is_numeric_dtype(df_converted['numeric'])
         assert pd.api.types.is_categorical_dtype(df_converted['category'])
     
+    def test_convert_types_downcasts_integers(self):
+        """Test that integer columns are narrowed exactly and floats keep float64"""
+        df = pd.DataFrame({
+            'small': [-120, 0, 120],
+            'medium': [0, 40000, 5],
+            'large': [0, 2 ** 40, 1],
+            'float': [0.1, 0.2, 0.3]
+        })
+        column_types = dict.fromkeys(df.columns, 'numeric')
+        
+        df_converted = self.preprocessor.convert_types(df, column_types)
+        
+        assert df_converted['small'].dtype == np.int8
+        assert df_converted['medium'].dtype == np.int32
+        assert df_converted['large'].dtype == np.int64
+        assert df_converted['float'].dtype == np.float64
+        pd.testing.assert_frame_equal(df_converted, df, check_dtype=False)
+        
+        # memory_efficient=False keeps pandas' default dtypes
+        df_default = DataPreprocessor(memory_efficient=False).convert_types(df, column_types)
+        pd.testing.assert_frame_equal(df_default, df)
+    
     def test_preprocess_complete_pipeline(self):
         """Test complete preprocessing pipeline with mock data"""
         # Create a sample CSV in memory
@@ -167,6 +245,7 @@ class TestDataPreprocessor:
             assert 'price' in metadata['numeric_columns']
             assert 'category' in metadata['categorical_columns']
             assert 'date' in metadata['datetime_columns']
+            assert metadata['memory_bytes'] == df.memory_usage().sum()
             
             # Verify data types
             assert pd.api.types.is_numeric_dtype(df['sales'])
@@ -175,3 +254,51 @@ class TestDataPreprocessor:
         finally:
             # Restore original method
             self.preprocessor.read_file = original_read
+    
+    def test_preprocess_schema_override(self):
+        """Test that a matching schema override replaces type detection"""
+        df_raw = pd.DataFrame({
+            'code': [1, 2, 3, 1, 2, 3, 1, 2, 3, 1],
+            'value': np.arange(10, dtype=float)
+        })
+        schema = {'code': 'categorical', 'value': 'numeric'}
+        
+        self.preprocessor.read_file = lambda url: df_raw.copy()
+        self.preprocessor.detect_column_types = lambda df: pytest.fail("type detection should be skipped")
+        
+        df, metadata = self.preprocessor.preprocess('mock_url', schema_override=schema)
+        
+        assert metadata['column_types'] == schema
+        assert metadata['categorical_columns'] == ['code']
+        assert pd.api.types.is_categorical_dtype(df['code'])
+    
+    def test_preprocess_schema_override_mismatch(self):
+        """Test that a schema for different columns is ignored"""
+        df_raw = pd.DataFrame({
+            'sales': range(10),
+            'price': np.arange(10, dtype=float)
+        })
+        
+        self.preprocessor.read_file = lambda url: df_raw.copy()
+        
+        df, metadata = self.preprocessor.preprocess('mock_url', schema_override={'other': 'text'})
+        
+        assert metadata['numeric_columns'] == ['sales', 'price']
+    
+    def test_preprocess_schema_override_changed_dtype(self):
+        """Test that a schema whose numeric or datetime columns no longer fit is ignored"""
+        df_raw = pd.DataFrame({
+            'code': ['A', 'B', None, 'C', 'A', 'B', 'C', 'A', 'B', 'C'],
+            'when': ['x'] * 10,
+            'value': np.arange(10, dtype=float)
+        })
+        
+        self.preprocessor.read_file = lambda url: df_raw.copy()
+        
+        for stale in ({'code': 'numeric', 'when': 'text', 'value': 'numeric'},
+                      {'code': 'categorical', 'when': 'datetime', 'value': 'numeric'}):
+            df, metadata = self.preprocessor.preprocess('mock_url', schema_override=stale)
+            
+            assert metadata['column_types'] == {'code': 'categorical', 'when': 'categorical',
+                                                'value': 'numeric'}
+            assert df['code'].isna().sum() == 0